@@ -0,0 +1,246 @@
+from flask import Blueprint, abort, current_app, request
+from sqlalchemy import func, select
+
+from bracket import knockout_stages
+from bulk import (BulkError, RESULT_COLUMNS, TEAM_COLUMNS, check_row_count, import_teams,
+                  read_rows, rows_from_json, commit_results)
+from clinch import qualification_status
+from concurrency import retry_on_conflict
+from event_listing import events_page, read_filters
+from export import export_response
+from models import db, Counter, DELETED_EVENTS, Event, Match, Team
+from page_cache import bump_event_revision, cached_page
+from payloads import event_payload, match_payload, to_json
+from standings import event_group_tables, load_stage_matches
+
+API_VERSION = 1
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+
+@api.after_request
+def add_version_header(response):
+    response.headers['X-API-Version'] = str(API_VERSION)
+    return response
+
+
+@api.errorhandler(404)
+def not_found(error):
+    return {'error': 'not_found'}, 404
+
+
+@api.errorhandler(400)
+def bad_request(error):
+    return {'error': 'bad_request', 'message': error.description}, 400
+
+
+def invalid_rows(error):
+    return {'error': 'bad_request', 'message': str(error), 'errors': error.errors}, 400
+
+
+# JSON törzs (lista) vagy CSV szöveg
+def request_rows(columns):
+    if request.is_json:
+        return check_row_count(rows_from_json(request.get_json(silent=True), columns))
+    return read_rows(request.get_data(as_text=True), columns)
+
+
+# Erős ETag a revízióból: változatlan adatnál 304, adatbázis munka nélkül
+def conditional_json(etag, build):
+    etag = f'v{API_VERSION}-{etag}'
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(
+            build(), mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def event_json(event, name, build):
+    return conditional_json(
+        f'{event.id}-{event.revision}',
+        lambda: cached_page(event, f'api_{name}',
+                            lambda: to_json(build(event))))
+
+
+# Az olvasó végpontok lekérdezései és a válasz összeállítása külön: az
+# aszinkron kiszolgálás (asgi) ugyanezeket használja
+def teams_statement(event_id):
+    return select(Team).filter_by(event_id=event_id)
+
+
+def event_matches_statement(event_id):
+    return select(Match).filter_by(event_id=event_id).order_by(
+        Match.group_id, Match.round_number, Match.id)
+
+
+def bracket_matches_statement(event_id, stage_ids):
+    return select(Match).filter(
+        Match.event_id == event_id, Match.group_id.in_(stage_ids)).order_by(
+        Match.bracket_position, Match.id)
+
+
+def events_version_statement():
+    deleted = select(Counter.value).filter(Counter.name == DELETED_EVENTS).scalar_subquery()
+    return select(func.count(Event.id), func.max(Event.id),
+                  func.sum(Event.revision), deleted)
+
+
+# Két törlés között minden új esemény a darabszámot, minden módosítás a
+# revíziók összegét növeli, így a négyes nem ismétlődhet
+def events_etag(count, max_id, revisions, deleted):
+    return f'{count}-{max_id}-{revisions}-{deleted or 0}'
+
+
+def build_matches(event, teams, matches):
+    return {
+        'event': event_payload(event),
+        'teams': [{'id': team.id, 'name': team.name, 'group_id': team.group_id}
+                  for team in teams],
+        'matches': [match_payload(match) for match in matches],
+    }
+
+
+def build_standings(event, group_data):
+    return {
+        'event': event_payload(event),
+        'groups': [{'name': name, 'table': table}
+                   for name, table in group_data.items()],
+    }
+
+
+def build_bracket(event, stages, matches):
+    rounds = []
+    for group in stages:
+        rounds.append({
+            'group_id': group.id,
+            'name': group.name,
+            'stage_order': group.stage_order,
+            'matches': [match_payload(match) for match in matches
+                        if match.group_id == group.id],
+        })
+    return {'event': event_payload(event), 'rounds': rounds}
+
+
+def build_events(events, next_cursor):
+    return {'events': [event_payload(event) for event in events],
+            'next': next_cursor}
+
+
+def matches_payload(event):
+    teams = db.session.scalars(teams_statement(event.id)).all()
+    matches = db.session.scalars(event_matches_statement(event.id)).all()
+    return build_matches(event, teams, matches)
+
+
+def standings_payload(event):
+    return build_standings(event, event_group_tables(event))
+
+
+def bracket_payload(event):
+    stages = knockout_stages(event.id)
+    matches = db.session.scalars(bracket_matches_statement(
+        event.id, [group.id for group in stages])).all()
+    return build_bracket(event, stages, matches)
+
+
+def probabilities_payload(event, model, simulations):
+    from simulation import qualification_probabilities
+    matches = load_stage_matches(event.id)
+    group_data = event_group_tables(event, matches=matches)
+    probabilities = qualification_probabilities(
+        event, group_data, matches, simulations, model, seed=event.revision)
+    status = qualification_status(event, group_data, matches)
+    return {
+        'event': event_payload(event),
+        'model': model,
+        'simulations': simulations,
+        'groups': [{'name': name, 'teams': [
+            dict(probabilities[name][row['team_id']],
+                 team_id=row['team_id'], team_name=row['team_name'],
+                 status=status[name][row['team_id']])
+            for row in table]} for name, table in group_data.items()],
+    }
+
+
+@api.route('/events')
+def events():
+    version = db.session.execute(events_version_statement()).one()
+
+    def build():
+        return to_json(build_events(*events_page(
+            read_filters(request.args), request.args.get('after'))))
+
+    return conditional_json(events_etag(*version), build)
+
+
+@api.route('/events/<int:event_id>/matches')
+def event_matches(event_id):
+    event = Event.query.get_or_404(event_id)
+    return event_json(event, 'matches', matches_payload)
+
+
+@api.route('/events/<int:event_id>/standings')
+def event_standings(event_id):
+    event = Event.query.get_or_404(event_id)
+    return event_json(event, 'standings', standings_payload)
+
+
+@api.route('/events/<int:event_id>/bracket')
+def event_bracket(event_id):
+    event = Event.query.get_or_404(event_id)
+    return event_json(event, 'bracket', bracket_payload)
+
+
+# A szimuláció (numpy) csak az első ilyen kéréskor töltődik be
+@api.route('/events/<int:event_id>/probabilities')
+def event_probabilities(event_id):
+    from simulation import MAX_SIMULATIONS, MODELS, SIMULATIONS
+    event = Event.query.get_or_404(event_id)
+    model = request.args.get('model', 'uniform')
+    simulations = request.args.get('simulations', SIMULATIONS, type=int)
+    if model not in MODELS:
+        abort(400, f"model: {', '.join(MODELS)}")
+    if not 1 <= simulations <= MAX_SIMULATIONS:
+        abort(400, f'simulations: 1..{MAX_SIMULATIONS}')
+    return event_json(event, f'probabilities_{model}_{simulations}',
+                      lambda event: probabilities_payload(event, model, simulations))
+
+
+@api.route('/events/<int:event_id>/teams', methods=['POST'])
+def import_event_teams(event_id):
+    event = Event.query.get_or_404(event_id)
+    try:
+        summary = import_teams(event, request_rows(TEAM_COLUMNS))
+    except BulkError as error:
+        return invalid_rows(error)
+    bump_event_revision(event_id)
+    db.session.commit()
+    return summary, 201
+
+
+# Több eredmény egy tranzakcióban; hibás sor esetén semmi sem változik
+@api.route('/events/<int:event_id>/results', methods=['POST'])
+def enter_event_results(event_id):
+    event = Event.query.get_or_404(event_id)
+    try:
+        rows = request_rows(RESULT_COLUMNS)
+        matches = retry_on_conflict(lambda: commit_results(event, rows))
+    except BulkError as error:
+        return invalid_rows(error)
+    return {'event': event_payload(event),
+            'matches': [match_payload(match) for match in matches]}
+
+
+# Teljes archívum vagy egy esemény adatai CSV vagy NDJSON formában, folyamként
+@api.route('/export/<dataset>.<file_format>')
+def export_archive(dataset, file_format):
+    return export_response(dataset, file_format)
+
+
+@api.route('/events/<int:event_id>/export/<dataset>.<file_format>')
+def export_event(event_id, dataset, file_format):
+    Event.query.get_or_404(event_id)
+    return export_response(dataset, file_format, event_id)
@@ -0,0 +1,343 @@
+import asyncio
+import os
+import queue
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import parse_etags, quote_etag
+
+from api import (API_VERSION, build_bracket, build_events, build_matches, build_standings,
+                 bracket_matches_statement, event_matches_statement, events_etag,
+                 events_version_statement, teams_statement)
+from app import create_app
+from bracket import knockout_stages_statement, stage_groups_statement
+from broker import SUBSCRIBER_QUEUE_SIZE
+from event_listing import events_statement, read_filters, split_page
+from live import KEEPALIVE_SECONDS, event_channel
+from models import Event, engine_config, listen_sqlite_pragmas, sqlite_pragmas
+from page_cache import get_page_cache, page_key
+from payloads import to_json
+from ranking import ranking_rules
+from standings import (collect_tables, group_results, name_tables, rank_tables,
+                       stage_matches_statement, standings_statement, tied_groups)
+
+# Aszinkron kiszolgálás a kijelzőknek: a csak olvasó végpontok (eseménylista,
+# tabellák, mérkőzések, ágrajz, élő folyam) aszinkron adatbázis meghajtóval,
+# szálak nélkül futnak, így egy folyamat több ezer nyitott kapcsolatot is
+# elbír. Minden más (űrlapok, írások, HTML oldalak) változatlanul a Flask
+# alkalmazáshoz kerül, WSGI_THREADS szálon párhuzamosan (mint a gunicorn
+# szálas munkafolyamata). A gyorsítótár és az üzenetközvetítő közös, így a Flask oldali írások
+# azonnal látszanak. Indítás: uvicorn asgi:create_asgi_app --factory
+# Az aszinkron végpontok a /metrics méréseiben és a lekérdezés-keretekben nem szerepelnek.
+
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite', 'postgresql': 'asyncpg'}
+# A Flask kéréseket futtató szálak száma; a WSGI_THREADS környezeti
+# változóval vagy a config azonos kulcsával állítható
+WSGI_THREADS = 10
+
+ROUTES = (
+    (re.compile(r'/api/events'), 'events'),
+    (re.compile(r'/api/events/(\d+)/(matches|standings|bracket)'), 'event'),
+    (re.compile(r'/events/(\d+)/stream'), 'stream'),
+)
+
+
+# Az ASYNC_DATABASE_URI hiányában a Flask adatbázisa aszinkron meghajtóval.
+# A memóriában tartott SQLite nem osztható meg a két motor között.
+def async_database_uri(app):
+    if app.config.get('ASYNC_DATABASE_URI'):
+        return app.config['ASYNC_DATABASE_URI']
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"ASYNC_DATABASE_URI: {', '.join(ASYNC_DRIVERS)}")
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+# Ugyanazok a készlet beállítások, mint a Flask motornál; az aiosqlite
+# alapból minden kéréshez új kapcsolatot nyitna (NullPool)
+def create_async_db(app):
+    url = make_url(async_database_uri(app))
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    if 'pool_size' in options:
+        options.setdefault('poolclass', AsyncAdaptedQueuePool)
+    engine = create_async_engine(url, **options)
+    if url.get_backend_name() == 'sqlite':
+        listen_sqlite_pragmas(engine.sync_engine, sqlite_pragmas(engine_config(app)))
+    return engine
+
+
+# A broker a közzétevő (Flask) szálából hívja; az üzenet az eseményhurokban
+# kerül a sorba. Teli sornál a LocalBroker-hez hasonlóan eldobjuk.
+class AsyncSubscription:
+
+    def __init__(self, loop, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def put_nowait(self, message):
+        if self.queue.full():
+            raise queue.Full
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+
+# Az asgiref a WSGI kéréseket egyetlen közös szálon, egymás után futtatná,
+# így egy lassú HTML oldal az összes többit feltartaná. Itt a kérés a saját
+# szálkészletünkben fut; a környezetet (build_environ), a start_response-t és
+# a válasz küldését (sync_send) az asgiref példánya adja.
+class PooledWsgiInstance(WsgiToAsgiInstance):
+
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def run_wsgi_app(self, body):
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.run_wsgi, body)
+
+    # A szálkészletben fut, így a start_response és a küldés ugyanabban a szálban történik
+    def run_wsgi(self, body):
+        try:
+            environ = self.build_environ(self.scope, body)
+        except ValueError:
+            # Túl sok azonos fejléc
+            self.sync_send({'type': 'http.response.start', 'status': 400,
+                            'headers': [(b'content-type', b'text/plain')]})
+            self.sync_send({'type': 'http.response.body', 'body': b'Bad Request'})
+            return
+        result = self.wsgi_application(environ, self.start_response)
+        try:
+            sent = 0
+            for output in result:
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                # A Content-Length-nél többet nem küldünk
+                if self.response_content_length is not None:
+                    output = output[:self.response_content_length - sent]
+                self.sync_send({'type': 'http.response.body', 'body': output,
+                                'more_body': True})
+                sent += len(output)
+                if sent == self.response_content_length:
+                    break
+        finally:
+            # A WSGI szerint a válasz bezárása a kiszolgáló dolga
+            if hasattr(result, 'close'):
+                result.close()
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+        self.sync_send({'type': 'http.response.body'})
+
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+
+    def __init__(self, wsgi_application, threads):
+        super().__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        await PooledWsgiInstance(self.wsgi_application, self.executor)(scope, receive, send)
+
+
+async def send_response(send, status, headers, body=b''):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(name.encode('latin-1'), value.encode('latin-1'))
+                            for name, value in headers]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def request_header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+# Ugyanaz az ETag és ugyanazok a fejlécek, mint az api blueprint-ben
+async def conditional_json(scope, send, etag, build):
+    etag = f'v{API_VERSION}-{etag}'
+    headers = [('ETag', quote_etag(etag)), ('Cache-Control', 'no-cache'),
+               ('X-API-Version', str(API_VERSION))]
+    if parse_etags(request_header(scope, b'if-none-match')).contains(etag):
+        await send_response(send, 304, headers)
+        return
+    body = (await build()).encode()
+    headers += [('Content-Type', 'application/json'),
+                ('Content-Length', str(len(body)))]
+    await send_response(send, 200, headers, body)
+
+
+async def matches_data(session, event):
+    teams = (await session.scalars(teams_statement(event.id))).all()
+    matches = (await session.scalars(event_matches_statement(event.id))).all()
+    return build_matches(event, teams, matches)
+
+
+# A standings.get_group_tables lépései, aszinkron lekérdezésekkel
+async def standings_data(session, event):
+    groups = (await session.scalars(stage_groups_statement(event.id))).all()
+    group_ids = [group.id for group in groups]
+    tables = {}
+    if group_ids:
+        rules = ranking_rules(event.sport_type)
+        tables = collect_tables(group_ids, await session.execute(
+            standings_statement(event.id, group_ids)))
+        tied = tied_groups(tables, rules)
+        results = {}
+        if tied:
+            results = group_results(await session.execute(
+                stage_matches_statement(event.id, tied)))
+        tables = rank_tables(tables, rules, results)
+    return build_standings(event, name_tables(groups, tables))
+
+
+async def bracket_data(session, event):
+    stages = (await session.scalars(knockout_stages_statement(event.id))).all()
+    matches = (await session.scalars(bracket_matches_statement(
+        event.id, [group.id for group in stages]))).all()
+    return build_bracket(event, stages, matches)
+
+
+PAYLOAD_BUILDERS = {'matches': matches_data, 'standings': standings_data,
+                    'bracket': bracket_data}
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+class AsgiApp:
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        flask_app.config.setdefault(
+            'WSGI_THREADS', int(os.environ.get('WSGI_THREADS', WSGI_THREADS)))
+        self.wsgi = PooledWsgiToAsgi(flask_app, flask_app.config['WSGI_THREADS'])
+        self.engine = create_async_db(flask_app)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        route = self.match(scope)
+        if route is None:
+            await self.wsgi(scope, receive, send)
+            return
+        # Alkalmazás kontextus a közös gyorsítótárhoz, brokerhez és JSON-hoz
+        with self.flask_app.app_context():
+            kind, params = route
+            if kind == 'events':
+                await self.events(scope, send)
+            elif kind == 'event':
+                await self.event_json(scope, receive, send, int(params[0]), params[1])
+            else:
+                await self.stream(scope, receive, send, int(params[0]))
+
+    def match(self, scope):
+        if scope['type'] != 'http' or scope['method'] != 'GET':
+            return None
+        for pattern, kind in ROUTES:
+            found = pattern.fullmatch(scope['path'])
+            if found:
+                return kind, found.groups()
+        return None
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                self.wsgi.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def events(self, scope, send):
+        args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1'),
+                                   keep_blank_values=True))
+        async with self.sessions() as session:
+            version = (await session.execute(events_version_statement())).one()
+
+            async def build():
+                events = (await session.scalars(events_statement(
+                    read_filters(args), args.get('after')))).all()
+                return to_json(build_events(*split_page(events)))
+
+            await conditional_json(scope, send, events_etag(*version), build)
+
+    # Változatlan revíziónál (304 vagy gyorsítótár találat) csak az esemény
+    # sorát olvassuk be. Nem létező eseménynél a Flask adja a 404 választ.
+    async def event_json(self, scope, receive, send, event_id, name):
+        async with self.sessions() as session:
+            event = await session.get(Event, event_id)
+            if event is None:
+                await self.wsgi(scope, receive, send)
+                return
+
+            async def build():
+                cache = get_page_cache()
+                key = page_key(event, f'api_{name}')
+                page = cache.get(key)
+                if page is None:
+                    page = to_json(await PAYLOAD_BUILDERS[name](session, event))
+                    cache.set(key, page)
+                return page
+
+            await conditional_json(scope, send, f'{event.id}-{event.revision}', build)
+
+    # A live blueprint folyama szál nélkül: a kapcsolat csak egy sort foglal
+    async def stream(self, scope, receive, send, event_id):
+        async with self.sessions() as session:
+            event = await session.get(Event, event_id)
+        if event is None:
+            await self.wsgi(scope, receive, send)
+            return
+        broker = self.flask_app.extensions['broker']
+        channel = event_channel(event_id)
+        subscription = AsyncSubscription(
+            asyncio.get_running_loop(), getattr(broker, 'queue_size', SUBSCRIBER_QUEUE_SIZE))
+        keepalive = self.flask_app.config.get('SSE_KEEPALIVE_SECONDS', KEEPALIVE_SECONDS)
+        broker.subscribe(channel, subscription)
+        disconnected = asyncio.ensure_future(wait_disconnect(receive))
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]})
+            chunk = 'retry: 3000\n\n'
+            while True:
+                await send({'type': 'http.response.body', 'body': chunk.encode(),
+                            'more_body': True})
+                message = asyncio.ensure_future(subscription.queue.get())
+                done, _ = await asyncio.wait(
+                    (message, disconnected), timeout=keepalive,
+                    return_when=asyncio.FIRST_COMPLETED)
+                if message in done:
+                    chunk = message.result()
+                    continue
+                message.cancel()
+                if disconnected in done:
+                    return
+                chunk = ': keepalive\n\n'
+        finally:
+            disconnected.cancel()
+            broker.unsubscribe(channel, subscription)
+
+
+# Alkalmazásgyár az ASGI szerverekhez; a config a create_app-nak szól
+def create_asgi_app(config=None):
+    return AsgiApp(create_app(config))
@@ -0,0 +1,260 @@
+"""Az aszinkron kiszolgálás (asgi.py) sok egyidejű kapcsolattal.
+
+Futtatás a projekt gyökeréből:
+
+    python -m benchmarks.bench_asgi --streams 1000 --polls 2000
+    python -m benchmarks.bench_asgi --size medium --concurrency 100
+
+Ideiglenes SQLite adatbázisba a bench_lifecycle versenyeit játsszuk le, és
+egy félbehagyott körmérkőzéses eseményt is felveszünk. Először ellenőrizzük,
+hogy az aszinkron végpontok bájtra ugyanazt adják, mint az api blueprint.
+Ezután uvicorn alatt elindítjuk az alkalmazást, megnyitunk --streams élő
+folyamot, és közben --polls kérést küldünk a JSON végpontokra (a második
+körtől feltételesen, If-None-Match fejléccel, ahogy a kijelzők frissítenek).
+Mérjük a szerver memóriáját (RSS) a folyamok előtt és után, a kérések
+válaszidejét, és hogy az API-n rögzített eredmény mennyi idő alatt ér el
+minden nyitott folyamhoz.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_lifecycle import percentile, pending_matches, run, stage_ids
+from benchmarks.synthetic import SCENARIOS, random_score, seed_event
+
+HOST = '127.0.0.1'
+LIVE_TEAMS = 8
+PAYLOADS = ('matches', 'standings', 'bracket')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+def seed(app, sizes, seed_value):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        run(app, [scenario for size in sizes for scenario in SCENARIOS[size]], seed_value)
+    from models import Event
+    with app.app_context():
+        live_id = seed_event('round_robin', None, LIVE_TEAMS)
+    app.test_client().get(f'/create_groups/{live_id}', follow_redirects=True)
+    match_ids = [match_id for match_id, _ in pending_matches(
+        app, live_id, stage_ids(app, live_id, ('round_robin',)))]
+    with app.app_context():
+        event_ids = [event.id for event in Event.query.order_by(Event.id)]
+    return event_ids, live_id, match_ids
+
+
+def paths(event_ids):
+    return ['/api/events'] + [f'/api/events/{event_id}/{name}'
+                              for event_id in event_ids for name in PAYLOADS]
+
+
+# Az ASGI alkalmazás közvetlen hívása, szerver nélkül
+async def asgi_get(asgi_app, path):
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi_app({'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+                    'headers': [], 'http_version': '1.1', 'scheme': 'http',
+                    'root_path': '', 'server': (HOST, 80)}, receive, send)
+    return sent[0]['status'], b''.join(message.get('body', b'') for message in sent[1:])
+
+
+# Hideg gyorsítótárral mindkét oldal maga állítja elő a választ
+def check_parity(app, event_ids):
+    from asgi import AsgiApp
+    from page_cache import init_page_cache
+    asgi_app = AsgiApp(app)
+
+    async def collect():
+        results = [await asgi_get(asgi_app, path) for path in paths(event_ids)]
+        await asgi_app.engine.dispose()
+        return results
+
+    init_page_cache(app)
+    asynchronous = asyncio.run(collect())
+    init_page_cache(app)
+    client = app.test_client()
+    synchronous = [(response.status_code, response.data)
+                   for response in map(client.get, paths(event_ids))]
+    return sum(a == s for a, s in zip(asynchronous, synchronous)), len(synchronous)
+
+
+async def fetch(port, path, etag=None):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    head = f'GET {path} HTTP/1.1\r\nHost: {HOST}\r\nConnection: close\r\n'
+    if etag:
+        head += f'If-None-Match: {etag}\r\n'
+    writer.write((head + '\r\n').encode())
+    data = await reader.read()
+    writer.close()
+    found = re.search(rb'\r\netag: ([^\r]+)', data, re.IGNORECASE)
+    return int(data.split(b' ', 2)[1]), found.group(1).decode() if found else None
+
+
+async def open_stream(port, event_id):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    writer.write(f'GET /events/{event_id}/stream HTTP/1.1\r\nHost: {HOST}\r\n\r\n'.encode())
+    await writer.drain()
+    await reader.readuntil(b'retry: 3000')
+    return reader, writer
+
+
+# Üzenetenként (id: revízió) az érkezés ideje
+async def listen(reader, arrivals):
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        if line.startswith(b'id: '):
+            arrivals.setdefault(int(line[4:]), []).append(time.perf_counter())
+
+
+async def poll(port, targets, polls, concurrency):
+    etags = {}
+    times = []
+    statuses = {}
+    pending = iter(range(polls))
+
+    async def worker():
+        for number in pending:
+            path = targets[number % len(targets)]
+            start = time.perf_counter()
+            status, etag = await fetch(port, path, etags.get(path))
+            times.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+            etags[path] = etag
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return times, statuses, time.perf_counter() - start
+
+
+def post_result(port, event_id, match_id, rng):
+    import urllib.request
+    team1_score, team2_score = random_score(rng)
+    request = urllib.request.Request(
+        f'http://{HOST}:{port}/api/events/{event_id}/results', method='POST',
+        data=json.dumps([{'match_id': match_id, 'team1_score': team1_score,
+                          'team2_score': team2_score}]).encode(),
+        headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)['event']['revision']
+
+
+async def deliver(port, live_id, match_ids, streams, rng):
+    arrivals = {}
+    loop = asyncio.get_running_loop()
+    listeners = [asyncio.ensure_future(listen(reader, arrivals)) for reader, _ in streams]
+    delays = []
+    for match_id in match_ids:
+        start = time.perf_counter()
+        revision = await loop.run_in_executor(
+            None, post_result, port, live_id, match_id, rng)
+        while len(arrivals.get(revision, ())) < len(streams):
+            await asyncio.sleep(0.005)
+        delays.append((max(arrivals[revision]) - start) * 1000)
+    for listener in listeners:
+        listener.cancel()
+    return delays
+
+
+async def measure(port, pid, args, event_ids, live_id, match_ids):
+    idle = rss_mb(pid)
+    streams = []
+    for start in range(0, args.streams, 100):
+        streams += await asyncio.gather(*(open_stream(port, live_id)
+                                          for _ in range(start, min(start + 100, args.streams))))
+    loaded = rss_mb(pid)
+    times, statuses, seconds = await poll(port, paths(event_ids), args.polls, args.concurrency)
+    delays = await deliver(port, live_id, match_ids[:args.results], streams,
+                           random.Random(args.seed))
+    for _, writer in streams:
+        writer.close()
+    return idle, loaded, times, statuses, seconds, delays
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('az uvicorn nem indult el')
+        with contextlib.suppress(OSError), socket.create_connection((HOST, port), 0.2):
+            return
+        time.sleep(0.1)
+    raise RuntimeError('az uvicorn nem válaszol')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', nargs='+', choices=list(SCENARIOS), default=['small'])
+    parser.add_argument('--streams', type=int, default=1000, help='nyitott élő folyamok')
+    parser.add_argument('--polls', type=int, default=2000, help='JSON kérések száma')
+    parser.add_argument('--concurrency', type=int, default=50, help='egyidejű JSON kérések')
+    parser.add_argument('--results', type=int, default=10, help='rögzített eredmények')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    from app import create_app
+    path = os.path.join(tempfile.mkdtemp(), 'bench.sqlite')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path,
+                      'TESTING': True, 'WTF_CSRF_ENABLED': False,
+                      'QUERY_BUDGET_STRICT': False})
+    event_ids, live_id, match_ids = seed(app, args.size, args.seed)
+    same, total = check_parity(app, event_ids)
+    print(f'egyezés az api blueprint-tel: {same}/{total} válasz')
+
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'asgi:create_asgi_app', '--factory',
+         '--host', HOST, '--port', str(port), '--log-level', 'warning',
+         '--no-access-log', '--backlog', '4096'],
+        env=dict(os.environ, DATABASE_URL='sqlite:///' + path))
+    try:
+        wait_for_port(port, process)
+        idle, loaded, times, statuses, seconds, delays = asyncio.run(
+            measure(port, process.pid, args, event_ids, live_id, match_ids))
+    finally:
+        process.terminate()
+        process.wait()
+
+    if idle is not None:
+        print(f'szerver memória: {idle:.1f} MB indulás után, {loaded:.1f} MB '
+              f'{args.streams} folyammal ({(loaded - idle) * 1024 / max(args.streams, 1):.1f} KB/folyam)')
+    print(f'JSON kérések {args.streams} nyitott folyam mellett: {len(times) / seconds:.0f} kérés/s, '
+          f'p50 {percentile(times, 50):.2f} ms, p90 {percentile(times, 90):.2f} ms, '
+          f'p99 {percentile(times, 99):.2f} ms, állapotkódok {dict(sorted(statuses.items()))}')
+    if delays:
+        print(f'eredmény kézbesítése mind a {args.streams} folyamba: '
+              f'p50 {percentile(delays, 50):.1f} ms, max {max(delays):.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Kieséses ágrajz felépítése, kiemelt kitöltése és kiértékelése nagy mezőnyökre.
+
+Futtatás a projekt gyökeréből:
+
+    python -m benchmarks.bench_bracket
+"""
+import datetime
+import random
+import time
+
+from benchmarks.bench_fixtures import make_app
+from bracket import (advance_winner, create_knockout_bracket, fill_first_round,
+                     knockout_placements, stage_matches)
+from models import db, Event, Team
+from seeding import seed_bracket
+
+TEAM_COUNTS = (100, 1024, 1500, 4096)
+
+
+def seed_event(team_count):
+    event = Event(f'{team_count} csapat', datetime.date(2024, 1, 1),
+                  'football', 'knockout', None, False)
+    db.session.add(event)
+    db.session.flush()
+    teams = [Team(name=f'T{i}', event_id=event.id, group_id=None)
+             for i in range(team_count)]
+    db.session.add_all(teams)
+    db.session.commit()
+    return event.id, [team.id for team in teams]
+
+
+# Körönként minden mérkőzés eredménye, a győztes azonnal továbblép
+def play_all(stages):
+    for stage in stages:
+        for match in stage_matches(stage.id):
+            match.team1_score = random.randint(1, 5)
+            match.team2_score = match.team1_score - 1
+            advance_winner(match)
+        db.session.flush()
+
+
+def main():
+    app = make_app()
+    random.seed(1)
+    print(f'{"csapat":>6} {"felépítés (ms)":>15} {"kitöltés (ms)":>14} '
+          f'{"lejátszás (ms)":>15} {"végeredmény (ms)":>17}')
+    with app.app_context():
+        for team_count in TEAM_COUNTS:
+            event_id, team_ids = seed_event(team_count)
+            times = []
+            start = time.perf_counter()
+            stages = create_knockout_bracket(event_id, team_count)
+            db.session.commit()
+            times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            fill_first_round(stages, seed_bracket(team_ids))
+            db.session.commit()
+            times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            play_all(stages)
+            db.session.commit()
+            times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            placements = knockout_placements(event_id)
+            times.append(time.perf_counter() - start)
+            assert sum(len(teams) for _, teams in placements) == team_count
+            print(f'{team_count:6} ' + ' '.join(
+                f'{t * 1000:{w}.1f}' for t, w in zip(times, (15, 14, 15, 17))))
+
+
+if __name__ == '__main__':
+    main()
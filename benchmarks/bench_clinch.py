@@ -0,0 +1,47 @@
+"""Biztos továbbjutók és kiesők kiszámítása a csoportkör különböző pontjain.
+
+Futtatás a projekt gyökeréből:
+
+    python -m benchmarks.bench_clinch
+"""
+import random
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+from benchmarks.bench_simulation import synthetic_stage
+from clinch import qualification_status
+
+# (csoportok száma, csapat csoportonként)
+LAYOUTS = ((8, 4), (4, 6), (1, 20))
+PLAYED_SHARES = (0.25, 0.5, 0.75, 0.9)
+REPEATS = 10
+
+
+def main():
+    print(f'{"csoport":>8} {"csapat":>7} {"lejátszva":>10} {"átlag (ms)":>11} '
+          f'{"max (ms)":>9}  állapotok')
+    for event_type in ('group_knockout', 'round_robin'):
+        event = SimpleNamespace(sport_type='football', event_type=event_type)
+        print(event_type)
+        for group_count, group_size in LAYOUTS:
+            if event_type == 'round_robin' and group_count > 1:
+                continue
+            for share in PLAYED_SHARES:
+                random.seed(1)
+                times = []
+                statuses = Counter()
+                for _ in range(REPEATS):
+                    group_data, matches = synthetic_stage(group_count, group_size, share)
+                    start = time.perf_counter()
+                    status = qualification_status(event, group_data, matches)
+                    times.append(time.perf_counter() - start)
+                    for group in status.values():
+                        statuses.update(group.values())
+                print(f'{group_count:8} {group_size:7} {share:10.0%} '
+                      f'{sum(times) / len(times) * 1000:11.1f} {max(times) * 1000:9.1f}  '
+                      + ', '.join(f'{name}: {count}' for name, count in sorted(statuses.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Archívum export memóriaigénye folyamként és egyben betöltve.
+
+Futtatás a projekt gyökeréből:
+
+    python -m benchmarks.bench_export
+
+Egy ideiglenes SQLite adatbázist tölt fel egyre több szintetikus eseménnyel,
+és adathalmazonként méri az export idejét és a legnagyobb memóriafoglalást
+(tracemalloc). Folyamként a csúcs közel állandó, egyben betöltve az
+archívummal együtt nő.
+"""
+import random
+import time
+import tracemalloc
+
+from sqlalchemy import insert, select
+
+from benchmarks.bench_fixtures import make_app
+from benchmarks.bench_indexes import seed
+from export import DATASETS, FORMATS, export_response
+from models import db, Standing, Team
+
+EVENT_COUNTS = (250, 1000, 4000)
+STREAMED = ('teams', 'matches', 'standings')
+
+
+def seed_standings():
+    rows = [{'event_id': event_id, 'group_id': group_id, 'team_id': team_id,
+             'played': 3, 'wins': 1, 'draws': 1, 'losses': 1, 'scored': 4,
+             'conceded': 4, 'points': random.randint(0, 9)}
+            for team_id, event_id, group_id in db.session.execute(
+                select(Team.id, Team.event_id, Team.group_id))]
+    db.session.execute(insert(Standing), rows)
+    db.session.commit()
+
+
+def measure(run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def streamed(app, dataset):
+    with app.test_request_context():
+        response = export_response(dataset, 'csv')
+        return sum(len(chunk) for chunk in response.response)
+
+
+def loaded(app, dataset):
+    fields, rows = DATASETS[dataset]
+    _, chunks = FORMATS['csv']
+    with app.test_request_context():
+        return len(''.join(chunks(fields, list(rows(None)))))
+
+
+def main():
+    random.seed(42)
+    print(f'{"esemény":>8} {"adathalmaz":>11} {"méret (kB)":>11} {"folyam (ms)":>12} '
+          f'{"csúcs (kB)":>11} {"egyben (ms)":>12} {"csúcs (kB)":>11}')
+    for event_count in EVENT_COUNTS:
+        app = make_app()
+        with app.app_context():
+            with db.engine.begin() as conn:
+                seed(conn, event_count)
+            seed_standings()
+        for dataset in STREAMED:
+            size, stream_time, stream_peak = measure(lambda: streamed(app, dataset))
+            _, load_time, load_peak = measure(lambda: loaded(app, dataset))
+            print(f'{event_count:8} {dataset:>11} {size / 1024:11.0f} '
+                  f'{stream_time * 1000:12.0f} {stream_peak / 1024:11.0f} '
+                  f'{load_time * 1000:12.0f} {load_peak / 1024:11.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Körmérkőzéses sorsolás ideje soronkénti ORM mentéssel és tömeges INSERT-tel.
+
+Futtatás a projekt gyökeréből:
+
+    python -m benchmarks.bench_fixtures
+"""
+import datetime
+import os
+import tempfile
+import time
+
+from flask import Flask
+
+from fixtures import create_round_robin_fixtures, round_robin_pairings
+from models import db, Event, Group, Match, Team
+
+TEAM_COUNTS = (16, 64, 256)
+
+
+def make_app():
+    app = Flask(__name__)
+    path = os.path.join(tempfile.mkdtemp(), 'bench.sqlite')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + path
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed_event(team_count):
+    event = Event(f'{team_count} csapat', datetime.date(2024, 1, 1),
+                  'football', 'round_robin', None, False)
+    db.session.add(event)
+    db.session.flush()
+    group = Group(name='RR', event_id=event.id)
+    teams = [Team(name=f'T{i}', event_id=event.id, group_id=None)
+             for i in range(team_count)]
+    db.session.add(group)
+    db.session.add_all(teams)
+    db.session.commit()
+    return event.id, group.id, [team.id for team in teams]
+
+
+# A korábbi megoldás: minden mérkőzés külön ORM objektum
+def orm_fixtures(event_id, group_teams):
+    [(group_id, team_ids)] = group_teams.items()
+    for _, team1_id, team2_id in round_robin_pairings(team_ids):
+        db.session.add(Match(event_id=event_id, group_id=group_id,
+                             team1_id=team1_id, team2_id=team2_id,
+                             team1_score=None, team2_score=None))
+
+
+def timed(generate, team_count):
+    event_id, group_id, team_ids = seed_event(team_count)
+    start = time.perf_counter()
+    generate(event_id, {group_id: team_ids})
+    db.session.commit()
+    return time.perf_counter() - start
+
+
+def main():
+    app = make_app()
+    print(f'{"csapat":>6} {"mérkőzés":>9} {"ORM (ms)":>10} {"tömeges (ms)":>13}')
+    with app.app_context():
+        for team_count in TEAM_COUNTS:
+            orm = timed(orm_fixtures, team_count)
+            bulk = timed(create_round_robin_fixtures, team_count)
+            matches = team_count * (team_count - 1) // 2
+            print(f'{team_count:6} {matches:9} {orm * 1000:10.1f} {bulk * 1000:13.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Újrarenderelés egyetlen eredmény után: csoportonkénti részletek nélkül és
+velük.
+
+Futtatás a projekt gyökeréből:
+
+    python -m benchmarks.bench_fragments --groups 8 --teams 8 --results 40
+
+Egy csoportkörös eseményt ideiglenes SQLite adatbázisban sorsolunk ki, és a
+mérkőzések felét előre lejátsszuk. Ezután eredményenként egy mérkőzést
+rögzítünk, majd megnyitjuk a csoportok áttekintését és a mérkőzésválasztó
+oldalt, ahogy a szervező és a kijelzők teszik. Mindkét oldal teljes
+gyorsítótára az eredménnyel érvénytelenné válik, a csoportonkénti részletek
+közül viszont csak az érintett csoporté. Összehasonlítás: részletek nélkül
+(FRAGMENT_CACHE_MAX_BYTES=0) és az alapbeállítással.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.bench_lifecycle import percentile, pending_matches, stage_ids
+from benchmarks.synthetic import random_score, seed_event
+from page_cache import DEFAULT_FRAGMENT_MAX_BYTES
+
+
+def prepare(app, groups, teams, rng):
+    from models import db, Team
+    with app.app_context():
+        db.create_all()
+        event_id = seed_event('group_knockout', groups, groups * teams)
+    client = app.test_client()
+    client.get(f'/create_groups/{event_id}', follow_redirects=True)
+    group_ids = stage_ids(app, event_id, ('group',))
+    with app.app_context():
+        team_ids = [team.id for team in Team.query.filter_by(event_id=event_id).order_by(Team.id)]
+    for i, team_id in enumerate(team_ids):
+        client.post(f'/assign_team_to_group/{event_id}',
+                    data={'team': team_id, 'group': group_ids[i % len(group_ids)]})
+    client.get(f'/create_group_matches/{event_id}', follow_redirects=True)
+    matches = pending_matches(app, event_id, group_ids)
+    rng.shuffle(matches)
+    half = len(matches) // 2
+    rows = []
+    for match_id, _ in matches[:half]:
+        team1_score, team2_score = random_score(rng)
+        rows.append({'match_id': match_id, 'team1_score': team1_score,
+                     'team2_score': team2_score})
+    client.post(f'/api/events/{event_id}/results', json=rows)
+    return event_id, [match_id for match_id, _ in matches[half:]]
+
+
+def run(fragment_bytes, args):
+    from app import create_app
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.sqlite'),
+        'TESTING': True, 'WTF_CSRF_ENABLED': False, 'QUERY_BUDGET_STRICT': False,
+        'FRAGMENT_CACHE_MAX_BYTES': fragment_bytes})
+    rng = random.Random(args.seed)
+    event_id, pending = prepare(app, args.groups, args.teams, rng)
+    client = app.test_client()
+    pages = {'groups_overview': f'/groups_overview/{event_id}',
+             'select_match': f'/select_match/{event_id}'}
+    # Első megnyitás: a részletek betöltése
+    for url in pages.values():
+        client.get(url)
+    times = {name: [] for name in pages}
+    for match_id in pending[:args.results]:
+        team1_score, team2_score = random_score(rng)
+        client.post(f'/enter_result/{event_id}/{match_id}',
+                    data={'team1_score': team1_score, 'team2_score': team2_score})
+        for name, url in pages.items():
+            start = time.perf_counter()
+            response = client.get(url)
+            times[name].append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f'{url}: {response.status_code}')
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--groups', type=int, default=8)
+    parser.add_argument('--teams', type=int, default=8, help='csapatok csoportonként')
+    parser.add_argument('--results', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f'{args.groups} csoport, csoportonként {args.teams} csapat, {args.results} eredmény')
+    print(f'{"mód":16} {"oldal":16} {"p50 (ms)":>9} {"p90 (ms)":>9} {"max (ms)":>9}')
+    for mode, fragment_bytes in (('részletek nélkül', 0),
+                                 ('részletekkel', DEFAULT_FRAGMENT_MAX_BYTES)):
+        times = run(fragment_bytes, args)
+        for name, values in times.items():
+            print(f'{mode:16} {name:16} {percentile(values, 50):9.2f} '
+                  f'{percentile(values, 90):9.2f} {max(values):9.2f}')
+
+
+if __name__ == '__main__':
+    main()
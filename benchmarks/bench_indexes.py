@@ -0,0 +1,138 @@
+"""Indexek hatása a leggyakoribb szűrésekre.
+
+Futtatás a projekt gyökeréből:
+
+    python -m benchmarks.bench_indexes --events 3000
+
+Két ideiglenes SQLite adatbázist tölt fel ugyanazokkal a szintetikus
+eseményekkel, és ugyanazokat a lekérdezéseket méri mindkettőn. Az
+összehasonlító séma se indexeket, se egyedi kulcsokat nem tartalmaz: az
+egyedi kulcsokhoz az SQLite maga is indexet készít (groups (event_id, kind,
+name), matches (group_id, team1_id, team2_id)), ami a mérést torzítaná.
+"""
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import MetaData, UniqueConstraint, create_engine, insert, select
+
+from models import db, Event, Team, Group, Match
+
+TEAMS_PER_GROUP = 4
+GROUPS_PER_EVENT = 4
+
+
+def seed(conn, num_of_events):
+    events, groups, teams, matches = [], [], [], []
+    group_id = team_id = 0
+    for event_id in range(1, num_of_events + 1):
+        events.append({'id': event_id, 'name': f'Esemény {event_id}',
+                       'date': datetime.date(2024, 1, 1), 'sport_type': 'football',
+                       'event_type': 'group_knockout',
+                       'num_of_groups': GROUPS_PER_EVENT, 'is_ended': False})
+        for index in range(GROUPS_PER_EVENT):
+            group_id += 1
+            groups.append({'id': group_id, 'name': chr(ord('A') + index),
+                           'event_id': event_id})
+            group_team_ids = []
+            for _ in range(TEAMS_PER_GROUP):
+                team_id += 1
+                group_team_ids.append(team_id)
+                teams.append({'id': team_id, 'name': f'T{team_id}',
+                              'event_id': event_id, 'group_id': group_id})
+            for i in range(len(group_team_ids)):
+                for j in range(i + 1, len(group_team_ids)):
+                    matches.append({'event_id': event_id, 'group_id': group_id,
+                                    'team1_id': group_team_ids[i],
+                                    'team2_id': group_team_ids[j],
+                                    'team1_score': random.randint(0, 4),
+                                    'team2_score': random.randint(0, 4)})
+    conn.execute(insert(Event.__table__), events)
+    conn.execute(insert(Group.__table__), groups)
+    conn.execute(insert(Team.__table__), teams)
+    conn.execute(insert(Match.__table__), matches)
+    return group_id, team_id
+
+
+def queries(num_of_events, num_of_groups, num_of_teams):
+    event_id = random.randint(1, num_of_events)
+    group_id = random.randint(1, num_of_groups)
+    team_id = random.randint(1, num_of_teams)
+    return {
+        'matches (event_id, group_id)': select(Match.__table__).where(
+            Match.event_id == event_id, Match.group_id == group_id),
+        'matches team1_id / team2_id': select(Match.__table__).where(
+            (Match.team1_id == team_id) | (Match.team2_id == team_id)),
+        'teams group_id': select(Team.__table__).where(
+            Team.group_id == group_id),
+        'teams event_id': select(Team.__table__).where(
+            Team.event_id == event_id),
+        'groups event_id': select(Group.__table__).where(
+            Group.event_id == event_id),
+    }
+
+
+def measure(conn, sizes, repeat):
+    totals = {}
+    for _ in range(repeat):
+        for name, statement in queries(*sizes).items():
+            start = time.perf_counter()
+            conn.execute(statement).fetchall()
+            totals[name] = totals.get(name, 0) + time.perf_counter() - start
+    return {name: total / repeat * 1e6 for name, total in totals.items()}
+
+
+# A models sémája indexek és egyedi kulcsok nélkül
+def bare_metadata():
+    metadata = MetaData()
+    for table in db.metadata.sorted_tables:
+        table = table.to_metadata(metadata)
+        table.indexes.clear()
+        for constraint in [constraint for constraint in table.constraints
+                           if isinstance(constraint, UniqueConstraint)]:
+            table.constraints.discard(constraint)
+    return metadata
+
+
+def prepare(metadata, num_of_events):
+    random.seed(42)
+    engine = create_engine('sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.sqlite'))
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        num_of_groups, num_of_teams = seed(conn, num_of_events)
+        conn.exec_driver_sql('ANALYZE')
+    return engine, (num_of_events, num_of_groups, num_of_teams)
+
+
+def run(metadata, args):
+    engine, sizes = prepare(metadata, args.events)
+    with engine.connect() as conn:
+        # Ellenőrzés: az összehasonlító sémában egyetlen index sem maradhat
+        indexes = conn.exec_driver_sql(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index'").scalar()
+        random.seed(1)
+        return measure(conn, sizes, args.repeat), sizes, indexes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=3000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    before, _, bare_indexes = run(bare_metadata(), args)
+    after, (_, _, num_of_teams), _ = run(db.metadata, args)
+    if bare_indexes:
+        raise RuntimeError(f'az összehasonlító sémában {bare_indexes} index maradt')
+
+    print(f'{args.events} esemény, {num_of_teams} csapat')
+    print(f'{"lekérdezés":32} {"index nélkül (µs)":>18} {"indexszel (µs)":>15}')
+    for name in before:
+        print(f'{name:32} {before[name]:18.1f} {after[name]:15.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+"""Teljes versenyek lejátszása az útvonalakon keresztül: válaszidő
+percentilisek, SQL lekérdezések száma és memóriacsúcs útvonalanként.
+
+Futtatás a projekt gyökeréből:
+
+    python -m benchmarks.bench_lifecycle --size small medium --repeat 3
+    python -m benchmarks.bench_lifecycle --output elotte.json
+    python -m benchmarks.bench_lifecycle --compare elotte.json
+    python -m benchmarks.bench_lifecycle --size medium --repeat 1
+
+Minden futás friss, ideiglenes SQLite adatbázist kap (a séma a models.py
+alapján), az eredményeket a --seed értékéből sorsoljuk, így két commit mérése
+összevethető. Eseménytípusonként a szokásos sorrendben hívjuk az útvonalakat
+(csoportok, sorsolás, eredmények, továbbjutás, kieséses körök, végeredmény),
+az átirányításokat is követve. A memóriacsúcsot (tracemalloc, a kérés alatt
+lefoglalt többlet) egy külön futás méri, hogy a nyomkövetés ne torzítsa a
+válaszidőket. Ha bármely útvonal túllépi a QUERY_BUDGETS keretét (a
+táblázatban "!"), a futás a túllépések listájával, hibakóddal áll le; a
+medium méret a 64 csapatos, 8 csoportos csoportkört is lejátssza.
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+from benchmarks.synthetic import SCENARIOS, random_score, scenario_name, seed_event
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+# Útvonalanként gyűjti a mintákat; a végpont nevét az URL-ből határozzuk meg
+class Recorder:
+
+    def __init__(self, app, trace_memory=False):
+        self.client = app.test_client()
+        self.adapter = app.url_map.bind('localhost')
+        self.trace_memory = trace_memory
+        self.samples = {}
+
+    def request(self, method, url, data=None):
+        endpoint, _ = self.adapter.match(urlsplit(url).path, method=method)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        response = self.client.open(url, method=method, data=data)
+        elapsed = time.perf_counter() - start
+        if response.status_code not in (200, 302):
+            raise RuntimeError(f'{method} {url}: {response.status_code}')
+        sample = self.samples.setdefault(
+            endpoint, {'times': [], 'queries': [], 'memory': []})
+        sample['times'].append(elapsed)
+        sample['queries'].append(int(response.headers.get('X-Query-Count', 0)))
+        if self.trace_memory:
+            sample['memory'].append(tracemalloc.get_traced_memory()[1] - before)
+        if response.status_code == 302:
+            return self.request('GET', response.location)
+        return response
+
+
+def pending_matches(app, event_id, group_ids):
+    from models import db, Match
+    with app.app_context():
+        return db.session.query(Match.id, Match.round_number).filter(
+            Match.event_id == event_id, Match.group_id.in_(group_ids),
+            Match.team1_id.isnot(None), Match.team2_id.isnot(None),
+            Match.team1_score.is_(None)).order_by(
+            Match.round_number, Match.group_id, Match.id).all()
+
+
+def stage_ids(app, event_id, kinds):
+    from models import Group
+    with app.app_context():
+        return [group.id for group in Group.query.filter(
+            Group.event_id == event_id, Group.kind.in_(kinds)).order_by(
+            Group.stage_order, Group.id)]
+
+
+# Mérkőzésenként az űrlap megnyitása és mentése; fordulónként az áttekintő
+# oldalak is, ahogy a szervezők és a kijelzők nézik
+def play(recorder, rng, event_id, matches, draws, pages=()):
+    current_round = None
+    for match_id, round_number in matches:
+        if round_number != current_round and current_round is not None:
+            for page in pages:
+                recorder.request('GET', page)
+        current_round = round_number
+        url = f'/enter_result/{event_id}/{match_id}'
+        recorder.request('GET', url)
+        team1_score, team2_score = random_score(rng, draws)
+        recorder.request('POST', url, {'team1_score': team1_score,
+                                       'team2_score': team2_score})
+    for page in pages:
+        recorder.request('GET', page)
+
+
+def play_knockout(app, recorder, rng, event_id):
+    for group_id in stage_ids(app, event_id, ('knockout',)):
+        recorder.request('GET', f'/list_knockout_stage_matches/{event_id}/{group_id}')
+        play(recorder, rng, event_id, pending_matches(app, event_id, [group_id]), False)
+        recorder.request('GET', f'/knockout_stage/{event_id}/{group_id}')
+
+
+def round_robin(app, recorder, rng, event_id):
+    recorder.request('GET', f'/create_groups/{event_id}')
+    group_ids = stage_ids(app, event_id, ('round_robin',))
+    play(recorder, rng, event_id, pending_matches(app, event_id, group_ids), True,
+         [f'/round_robin_overview/{event_id}'])
+    recorder.request('GET', f'/close_round_robin_event/{event_id}')
+
+
+def knockout(app, recorder, rng, event_id):
+    recorder.request('GET', f'/create_groups/{event_id}')
+    play_knockout(app, recorder, rng, event_id)
+
+
+def group_knockout(app, recorder, rng, event_id):
+    from models import Team
+    recorder.request('GET', f'/create_groups/{event_id}')
+    group_ids = stage_ids(app, event_id, ('group',))
+    with app.app_context():
+        team_ids = [team.id for team in Team.query.filter_by(
+            event_id=event_id).order_by(Team.id)]
+    for i, team_id in enumerate(team_ids):
+        recorder.request('POST', f'/assign_team_to_group/{event_id}',
+                         {'team': team_id, 'group': group_ids[i % len(group_ids)]})
+    recorder.request('GET', f'/create_group_matches/{event_id}')
+    play(recorder, rng, event_id, pending_matches(app, event_id, group_ids), True,
+         [f'/select_match/{event_id}', f'/groups_overview/{event_id}'])
+    recorder.request('GET', f'/advance_to_knockout/{event_id}')
+    play_knockout(app, recorder, rng, event_id)
+
+
+LIFECYCLES = {
+    'round_robin': round_robin,
+    'knockout': knockout,
+    'group_knockout': group_knockout,
+}
+
+
+def run(app, scenarios, seed, trace_memory=False):
+    from models import db
+    from page_cache import init_page_cache
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    # Az azonosítók újraindulnak, a régi bejegyzések nem maradhatnak
+    init_page_cache(app)
+    rng = random.Random(seed)
+    results = {}
+    for scenario in scenarios:
+        with app.app_context():
+            event_id = seed_event(*scenario)
+        recorder = Recorder(app, trace_memory)
+        LIFECYCLES[scenario[0]](app, recorder, rng, event_id)
+        recorder.request('GET', f'/event_result/{event_id}')
+        recorder.request('GET', f'/manage_event/{event_id}')
+        results[scenario_name(*scenario)] = recorder.samples
+    return results
+
+
+def merge(total, results):
+    for scenario, samples in results.items():
+        for endpoint, sample in samples.items():
+            merged = total.setdefault(scenario, {}).setdefault(
+                endpoint, {'times': [], 'queries': [], 'memory': []})
+            for key, values in sample.items():
+                merged[key].extend(values)
+
+
+def summarize(total):
+    summary = {}
+    for scenario, samples in total.items():
+        summary[scenario] = {}
+        for endpoint, sample in samples.items():
+            times = [value * 1000 for value in sample['times']]
+            row = {'count': len(times), 'max_ms': round(max(times), 3),
+                   'queries': max(sample['queries']),
+                   'peak_kb': round(max(sample['memory'], default=0) / 1024, 1)}
+            for p in PERCENTILES:
+                row[f'p{p}_ms'] = round(percentile(times, p), 3)
+            summary[scenario][endpoint] = row
+    return summary
+
+
+def print_summary(summary, budgets, baseline=None):
+    header = ' '.join(f'{f"p{p} (ms)":>9}' for p in PERCENTILES)
+    for scenario, rows in summary.items():
+        print(f'\n{scenario}')
+        print(f'{"útvonal":40} {"db":>5} {header} {"max (ms)":>9} '
+              f'{"SQL":>4} {"csúcs (kB)":>11}' + ('  p50 változás' if baseline else ''))
+        for endpoint, row in sorted(rows.items()):
+            budget = budgets.get(endpoint)
+            over = '!' if budget is not None and row['queries'] > budget else ' '
+            line = (f'{endpoint:40} {row["count"]:5} '
+                    + ' '.join(f'{row[f"p{p}_ms"]:9.2f}' for p in PERCENTILES)
+                    + f' {row["max_ms"]:9.2f} {row["queries"]:4}{over}{row["peak_kb"]:10.1f}')
+            old = (baseline or {}).get(scenario, {}).get(endpoint)
+            if old:
+                change = (row['p50_ms'] / old['p50_ms'] - 1) * 100 if old['p50_ms'] else 0
+                line += f'  {change:+6.1f}%'
+                if row['queries'] != old['queries']:
+                    line += f' SQL {old["queries"]} -> {row["queries"]}'
+            print(line)
+
+
+def budget_overruns(summary, budgets):
+    return [f'{scenario} {endpoint}: {row["queries"]} SQL lekérdezés, a keret {budgets[endpoint]}'
+            for scenario, rows in summary.items() for endpoint, row in sorted(rows.items())
+            if endpoint in budgets and row['queries'] > budgets[endpoint]]
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', nargs='+', choices=list(SCENARIOS), default=['small'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='az összesítés mentése JSON fájlba')
+    parser.add_argument('--compare', help='korábbi --output fájl, ehhez viszonyítunk')
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.sqlite'),
+        'TESTING': True, 'WTF_CSRF_ENABLED': False, 'QUERY_BUDGET_STRICT': False})
+    scenarios = [scenario for size in args.size for scenario in SCENARIOS[size]]
+
+    total = {}
+    # A nézetek esetleges hibakereső kiírásai ne keveredjenek a jelentésbe
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for repeat in range(args.repeat):
+            merge(total, run(app, scenarios, args.seed + repeat))
+        tracemalloc.start()
+        memory = run(app, scenarios, args.seed, trace_memory=True)
+        tracemalloc.stop()
+    for scenario, samples in memory.items():
+        for endpoint, sample in samples.items():
+            total[scenario][endpoint]['memory'] = sample['memory']
+
+    summary = summarize(total)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+    print_summary(summary, app.config['QUERY_BUDGETS'], baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({'commit': current_commit(), 'sizes': args.size,
+                       'repeat': args.repeat, 'seed': args.seed,
+                       'results': summary}, file, ensure_ascii=False, indent=2)
+    overruns = budget_overruns(summary, app.config['QUERY_BUDGETS'])
+    if overruns:
+        sys.exit('\n'.join(['\nlekérdezés-keret túllépés:'] + overruns))
+
+
+if __name__ == '__main__':
+    main()
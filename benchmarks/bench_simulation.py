@@ -0,0 +1,142 @@
+"""Továbbjutási esélyek szimulációja félig lejátszott csoportkörökre.
+
+Futtatás a projekt gyökeréből:
+
+    python -m benchmarks.bench_simulation
+
+A mérés előtt sportáganként ellenőrizzük, hogy a sorsolt gólok átlaga a
+várható gólszám, hogy az eddig jobban szereplő csapat továbbjutási esélye
+az egyenletes (továbbjutók / csapatok) fölött van, és hogy hátralévő
+mérkőzés nélkül a szimuláció a tabella (ranking.rank_rows) sorrendjét adja;
+ha nem, a futás hibakóddal áll le.
+"""
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from fixtures import round_robin_pairings
+from ranking import RANKING_RULES, rank_rows, ranking_rules
+from seeding import qualifiers_per_group
+from simulation import (MODELS, SIMULATIONS, goal_tables, qualification_probabilities,
+                        simulate_group)
+from standings import result_contribution, standing_to_row
+
+# (csoportok száma, csapat csoportonként)
+LAYOUTS = ((8, 4), (4, 6), (1, 20))
+# Sportáganként jellemző (győztes, vesztes) eredmény
+SPORT_SCORES = {'football': (2, 1), 'handball': (30, 26), 'basketball': (88, 80),
+                'volleyball': (3, 1)}
+
+
+# Szintetikus csoportkör: a mérkőzések adott hányada lejátszva, a többi hátravan
+def synthetic_stage(group_count, group_size, played_share=0.5):
+    group_data = {}
+    matches = []
+    team_id = 0
+    for group_index in range(group_count):
+        team_ids = list(range(team_id, team_id + group_size))
+        team_id += group_size
+        stats = {tid: dict(played=0, wins=0, draws=0, losses=0, scored=0,
+                           conceded=0, points=0) for tid in team_ids}
+        pairings = list(round_robin_pairings(team_ids))
+        for number, (_, team1_id, team2_id) in enumerate(pairings):
+            if number < int(len(pairings) * played_share):
+                score1, score2 = random.randint(0, 3), random.randint(0, 3)
+                for tid, scored, conceded in ((team1_id, score1, score2),
+                                              (team2_id, score2, score1)):
+                    for field, value in result_contribution(scored, conceded).items():
+                        stats[tid][field] += value
+            else:
+                score1 = score2 = None
+            matches.append((group_index, team1_id, team2_id, score1, score2))
+        rows = [standing_to_row(SimpleNamespace(team_id=tid, **stats[tid]), f'T{tid}')
+                for tid in team_ids]
+        rows.sort(key=lambda x: (x['points'], x['goal_difference']), reverse=True)
+        group_data[chr(ord('A') + group_index)] = rows
+    return group_data, matches
+
+
+# Négycsapatos csoport, az első forduló után: az 1. csapat nyert a 2. ellen,
+# a 3. és a 4. döntetlent játszott. Az 1. csapatnak minden modellben az
+# egyenletesnél nagyobb eséllyel kell továbbjutnia.
+def sanity_check(simulations=20_000):
+    failures = []
+    for sport_type, (winner, loser) in SPORT_SCORES.items():
+        rate = (winner + loser) / 2
+        mean = float(goal_tables(np.array([rate])).mean())
+        if abs(mean - rate) > 0.02 * rate:
+            failures.append(f'{sport_type}: gólátlag {mean:.2f} a várt {rate:.2f} helyett')
+        rules = ranking_rules(sport_type)
+        event = SimpleNamespace(sport_type=sport_type, event_type='group_knockout')
+        stats = {tid: dict(played=0, wins=0, draws=0, losses=0, scored=0,
+                           conceded=0, points=0) for tid in range(4)}
+        played = [(0, 1, winner, loser), (2, 3, loser, loser)]
+        for team1_id, team2_id, score1, score2 in played:
+            for tid, scored, conceded in ((team1_id, score1, score2),
+                                          (team2_id, score2, score1)):
+                for field, value in result_contribution(scored, conceded, rules).items():
+                    stats[tid][field] += value
+        matches = [(0, team1_id, team2_id, score1, score2)
+                   for team1_id, team2_id, score1, score2 in played]
+        matches += [(0, team1_id, team2_id, None, None)
+                    for team1_id, team2_id in ((0, 2), (0, 3), (1, 2), (1, 3))]
+        rows = [standing_to_row(SimpleNamespace(team_id=tid, **stats[tid]), f'T{tid}')
+                for tid in range(4)]
+        uniform = qualifiers_per_group(event) / len(rows)
+        for model in MODELS:
+            qualify = qualification_probabilities(
+                event, {'A': rows}, matches, simulations, model, seed=1)['A'][0]['qualify']
+            print(f'{sport_type:>10} {model:>9} erősebb csapat: {qualify:.3f} '
+                  f'(egyenletes {uniform:.3f})')
+            if not uniform < qualify < 1:
+                failures.append(f'{sport_type}/{model}')
+    return failures
+
+
+# Azonos pontszámú csapatok, amelyeket a sportágak más-más szempontja bont
+# szét (győzelmek, gólkülönbség, lőtt gól). Hátralévő mérkőzés nélkül a
+# szimulált sorrendnek minden sportágnál a tabelláéval kell egyeznie.
+def ordering_check(simulations=1000):
+    rows = [
+        {'team_id': 0, 'points': 3, 'wins': 1, 'goal_difference': -2, 'scored_goals': 4},
+        {'team_id': 1, 'points': 6, 'wins': 1, 'goal_difference': 5, 'scored_goals': 7},
+        {'team_id': 2, 'points': 6, 'wins': 2, 'goal_difference': 1, 'scored_goals': 5},
+        {'team_id': 3, 'points': 6, 'wins': 1, 'goal_difference': 5, 'scored_goals': 9},
+    ]
+    for row in rows:
+        row.update(played_games=3, conceded_goals=row['scored_goals'] - row['goal_difference'])
+    failures = []
+    for sport_type, rules in RANKING_RULES.items():
+        expected = [row['team_id'] for row in rank_rows(rows, rules)]
+        positions = simulate_group(rows, [], rules, simulations, 'uniform',
+                                   np.random.default_rng(1))
+        simulated = [rows[i]['team_id'] for i in positions.argmax(axis=0)]
+        if simulated != expected or positions.max(axis=0).min() < 1:
+            failures.append(f'{sport_type}: sorrend {simulated} a {expected} helyett')
+    return failures
+
+
+def main():
+    failures = sanity_check() + ordering_check()
+    if failures:
+        sys.exit(f'hibás továbbjutási esély: {", ".join(failures)}')
+    random.seed(1)
+    event = SimpleNamespace(sport_type='football', event_type='group_knockout')
+    print(f'{"csoport":>8} {"csapat":>7} {"hátralévő":>10} {"modell":>9} {"idő (ms)":>9}')
+    for group_count, group_size in LAYOUTS:
+        group_data, matches = synthetic_stage(group_count, group_size)
+        pending = sum(1 for match in matches if match[3] is None)
+        for model in ('uniform', 'strength'):
+            start = time.perf_counter()
+            qualification_probabilities(event, group_data, matches,
+                                        SIMULATIONS, model, seed=1)
+            elapsed = time.perf_counter() - start
+            print(f'{group_count:8} {group_size:7} {pending:10} {model:>9} '
+                  f'{elapsed * 1000:9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Indulási idő: az app importálása, create_app() és az első kérés.
+
+Futtatás a projekt gyökeréből:
+
+    python -m benchmarks.bench_startup --repeat 5
+    python -m benchmarks.bench_startup --path /groups_overview/3 --top 25
+
+Minden mérés friss Python folyamatban fut, ahogy egy új munkafolyamat
+(gunicorn worker) indul. Az első rész a `python -X importtime -c "import app"`
+kimenetéből a legdrágább modulokat listázza (a modul és az általa betöltött
+modulok együttes ideje, mediánnal). A második rész a folyamat indításától az
+első válaszig eltelt időt bontja fel (import, create_app, első kérés), és
+kiírja, hogy a csak egyes oldalakhoz kellő, lassan importálódó csomagok
+(numpy, alembic) betöltődtek-e. Az első kérés egy ideiglenes, üres SQLite
+adatbázison fut.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ('numpy', 'alembic', 'flask_migrate')
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+FIRST_REQUEST = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app({'SQLALCHEMY_DATABASE_URI': sys.argv[1]})
+created = time.perf_counter()
+response = application.test_client().get(sys.argv[2])
+done = time.perf_counter()
+print(json.dumps({'import': imported - start, 'create_app': created - imported,
+                  'request': done - created, 'status': response.status_code,
+                  'loaded': [name for name in sys.argv[3:] if name in sys.modules]}))
+'''
+
+
+# Modulonként a kumulált idő (ms) és a beágyazás mélysége
+def import_times():
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    times = {}
+    for line in output.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            depth = (len(match.group(3)) - 1) // 2
+            times[match.group(4)] = (int(match.group(2)) / 1000, depth)
+    return times
+
+
+def first_request(url, path):
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', FIRST_REQUEST, url, path, *LAZY_MODULES],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    total = time.perf_counter() - start
+    return dict(json.loads(output.splitlines()[-1]), total=total)
+
+
+def prepare_database():
+    sys.path.insert(0, ROOT)
+    from app import create_app
+    from models import db
+    url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'startup.sqlite')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    with app.app_context():
+        db.create_all()
+        db.engine.dispose()
+    return url
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--path', default='/list', help='az első kérés útvonala')
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.repeat)]
+    modules = {name: (statistics.median(run[name][0] for run in runs if name in run), depth)
+               for name, (_, depth) in runs[0].items()}
+    print(f'python -X importtime -c "import app" (medián, {args.repeat} futás)')
+    print(f'{"modul":48} {"kumulált (ms)":>14}')
+    for name, (cumulative, depth) in sorted(
+            modules.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f'{"  " * depth + name:48} {cumulative:14.1f}')
+
+    url = prepare_database()
+    results = [first_request(url, args.path) for _ in range(args.repeat)]
+    print(f'\nelső kérés: GET {args.path} (HTTP {results[0]["status"]})')
+    print(f'{"szakasz":16} {"medián (ms)":>12} {"min (ms)":>10}')
+    for key in ('import', 'create_app', 'request', 'total'):
+        values = [result[key] * 1000 for result in results]
+        label = 'összesen' if key == 'total' else key
+        print(f'{label:16} {statistics.median(values):12.1f} {min(values):10.1f}')
+    loaded = sorted({name for result in results for name in result['loaded']})
+    print(f"\nbetöltve az első kérés után: {', '.join(loaded) or '-'} "
+          f"(figyelt: {', '.join(LAZY_MODULES)})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Szintetikus versenyek a teljesítménymérésekhez.
+
+Minden eseménytípusból (körmérkőzés, kieséses, csoportkörös 2, 4 és 8
+csoporttal) méretenként egy-egy esemény. Az eseményt és a nevezett
+csapatokat közvetlenül az adatbázisba írjuk, a többi lépést (csoportok,
+sorsolás, eredmények) már az alkalmazás útvonalai végzik.
+"""
+import datetime
+
+from models import db, Event, Team
+
+# Méretenként (eseménytípus, csoportok száma, csapatok száma)
+SCENARIOS = {
+    'small': [('round_robin', None, 6), ('knockout', None, 16),
+              ('group_knockout', 2, 8), ('group_knockout', 4, 16),
+              ('group_knockout', 8, 32)],
+    'medium': [('round_robin', None, 12), ('knockout', None, 64),
+               ('group_knockout', 2, 16), ('group_knockout', 4, 32),
+               ('group_knockout', 8, 64)],
+    'large': [('round_robin', None, 24), ('knockout', None, 256),
+              ('group_knockout', 2, 32), ('group_knockout', 4, 64),
+              ('group_knockout', 8, 128)],
+}
+NUM_OF_COURTS = 4
+
+
+def scenario_name(event_type, num_of_groups, team_count):
+    if num_of_groups:
+        return f'{event_type}/{num_of_groups}x{team_count // num_of_groups}'
+    return f'{event_type}/{team_count}'
+
+
+def seed_event(event_type, num_of_groups, team_count, sport_type='football'):
+    event = Event(scenario_name(event_type, num_of_groups, team_count),
+                  datetime.date(2024, 1, 1), sport_type, event_type,
+                  num_of_groups, False, NUM_OF_COURTS)
+    db.session.add(event)
+    db.session.flush()
+    db.session.add_all([Team(name=f'Csapat {i + 1}', event_id=event.id, group_id=None)
+                        for i in range(team_count)])
+    db.session.commit()
+    return event.id
+
+
+# Véletlen eredmény; kieséses mérkőzésen nem lehet döntetlen
+def random_score(rng, draws=True):
+    team1_score = rng.randint(0, 4)
+    team2_score = rng.randint(0, 4)
+    if not draws and team1_score == team2_score:
+        team2_score += 1
+    return team1_score, team2_score
@@ -0,0 +1,226 @@
+from sqlalchemy import and_, case, func, insert, or_, select
+from sqlalchemy.orm import joinedload
+
+from models import db, Group, Match
+
+
+def knockout_stage_name(match_count):
+    if match_count == 1:
+        return 'Final'
+    if match_count == 2:
+        return 'S'
+    if match_count == 4:
+        return 'Q'
+    return f'R{match_count * 2}'
+
+
+def bracket_size(team_count):
+    return max(2, 1 << (team_count - 1).bit_length())
+
+
+# Szabványos kiemelési sorrend az első kör helyeire: 1-8, 4-5, 2-7, 3-6, ...
+def seed_slots(size):
+    slots = [1]
+    while len(slots) < size:
+        total = len(slots) * 2 + 1
+        slots = [seed for slot in slots for seed in (slot, total - slot)]
+    return slots
+
+
+# Az első kör azon helyei, ahol a párosítás egyik fele erőnyerő: ezek a
+# kiemelt csapatok továbbjutnak, mérkőzés nélkül
+def bye_positions(team_count):
+    slots = seed_slots(bracket_size(team_count))
+    return {position for position in range(len(slots) // 2)
+            if slots[2 * position + 1] > team_count}
+
+
+# A teljes ágrajz egyszerre jön létre: minden körhöz egy szakasz és üres
+# mérkőzések, amelyek tudják, hová lép tovább a győztesük
+def create_knockout_bracket(event_id, team_count, first_stage_order=1):
+    size = bracket_size(team_count)
+    byes = bye_positions(team_count)
+    rounds = size.bit_length() - 1
+    stages = []
+    for index in range(rounds):
+        stages.append(Group(
+            name=knockout_stage_name(size >> (index + 1)),
+            event_id=event_id, kind='knockout',
+            stage_order=first_stage_order + index))
+    db.session.add_all(stages)
+    db.session.flush()
+
+    # A döntőtől visszafelé haladunk, így a szülő mérkőzés azonosítója már
+    # megvan; körönként egy tömeges INSERT
+    parent_ids = []
+    for index in reversed(range(rounds)):
+        rows = []
+        for position in range(size >> (index + 1)):
+            if index == 0 and position in byes:
+                continue
+            rows.append({
+                'event_id': event_id, 'group_id': stages[index].id,
+                'bracket_position': position,
+                'next_match_id': parent_ids[position // 2] if parent_ids else None,
+                'next_slot': position % 2 + 1 if parent_ids else None,
+            })
+        parent_ids = db.session.scalars(
+            insert(Match).returning(Match.id, sort_by_parameter_order=True),
+            rows).all()
+    return stages
+
+
+# A lekérdezések külön is elérhetők, az aszinkron kiszolgálás (asgi) ugyanezeket futtatja
+def knockout_stages_statement(event_id):
+    return select(Group).filter_by(event_id=event_id, kind='knockout').order_by(
+        Group.stage_order, Group.id)
+
+
+def stage_groups_statement(event_id):
+    return select(Group).filter(
+        Group.event_id == event_id,
+        Group.kind.in_(('group', 'round_robin'))).order_by(Group.id)
+
+
+def knockout_stages(event_id):
+    return db.session.scalars(knockout_stages_statement(event_id)).all()
+
+
+def stage_groups(event_id):
+    return db.session.scalars(stage_groups_statement(event_id)).all()
+
+
+def next_stage(group):
+    return Group.query.filter(
+        Group.event_id == group.event_id, Group.kind == 'knockout',
+        Group.stage_order > group.stage_order).order_by(
+        Group.stage_order).first()
+
+
+# A kieséses körök sorszáma folytonos, így a következő kör egy join-nal elérhető
+def is_next_stage_played(group):
+    return db.session.query(Match.id).join(
+        Group, Match.group_id == Group.id).filter(
+        Group.event_id == group.event_id, Group.kind == 'knockout',
+        Group.stage_order == group.stage_order + 1,
+        Match.team1_score.isnot(None)).first() is not None
+
+
+def stage_matches(group_id):
+    return Match.query.filter_by(group_id=group_id).order_by(
+        Match.bracket_position, Match.id).all()
+
+
+# Az első kör kitöltése a kiemelés szerinti helyekből (lásd seeding.py):
+# erőnyerő helyen a csapat rögtön a második kör mérkőzésébe kerül
+def fill_first_round(stages, slots):
+    first = {match.bracket_position: match
+             for match in stage_matches(stages[0].id)}
+    if any(match.team1_id or match.team2_id for match in first.values()):
+        return False
+    second = {match.bracket_position: match
+              for match in stage_matches(stages[1].id)} if len(stages) > 1 else {}
+    for position in range(len(slots) // 2):
+        team1_id, team2_id = slots[2 * position], slots[2 * position + 1]
+        if position in first:
+            first[position].team1_id = team1_id
+            first[position].team2_id = team2_id
+        else:
+            setattr(second[position // 2], f'team{position % 2 + 1}_id',
+                    team1_id or team2_id)
+    return True
+
+
+def is_stage_started(group_id):
+    return db.session.query(Match.id).filter(
+        Match.group_id == group_id,
+        or_(Match.team1_id.isnot(None), Match.team2_id.isnot(None))).first() is not None
+
+
+def is_knockout_started(event_id):
+    return db.session.query(Match.id).join(
+        Group, Match.group_id == Group.id).filter(
+        Group.event_id == event_id, Group.kind == 'knockout',
+        Group.stage_order == 1,
+        or_(Match.team1_id.isnot(None), Match.team2_id.isnot(None))).first() is not None
+
+
+# Az első elkezdett szakasz, amelyben még van lejátszható mérkőzés;
+# ha nincs ilyen, a legutolsó elkezdett szakasz
+def current_stage(event_id):
+    playable = func.sum(case((and_(
+        Match.team1_id.isnot(None), Match.team2_id.isnot(None),
+        Match.team1_score.is_(None)), 1), else_=0))
+    started = db.session.query(Group, playable).join(
+        Match, Match.group_id == Group.id).filter(
+        Group.event_id == event_id,
+        or_(Match.team1_id.isnot(None), Match.team2_id.isnot(None))).group_by(
+        Group.id).order_by(Group.stage_order, Group.id).all()
+    for group, playable_count in started:
+        if playable_count:
+            return group
+    return started[-1][0] if started else None
+
+
+def match_winner_id(match):
+    if match.team1_score is None or match.team2_score is None:
+        return None
+    if match.team1_score > match.team2_score:
+        return match.team1_id
+    if match.team2_score > match.team1_score:
+        return match.team2_id
+    return None
+
+
+# Végeredmény a kieséses ágból egyetlen lekérdezéssel: egy kör vesztesei
+# annyiadik helyen osztoznak, ahány mérkőzése a teljes körnek van, plusz egy
+def knockout_placements(event_id):
+    rows = db.session.query(Match, Group.stage_order).join(
+        Group, Match.group_id == Group.id).options(
+        joinedload(Match.team1), joinedload(Match.team2)).filter(
+        Group.event_id == event_id, Group.kind == 'knockout').order_by(
+        Group.stage_order, Match.bracket_position).all()
+    if not rows:
+        return []
+    last = max(stage_order for _, stage_order in rows)
+    placements = {}
+    for match, stage_order in rows:
+        winner_id = match_winner_id(match)
+        if winner_id is None:
+            continue
+        if winner_id == match.team1_id:
+            winner, loser = match.team1, match.team2
+        else:
+            winner, loser = match.team2, match.team1
+        placements.setdefault(2 ** (last - stage_order) + 1, []).append(loser)
+        if stage_order == last:
+            placements[1] = [winner]
+    return sorted(placements.items())
+
+
+# Eredményrögzítéskor a győztes egy lépésben a következő mérkőzés helyére kerül
+def advance_winner(match):
+    if match.next_match_id is None:
+        return None
+    parent = db.session.get(Match, match.next_match_id)
+    setattr(parent, f'team{match.next_slot}_id', match_winner_id(match))
+    return parent
+
+
+# Az eredmény a mérkőzés csoportját és, ha a győztes továbblép, a következő
+# mérkőzés csoportját módosítja
+def result_group_ids(matches):
+    group_ids = set()
+    for match in matches:
+        group_ids.add(match.group_id)
+        if match.next_match is not None:
+            group_ids.add(match.next_match.group_id)
+    return group_ids
+
+
+# A győztes addig módosítható, amíg a következő mérkőzésnek nincs eredménye
+def is_result_locked(match):
+    if match.next_match_id is None:
+        return False
+    parent = db.session.get(Match, match.next_match_id)
+    return parent.team1_score is not None or parent.team2_score is not None
@@ -0,0 +1,64 @@
+import queue
+import threading
+from collections import defaultdict
+
+from flask import current_app
+from werkzeug.utils import import_string
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+# Folyamaton belüli üzenetközvetítő. Egy publish egyszer szerializált
+# üzenetet tesz minden feliratkozó sorába, adatbázis elérés nélkül.
+# Más megvalósítás (pl. Redis pub/sub) az EVENT_BROKER beállítással
+# cserélhető, ha ugyanezt a három metódust adja.
+class LocalBroker:
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._channels = defaultdict(set)
+        self._lock = threading.Lock()
+
+    # subscription: saját sor is átadható (pl. az asgi aszinkron sora), ha
+    # van put_nowait metódusa, és tele állapotban queue.Full kivételt dob
+    def subscribe(self, channel, subscription=None):
+        if subscription is None:
+            subscription = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, channel, subscription):
+        with self._lock:
+            subscribers = self._channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(message)
+            except queue.Full:
+                # A lemaradt kliens üzenetet veszít, a többieket nem lassítja
+                pass
+        return len(subscribers)
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._channels.get(channel, ()))
+
+
+def init_broker(app):
+    app.config.setdefault('EVENT_BROKER', 'broker.LocalBroker')
+    broker = app.config['EVENT_BROKER']
+    if isinstance(broker, str):
+        broker = import_string(broker)
+    app.extensions['broker'] = broker() if callable(broker) else broker
+
+
+def get_broker():
+    return current_app.extensions['broker']
@@ -0,0 +1,289 @@
+import csv
+import io
+import json
+
+from sqlalchemy import and_, insert, or_
+from sqlalchemy.orm import aliased, joinedload
+
+from bracket import (advance_winner, is_knockout_started, is_result_locked, result_group_ids,
+                     stage_groups)
+from live import publish, results_message
+from models import db, Group, Match, Team
+from page_cache import bump_event_revision
+from standings import apply_results
+
+# Egy importban legfeljebb ennyi sor lehet
+MAX_ROWS = 1000
+TEAM_COLUMNS = ('name', 'group')
+RESULT_COLUMNS = ('match_id', 'team1_score', 'team2_score')
+NAME_LENGTH = Team.name.type.length
+
+
+class BulkError(ValueError):
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+def _row_dict(values, columns):
+    values = list(values) + [None] * len(columns)
+    return dict(zip(columns, values))
+
+
+# JSON lista: objektumok az oszlopnevekkel, listák az oszlopok sorrendjében,
+# vagy egyszerű értékek (csak az első oszlop, pl. csapatnév)
+def rows_from_json(data, columns):
+    if not isinstance(data, list):
+        raise BulkError(['A JSON adatnak listának kell lennie'])
+    rows = []
+    for item in data:
+        if isinstance(item, dict):
+            rows.append({column: item.get(column) for column in columns})
+        elif isinstance(item, list):
+            rows.append(_row_dict(item, columns))
+        else:
+            rows.append(_row_dict([item], columns))
+    return rows
+
+
+# CSV: ha az első sor első cellája az első oszlop neve, fejlécnek tekintjük,
+# és az oszlopokat név szerint olvassuk, különben a sorrendjük számít
+def rows_from_csv(text, columns):
+    lines = [row for row in csv.reader(io.StringIO(text))
+             if any(cell.strip() for cell in row)]
+    if lines and lines[0][0].strip().lower() == columns[0]:
+        header = [cell.strip().lower() for cell in lines.pop(0)]
+        return [{column: dict(zip(header, row)).get(column) for column in columns}
+                for row in lines]
+    return [_row_dict(row, columns) for row in lines]
+
+
+# Feltöltött fájl vagy beillesztett szöveg: JSON, ha szögletes zárójellel
+# kezdődik, különben CSV
+def read_rows(text, columns):
+    text = (text or '').strip()
+    if text.startswith('['):
+        try:
+            data = json.loads(text)
+        except ValueError as error:
+            raise BulkError([f'Hibás JSON: {error}'])
+        rows = rows_from_json(data, columns)
+    else:
+        rows = rows_from_csv(text, columns)
+    return check_row_count(rows)
+
+
+def check_row_count(rows):
+    if not rows:
+        raise BulkError(['Nincs feldolgozható sor'])
+    if len(rows) > MAX_ROWS:
+        raise BulkError([f'Egyszerre legfeljebb {MAX_ROWS} sor tölthető fel'])
+    return rows
+
+
+def read_upload(upload, text):
+    if upload:
+        return upload.read().decode('utf-8-sig')
+    return text
+
+
+def _clean(value):
+    return str(value).strip() if value is not None else ''
+
+
+# Csapatok felvétele és csoportba sorolása egy lépésben. Új név új csapat,
+# meglévő csapatnál a megadott csoportba soroljuk át. Csoport csak csoportkörös
+# eseménynél, a csoportok létrehozása után és a sorsolás előtt adható meg.
+def import_teams(event, rows):
+    teams = {team.name.casefold(): team
+             for team in Team.query.filter_by(event_id=event.id)}
+    groups = stage_groups(event.id)
+    if event.event_type == 'group_knockout':
+        groups = groups[:event.num_of_groups]
+    group_ids = {group.name.casefold(): group.id for group in groups}
+    # Kieséses eseménynél az ágrajz a csoportokkal együtt készül, csoportkörös
+    # eseménynél a csoportmérkőzések sorsolásáig lehet még csapatot felvenni
+    has_groups = db.session.query(Group.id).filter_by(
+        event_id=event.id).first() is not None
+    drawn = bool(groups) and db.session.query(Match.id).filter(
+        Match.group_id.in_([group.id for group in groups])).first() is not None
+    can_add = not has_groups or (event.event_type == 'group_knockout' and not drawn)
+
+    errors = []
+    new_teams = []
+    assigned = []
+    seen = set()
+    for number, row in enumerate(rows, start=1):
+        name = _clean(row['name'])
+        group_name = _clean(row['group'])
+        key = name.casefold()
+        if not name:
+            errors.append(f'{number}. sor: hiányzik a csapatnév')
+            continue
+        if len(name) > NAME_LENGTH:
+            errors.append(f'{number}. sor: a csapatnév legfeljebb {NAME_LENGTH} karakter')
+            continue
+        if key in seen:
+            errors.append(f'{number}. sor: {name} többször szerepel')
+            continue
+        seen.add(key)
+        group_id = None
+        if group_name:
+            if event.event_type != 'group_knockout':
+                errors.append(f'{number}. sor: csoport csak csoportkörös eseménynél adható meg')
+                continue
+            if not groups:
+                errors.append(f'{number}. sor: előbb létre kell hozni a csoportokat')
+                continue
+            group_id = group_ids.get(group_name.casefold())
+            if group_id is None:
+                errors.append(f'{number}. sor: nincs {group_name} nevű csoport')
+                continue
+        if drawn:
+            errors.append(f'{number}. sor: a sorsolás után a csapatok nem módosíthatók')
+        elif key in teams:
+            if group_id is None:
+                errors.append(f'{number}. sor: {name} már szerepel az eseményen')
+            else:
+                assigned.append((teams[key], group_id))
+        elif not can_add:
+            errors.append(f'{number}. sor: a csoportok létrehozása után új csapat nem vehető fel')
+        else:
+            new_teams.append({'name': name, 'event_id': event.id, 'group_id': group_id})
+    if errors:
+        raise BulkError(errors)
+
+    if new_teams:
+        db.session.execute(insert(Team), new_teams)
+    for team, group_id in assigned:
+        team.group_id = group_id
+    return {'created': len(new_teams), 'assigned': len(assigned)}
+
+
+# A rögzíthető mérkőzések: mindkét csapat ismert, és a győztes még nem
+# játszott a következő körben. A kieséses szakasz kezdete után a
+# csoportmérkőzések már nem módosíthatók. (mérkőzés, csoportnév) párok.
+def editable_matches(event_id):
+    parent = aliased(Match)
+    query = db.session.query(Match, Group.name).options(
+        joinedload(Match.team1), joinedload(Match.team2)).join(
+        Group, Match.group_id == Group.id).outerjoin(
+        parent, Match.next_match_id == parent.id).filter(
+        Match.event_id == event_id,
+        Match.team1_id.isnot(None), Match.team2_id.isnot(None),
+        or_(parent.id.is_(None), and_(parent.team1_score.is_(None),
+                                      parent.team2_score.is_(None))))
+    if is_knockout_started(event_id):
+        query = query.filter(Group.kind == 'knockout')
+    return query.order_by(Group.stage_order, Group.id, Match.round_number,
+                          Match.slot, Match.bracket_position, Match.id).all()
+
+
+# A rögzítő táblázat mezőiből csak a kitöltött és a betöltéskor látott
+# értékhez képest megváltozott eredmények. A sor a betöltéskori verziót is
+# viszi, így a save_results észreveszi, ha közben más módosította a mérkőzést.
+def grid_rows(form, matches):
+    rows = []
+    for match, _ in matches:
+        team1_score = _clean(form.get(f'team1_score_{match.id}'))
+        team2_score = _clean(form.get(f'team2_score_{match.id}'))
+        if not team1_score and not team2_score:
+            continue
+        original = (_clean(form.get(f'original_team1_score_{match.id}')),
+                    _clean(form.get(f'original_team2_score_{match.id}')))
+        if (team1_score, team2_score) in (original, (_clean(match.team1_score),
+                                                     _clean(match.team2_score))):
+            continue
+        rows.append({'match_id': match.id, 'team1_score': team1_score,
+                     'team2_score': team2_score, 'version': form.get(f'version_{match.id}')})
+    return rows
+
+
+def _parse_result(number, row, errors):
+    try:
+        values = [int(_clean(row[column])) for column in RESULT_COLUMNS]
+    except ValueError:
+        errors.append(f'{number}. sor: a mérkőzés azonosítója és a gólok egész számok')
+        return None
+    if values[1] < 0 or values[2] < 0:
+        errors.append(f'{number}. sor: a gólok száma nem lehet negatív')
+        return None
+    version = _clean(row.get('version'))
+    if not version:
+        return values + [None]
+    if not version.isdigit():
+        errors.append(f'{number}. sor: hibás verzió')
+        return None
+    return values + [int(version)]
+
+
+# Több eredmény rögzítése egy tranzakcióban. A mérkőzéseket körönként
+# haladva dolgozzuk fel, így a kieséses ágon egy korábbi kör győztese ugyanabban
+# a kötegben a következő körben is szerepelhet. Bármely hibás sor esetén semmi
+# sem változik. A tabellák a végén egyszerre frissülnek. Verziót megadó
+# sor (a rögzítő táblázat) csak akkor ment, ha a mérkőzés azóta nem változott.
+def save_results(event, rows):
+    if event.is_ended:
+        raise BulkError(['Az esemény lezárult, az eredmények nem módosíthatók'])
+    errors = []
+    parsed = {}
+    for number, row in enumerate(rows, start=1):
+        values = _parse_result(number, row, errors)
+        if values is None:
+            continue
+        if values[0] in parsed:
+            errors.append(f'{number}. sor: a(z) {values[0]}. mérkőzés többször szerepel')
+            continue
+        parsed[values[0]] = (number, values[1], values[2], values[3])
+    if errors:
+        raise BulkError(errors)
+
+    rows = db.session.query(Match, Group.kind, Group.stage_order).join(
+        Group, Match.group_id == Group.id).options(
+        joinedload(Match.team1), joinedload(Match.team2),
+        joinedload(Match.next_match)).filter(
+        Match.event_id == event.id, Match.id.in_(list(parsed))).all()
+    found = {match.id for match, _, _ in rows}
+    for match_id, (number, _, _, _) in parsed.items():
+        if match_id not in found:
+            errors.append(f'{number}. sor: a(z) {match_id}. mérkőzés nem ehhez az eseményhez tartozik')
+    groups_locked = any(kind != 'knockout' for _, kind, _ in rows) and \
+        is_knockout_started(event.id)
+
+    changes = []
+    rows.sort(key=lambda row: (row[2], row[0].bracket_position or 0, row[0].id))
+    for match, kind, _ in rows:
+        number, team1_score, team2_score, version = parsed[match.id]
+        if version is not None and version != match.version:
+            errors.append(f'{number}. sor: a(z) {match.id}. mérkőzés eredményét közben valaki más módosította, ellenőrizd és mentsd újra')
+        elif groups_locked and kind != 'knockout':
+            errors.append(f'{number}. sor: a kieséses szakasz már elkezdődött, a csoporteredmény nem módosítható')
+        elif match.team1_id is None or match.team2_id is None:
+            errors.append(f'{number}. sor: a mérkőzés csapatai még nem ismertek')
+        elif is_result_locked(match):
+            errors.append(f'{number}. sor: a következő kör mérkőzése már lezajlott')
+        else:
+            changes.append((match, match.team1_score, match.team2_score))
+            match.team1_score = team1_score
+            match.team2_score = team2_score
+            parent = advance_winner(match)
+            if parent is not None:
+                # A betöltött csapat kapcsolat a régi helyet mutatná
+                db.session.expire(parent, ['team1', 'team2'])
+    if errors:
+        db.session.rollback()
+        raise BulkError(errors)
+
+    changed_standings = apply_results(event, changes)
+    return [match for match, _, _ in changes], changed_standings
+
+
+# Mentés, revízió léptetés és élő értesítés egy tranzakcióban; ütközéskor a
+# retry_on_conflict az egészet újrafuttatja
+def commit_results(event, rows):
+    saved, changed_standings = save_results(event, rows)
+    bump_event_revision(event.id, result_group_ids(saved))
+    message = results_message(event, saved, changed_standings)
+    db.session.commit()
+    publish(event.id, message)
+    return saved
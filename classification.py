@@ -0,0 +1,31 @@
+from bracket import knockout_placements
+from seeding import QUALIFIERS_PER_GROUP
+from standings import event_group_tables
+
+
+def _team(team_id, team_name):
+    return {'id': team_id, 'name': team_name}
+
+
+# Az esemény végeredménye (helyezés, csapatok) párokként, a csapatok
+# {'id', 'name'} szótárak. Kieséses ágnál a körök vesztesei osztoznak a
+# helyezésen, csoportkörös eseménynél a csoportból kiesők a továbbjutók után
+# következnek, körmérkőzésnél a tabella sorrendje a végeredmény.
+def final_placements(event):
+    if event.event_type == 'round_robin':
+        tables = list(event_group_tables(event).values())
+        table = tables[0] if tables else []
+        return [(rank, [_team(row['team_id'], row['team_name'])])
+                for rank, row in enumerate(table, start=1)]
+
+    placements = [(rank, [_team(team.id, team.name) for team in teams])
+                  for rank, teams in knockout_placements(event.id)]
+    if event.event_type == 'group_knockout':
+        out_from_groups = sorted(
+            (row['team_id'], row['team_name'])
+            for table in event_group_tables(event).values()
+            for row in table[QUALIFIERS_PER_GROUP:])
+        if out_from_groups:
+            placements.append((event.num_of_groups * QUALIFIERS_PER_GROUP + 1,
+                               [_team(*team) for team in out_from_groups]))
+    return placements
@@ -0,0 +1,244 @@
+from collections import Counter
+from itertools import combinations, product
+
+from ranking import ranking_rules
+from seeding import qualifiers_per_group
+from standings import pending_by_group
+
+QUALIFIED = 'qualified'
+ELIMINATED = 'eliminated'
+ALIVE = 'alive'
+# Ennyi lépés után a keresés feladja, és a csapatot esélyesnek hagyjuk:
+# így a "kiesett" állapot mindig bizonyított, csak ritkán marad el
+SEARCH_LIMIT = 2000
+
+
+# Folyam-lazítás: minden mérkőzés legalább `share` többletpontot oszt szét
+# tetszőlegesen a két csapat között. Ha így sem fér bele mindenki a keretébe,
+# a valódi eredményekkel sem fog. A túlterhelt csapatoktól egyesével visszük
+# át a pontokat közös mérkőzéseken keresztül a szabad keretű csapatokig
+# (javító utak); ha nincs ilyen út, a túlterhelt csapatból elérhető
+# csapatok együtt sem férnek el a saját mérkőzéseik pontjaival.
+def fits_relaxed(slack, games, share):
+    if not share:
+        return [[0, 0] for _ in games]
+    load = dict.fromkeys(slack, 0)
+    given = []
+    # Egyenletes felosztásból indulunk: ez a döntetlen, ami a lazításban és
+    # a valóságban is ugyanannyi pont, így a talált megoldás jó útmutató
+    for team1_id, team2_id in games:
+        given.append([share // 2, share - share // 2])
+        load[team1_id] += share // 2
+        load[team2_id] += share - share // 2
+    neighbours = {team_id: [] for team_id in slack}
+    for i, (team1_id, team2_id) in enumerate(games):
+        neighbours[team1_id].append((i, 0, team2_id))
+        neighbours[team2_id].append((i, 1, team1_id))
+
+    for team_id in slack:
+        while load[team_id] > slack[team_id]:
+            parent = {team_id: None}
+            queue = [team_id]
+            target = None
+            for current in queue:
+                if load[current] < slack[current]:
+                    target = current
+                    break
+                for i, side, other in neighbours[current]:
+                    if other not in parent and given[i][side]:
+                        parent[other] = (current, i, side)
+                        queue.append(other)
+            if target is None:
+                return None
+            load[team_id] -= 1
+            load[target] += 1
+            current = target
+            while parent[current] is not None:
+                previous, i, side = parent[current]
+                given[i][side] -= 1
+                given[i][1 - side] += 1
+                current = previous
+    return given
+
+
+# Van-e olyan kimenetele a mérkőzéseknek, amelyben egyik csapat sem szerez
+# több pontot a kereténél (slack). Mélységi keresés a mérkőzéseken a
+# legszűkebb keretű csapatokkal kezdve; minden lépésben a folyam-lazítás
+# vágja le a reménytelen ágakat és mutatja meg, melyik eredménnyel érdemes
+# kezdeni. A már bebizonyítottan reménytelen állapotokat megjegyezzük.
+def can_stay_below(slack, games, rules):
+    win, draw, loss = rules['win'], rules['draw'], rules['loss']
+    slack = dict(slack)
+    # A vereség pontja mindenképp jár, a keresés csak a többletet osztja el
+    for team1_id, team2_id in games:
+        slack[team1_id] -= loss
+        slack[team2_id] -= loss
+    if any(value < 0 for value in slack.values()):
+        return False
+    decisive, drawn = win - loss, draw - loss
+    share = min(decisive, 2 * drawn)
+    if decisive == 2 * drawn:
+        # Itt minden egész felosztás valódi eredmény (győzelem vagy
+        # döntetlen), a folyam tehát pontos választ ad
+        return fits_relaxed(slack, games, share) is not None
+
+    # A lazításban a győzelem is csak `share` egységet ér, ezért a keretet
+    # szűkítjük: w győzelemmel és d döntetlennel r mérkőzésből
+    # (decisive - drawn) * (2w + d) <= slack + (decisive - 2 * drawn) * r,
+    # és a lazított terhelés drawn * (2w + d)
+    def capacity(counts):
+        if 2 * drawn > decisive:
+            return {team_id: slack[team_id] for team_id, _ in counts}
+        return {team_id: min(slack[team_id], drawn * (
+            slack[team_id] + (decisive - 2 * drawn) * count) // (decisive - drawn))
+            for team_id, count in counts}
+
+    gains = ((decisive, 0), (0, decisive), (drawn, drawn))
+    top = max(decisive, drawn)
+    order = {team_id: i for i, team_id in enumerate(sorted(slack, key=slack.get))}
+    games = sorted(games, key=lambda game: sorted((order[game[0]], order[game[1]])))
+
+    # Mérkőzésenként a még érintett csapatok és hátralévő mérkőzéseik száma.
+    # Akinek a kerete elég az összes hátralévő győzelemre, annak a kerete
+    # már mindegy, így az emlékezés kulcsában levágjuk.
+    remaining = [None] * (len(games) + 1)
+    counts = Counter()
+    remaining[len(games)] = ()
+    for i in range(len(games) - 1, -1, -1):
+        counts.update(games[i])
+        remaining[i] = tuple(counts.items())
+    given = fits_relaxed(capacity(remaining[0]), games, share)
+    if given is None:
+        return False
+    # Gyakran már a lazított megoldás eredményekre kerekítve is belefér
+    load = Counter()
+    for (team1_id, team2_id), (share1, share2) in zip(games, given):
+        gain1, gain2 = min(gains, key=lambda gain: abs(gain[0] - gain[1] - share1 + share2))
+        load[team1_id] += gain1
+        load[team2_id] += gain2
+    if all(load[team_id] <= slack[team_id] for team_id in load):
+        return True
+    failed = set()
+    budget = SEARCH_LIMIT
+
+    def search(i):
+        nonlocal budget
+        budget -= 1
+        if i == len(games) or budget < 0:
+            return True
+        key = (i, tuple(min(slack[team_id], count * top)
+                        for team_id, count in remaining[i]))
+        if key in failed:
+            return False
+        given = fits_relaxed(capacity(remaining[i]), games[i:], share)
+        if given is None:
+            failed.add(key)
+            return False
+        team1_id, team2_id = games[i]
+        # A lazított megoldás felosztásához legközelebbi eredménnyel kezdünk
+        share1, share2 = given[0]
+        for gain1, gain2 in sorted(gains, key=lambda gain: abs(
+                gain[0] - gain[1] - share1 + share2)):
+            if gain1 <= slack[team1_id] and gain2 <= slack[team2_id]:
+                slack[team1_id] -= gain1
+                slack[team2_id] -= gain2
+                found = search(i + 1)
+                slack[team1_id] += gain1
+                slack[team2_id] += gain2
+                if found:
+                    return True
+        failed.add(key)
+        return False
+
+    return search(0)
+
+
+# Kieshet-e a csapat: a legrosszabb esetben minden mérkőzését elveszíti, és
+# keresünk `qualifiers` olyan ellenfelet, amelyek egyszerre legalább annyi
+# pontot érhetnek el. A pontegyenlőséget ellene számoljuk. A kiválasztott
+# ellenfelek mindenki mást megvernek, csak az egymás elleni (kevés)
+# mérkőzésük kimenetelét kell végigpróbálni.
+def can_miss(team_id, points, pending, rules, qualifiers):
+    win, draw, loss = rules['win'], rules['draw'], rules['loss']
+    games = Counter(team for game in pending for team in game)
+    target = points[team_id] + games[team_id] * loss
+    rivals = [other for other in points if other != team_id
+              and points[other] + games[other] * win >= target]
+    outcomes = ((win, loss), (loss, win), (draw, draw))
+    for selected in combinations(rivals, qualifiers):
+        selected = set(selected)
+        inner = [game for game in pending
+                 if game[0] in selected and game[1] in selected]
+        base = {other: points[other] + (games[other] - sum(
+            other in game for game in inner)) * win for other in selected}
+        for results in product(outcomes, repeat=len(inner)):
+            totals = dict(base)
+            for (team1_id, team2_id), (points1, points2) in zip(inner, results):
+                totals[team1_id] += points1
+                totals[team2_id] += points2
+            if all(total >= target for total in totals.values()):
+                return True
+    return False
+
+
+# Továbbjuthat-e a csapat: a legjobb esetben minden mérkőzését megnyeri, és
+# keresünk olyan kimenetelt, amelyben legfeljebb `qualifiers - 1` ellenfél
+# előzi meg pontszámban. A pontegyenlőséget a javára számoljuk. Aki így sem
+# érheti utol, az kimarad a keresésből, a szabadon engedett ellenfelek pedig
+# minden mérkőzésüket megnyerik.
+def can_qualify(team_id, points, pending, rules, qualifiers):
+    win, loss = rules['win'], rules['loss']
+    games = Counter(team for game in pending for team in game)
+    against = Counter(other for game in pending if team_id in game
+                      for other in game if other != team_id)
+    ceiling = points[team_id] + games[team_id] * win
+    others = [other for other in points if other != team_id]
+    if sum(points[other] + games[other] * loss > ceiling
+           for other in others) >= qualifiers:
+        return False
+    maximum = {other: points[other] + (games[other] - against[other]) * win
+               + against[other] * loss for other in others}
+    dangerous = sorted((other for other in others if maximum[other] > ceiling),
+                       key=maximum.get, reverse=True)
+    if len(dangerous) < qualifiers:
+        return True
+    for free in combinations(dangerous, qualifiers - 1):
+        constrained = set(dangerous) - set(free)
+        inner = [game for game in pending
+                 if game[0] in constrained and game[1] in constrained]
+        inner_count = Counter(team for game in inner for team in game)
+        slack = {other: ceiling - points[other]
+                 - (games[other] - inner_count[other]) * loss
+                 for other in constrained}
+        if can_stay_below(slack, inner, rules):
+            return True
+    return False
+
+
+def group_status(table, pending, rules, qualifiers):
+    if not pending:
+        # Lejátszott csoport: a tabella sorrendje a holtversenyekkel együtt végleges
+        return {row['team_id']: QUALIFIED if i < qualifiers else ELIMINATED
+                for i, row in enumerate(table)}
+    points = {row['team_id']: row['points'] for row in table}
+    status = {}
+    for team_id in points:
+        if not can_miss(team_id, points, pending, rules, qualifiers):
+            status[team_id] = QUALIFIED
+        elif not can_qualify(team_id, points, pending, rules, qualifiers):
+            status[team_id] = ELIMINATED
+        else:
+            status[team_id] = ALIVE
+    return status
+
+
+# Biztos továbbjutó, biztos kieső vagy még esélyes, csoportnév és csapat
+# szerint. Csak a pontszámot nézzük, a holtversenyt mindig a csapat számára
+# kedvezőtlenül (továbbjutás) ill. kedvezően (kiesés) döntjük el, így az
+# állapot a hátralévő eredményektől függetlenül biztos.
+def qualification_status(event, group_data, matches):
+    rules = ranking_rules(event.sport_type)
+    qualifiers = qualifiers_per_group(event)
+    pending = pending_by_group(group_data, matches)
+    return {group_name: group_status(table, pending[group_name], rules, qualifiers)
+            for group_name, table in group_data.items()}
@@ -0,0 +1,33 @@
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm.exc import StaleDataError
+
+from models import db
+
+# Ütközés esetén legfeljebb ennyiszor futtatjuk a műveletet
+CONFLICT_RETRIES = 3
+# PostgreSQL: sorosítási hiba, holtpont
+RETRY_PGCODES = ('40001', '40P01')
+
+
+# Ütközés: egy párhuzamos kérés már létrehozta ugyanazt (egyedi kulcs),
+# közben módosította a sort (verziószám), vagy az adatbázis zárolt volt
+def is_conflict(error):
+    if isinstance(error, (IntegrityError, StaleDataError)):
+        return True
+    if isinstance(error, OperationalError):
+        return (getattr(error.orig, 'pgcode', None) in RETRY_PGCODES
+                or 'database is locked' in str(error.orig))
+    return False
+
+
+# A művelet (ellenőrzés, írás, commit) újrafuttatása ütközéskor. Visszagörgetés
+# után a következő futás már a másik kérés eredményét látja, így a "ha még
+# nincs, létrehozzuk" lépések idempotensek: a második kérés a meglévőt találja.
+def retry_on_conflict(action, retries=CONFLICT_RETRIES):
+    for attempt in range(retries):
+        try:
+            return action()
+        except (IntegrityError, StaleDataError, OperationalError) as error:
+            db.session.rollback()
+            if attempt == retries - 1 or not is_conflict(error):
+                raise
@@ -0,0 +1,62 @@
+import datetime
+
+from sqlalchemy import and_, or_, select
+
+from models import db, Event
+
+EVENTS_PER_PAGE = 20
+
+
+def read_filters(args):
+    filters = {}
+    for name in ('sport_type', 'event_type'):
+        if args.get(name):
+            filters[name] = args.get(name)
+    if args.get('is_ended') in ('0', '1'):
+        filters['is_ended'] = args.get('is_ended')
+    return filters
+
+
+def encode_cursor(event):
+    return f'{event.date.isoformat()}_{event.id}'
+
+
+def decode_cursor(cursor):
+    try:
+        date, event_id = cursor.split('_')
+        return datetime.date.fromisoformat(date), int(event_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+# Keyset (seek) lapozás dátum és azonosító szerint csökkenő sorrendben:
+# a következő oldal az előző oldal utolsó eleme után kezdődik, OFFSET nélkül.
+# Egy elemmel többet kérünk, így a következő oldal létezése kiderül.
+def events_statement(filters, cursor=None, per_page=EVENTS_PER_PAGE):
+    query = select(Event)
+    if 'sport_type' in filters:
+        query = query.filter(Event.sport_type == filters['sport_type'])
+    if 'event_type' in filters:
+        query = query.filter(Event.event_type == filters['event_type'])
+    if 'is_ended' in filters:
+        if filters['is_ended'] == '1':
+            query = query.filter(Event.is_ended.is_(True))
+        else:
+            query = query.filter(or_(Event.is_ended.is_(False),
+                                     Event.is_ended.is_(None)))
+    position = decode_cursor(cursor)
+    if position:
+        date, event_id = position
+        query = query.filter(or_(Event.date < date,
+                                 and_(Event.date == date, Event.id < event_id)))
+    return query.order_by(Event.date.desc(), Event.id.desc()).limit(per_page + 1)
+
+
+def split_page(events, per_page=EVENTS_PER_PAGE):
+    next_cursor = encode_cursor(events[per_page - 1]) if len(events) > per_page else None
+    return events[:per_page], next_cursor
+
+
+def events_page(filters, cursor=None, per_page=EVENTS_PER_PAGE):
+    events = db.session.scalars(events_statement(filters, cursor, per_page)).all()
+    return split_page(events, per_page)
@@ -0,0 +1,341 @@
+from flask import Blueprint, render_template, url_for, redirect, request, flash
+from forms import AddForm, AddTeamForm, MatchResultForm, EventFilterForm, BulkTeamForm, BulkResultForm
+from models import db, DELETED_EVENTS, Event, Team, Group, Match, increment_counter
+from standings import apply_result
+from classification import final_placements
+from bracket import (create_knockout_bracket, current_stage, is_stage_started,
+                     advance_winner, is_result_locked, result_group_ids)
+from stage_status import get_stage_status, is_stage_complete
+from sqlalchemy import func, or_
+from sqlalchemy.orm import joinedload
+from live import result_message, publish
+from bulk import (BulkError, TEAM_COLUMNS, RESULT_COLUMNS, read_rows, read_upload, check_row_count,
+                  import_teams, editable_matches, grid_rows, commit_results)
+from event_listing import events_page, read_filters
+from page_cache import cached_page, bump_event_revision, invalidate_event_pages
+from concurrency import retry_on_conflict
+
+# Az eseménytípustól független útvonalak: események és csapatok kezelése,
+# eredményrögzítés, végeredmény. A lebonyolítási formák saját blueprintben
+# vannak (round_robin, knockout, group_knockout).
+events = Blueprint('events', __name__)
+
+# Tömeges importnál legfeljebb ennyi hibát jelzünk ki egyenként
+MAX_FLASHED_ERRORS = 10
+
+
+# Mérkőzések a két csapattal együtt, hogy a listázásnál ne legyen N+1 lekérdezés
+def matches_with_teams():
+    return Match.query.options(joinedload(Match.team1), joinedload(Match.team2))
+
+
+# Az adott szakaszban minden mérkőzést lejátszottak-e?
+def is_group_complete_by_group_id(event_id, group_id):
+    return is_stage_complete(get_stage_status(event_id), group_id)
+
+
+@events.route('/')
+def index():
+    return render_template('home.html')
+
+
+@events.route('/add', methods=['GET', 'POST'])
+def add_event():
+    form = AddForm()
+
+    if form.validate_on_submit():
+        name = form.name.data
+        date = form.date.data
+        sport_type = form.sport_type.data
+        event_type = form.event_type.data
+        num_of_groups = form.num_of_groups.data
+        num_of_courts = form.num_of_courts.data
+        is_ended = False
+
+        new_event = Event(name, date, sport_type, event_type,
+                          num_of_groups, is_ended, num_of_courts)
+        db.session.add(new_event)
+        db.session.commit()
+
+        return redirect(url_for('events.add_team', event_id=new_event.id))
+
+    return render_template('add.html', form=form)
+
+
+@events.route('/list')
+def list_events():
+    form = EventFilterForm(request.args)
+    filters = read_filters(request.args)
+    cursor = request.args.get('after')
+    events, next_cursor = events_page(filters, cursor)
+
+    return render_template('list.html', events=events, form=form, filters=filters, cursor=cursor, next_cursor=next_cursor)
+
+
+@events.route('/delete', methods=['POST'])
+def del_event():
+    event_id = request.form.get('event_id')
+    event = Event.query.get(event_id)
+    db.session.delete(event)
+    increment_counter(DELETED_EVENTS)
+    db.session.commit()
+    invalidate_event_pages(event.id)
+    return redirect(url_for('events.list_events'))
+
+
+@events.route('/manage_event/<int:event_id>', methods=['GET', 'POST'])
+def manage_event(event_id):
+    event = Event.query.get_or_404(event_id)
+    teams = Team.query.filter_by(event_id=event_id).all()
+    groups = Group.query.filter_by(event_id=event_id).all()
+    # Az ágrajz üres mérkőzései még nem számítanak elkezdett mérkőzésnek
+    matches = Match.query.filter(Match.event_id == event_id, or_(
+        Match.team1_id.isnot(None), Match.team2_id.isnot(None))).all()
+    stage = current_stage(event_id)
+    current_group_id = stage.id if stage else None
+    event_state = set_type_of_match(
+        event_id, current_group_id)
+    if event.event_type == "group_knockout":
+        return render_template('manage_event_for_group_knockout.html', event=event, teams=teams, groups=groups, matches=matches, event_state=event_state, current_group_id=current_group_id)
+    if event.event_type == "knockout":
+        return render_template('manage_event_for_knockout.html', event=event, teams=teams, groups=groups, matches=matches, event_state=event_state, current_group_id=current_group_id)
+    if event.event_type == "round_robin":
+        return render_template('manage_event_for_round_robin.html', event=event, teams=teams, groups=groups, matches=matches, event_state=event_state, current_group_id=current_group_id)
+
+
+@events.route('/add_team/<int:event_id>', methods=['GET', 'POST'])
+def add_team(event_id):
+    form = AddTeamForm()
+
+    event = Event.query.get(event_id)
+    form.event_id.data = event_id
+
+    teams = Team.query.filter_by(event_id=event_id).all()
+    existing_groups = Group.query.filter_by(event_id=event_id).all()
+
+    if form.validate_on_submit():
+        name = form.name.data
+
+        new_team = Team(name=name, event_id=event_id, group_id=None)
+        db.session.add(new_team)
+        bump_event_revision(event_id)
+        db.session.commit()
+
+        return redirect(url_for('events.add_team', event_id=event_id))
+
+    return render_template('add_team.html', form=form, bulk_form=BulkTeamForm(), event=event, teams=teams, existing_groups=existing_groups)
+
+
+def flash_bulk_errors(error):
+    for message in error.errors[:MAX_FLASHED_ERRORS]:
+        flash(message, 'danger')
+    if len(error.errors) > MAX_FLASHED_ERRORS:
+        flash(f'...és további {len(error.errors) - MAX_FLASHED_ERRORS} hiba', 'danger')
+
+
+# Csapatok tömeges felvétele CSV vagy JSON formában, csoportkörös eseménynél
+# a csoportbeosztással együtt
+@events.route('/import_teams/<int:event_id>', methods=['POST'])
+def bulk_import_teams(event_id):
+    event = Event.query.get_or_404(event_id)
+    form = BulkTeamForm()
+    if form.validate_on_submit():
+        try:
+            rows = read_rows(read_upload(form.file.data, form.rows.data), TEAM_COLUMNS)
+            summary = import_teams(event, rows)
+        except BulkError as error:
+            flash_bulk_errors(error)
+        else:
+            bump_event_revision(event_id)
+            db.session.commit()
+            flash(f"{summary['created']} csapat felvéve, {summary['assigned']} csapat csoportba sorolva", 'success')
+    if event.event_type == "group_knockout" and Group.query.filter_by(event_id=event_id).first():
+        return redirect(url_for('group_knockout.assign_team_to_group', event_id=event_id))
+    return redirect(url_for('events.add_team', event_id=event_id))
+
+
+@events.route('/delete_team', methods=['POST'])
+def del_team():
+    team_id = request.form.get('team_id')
+    event_id = request.form.get('event_id')
+
+    if team_id:
+        team = Team.query.get(team_id)
+        if team:
+            db.session.delete(team)
+            # A tabellasorai is törlődnek
+            bump_event_revision(team.event_id, [team.group_id] if team.group_id else ())
+            db.session.commit()
+
+    return redirect(url_for('events.add_team', event_id=event_id))
+
+
+# A csoportok, illetve az ágrajz létrehozása eseménytípus szerint, utána a
+# lebonyolítási forma saját útvonalaira lépünk tovább. GET útvonal, dupla
+# kattintásnál párhuzamosan is érkezhet: a második kérés az egyedi kulcson
+# elbukik, és újrafuttatva már a meglévő szakaszokat találja.
+@events.route('/create_groups/<int:event_id>')
+def create_groups(event_id):
+    return retry_on_conflict(lambda: create_stages(event_id))
+
+
+def create_stages(event_id):
+    event = Event.query.get_or_404(event_id)
+    existing_groups = Group.query.filter_by(event_id=event_id).all()
+    team_count = db.session.query(func.count(
+        Team.id)).filter_by(event_id=event_id).scalar()
+
+    if existing_groups and event.event_type == "group_knockout":
+        return redirect(url_for('group_knockout.assign_team_to_group', event_id=event_id))
+
+    if event.event_type == "group_knockout":
+        for i in range(event.num_of_groups):
+            group = Group(name=chr(ord('A') + i), event_id=event_id)
+            db.session.add(group)
+        # Csoportonként az első kettő jut tovább
+        create_knockout_bracket(event_id, event.num_of_groups * 2)
+        bump_event_revision(event_id)
+        db.session.commit()
+        return redirect(url_for('group_knockout.assign_team_to_group', event_id=event_id))
+
+    if existing_groups and event.event_type == "knockout":
+        return redirect(url_for('knockout.create_first_knockout', event_id=event_id))
+
+    if event.event_type == "knockout":
+        if team_count < 2:
+            return redirect(url_for('events.add_team', event_id=event_id))
+        create_knockout_bracket(event_id, team_count)
+        bump_event_revision(event_id)
+        db.session.commit()
+        return redirect(url_for('knockout.create_first_knockout', event_id=event_id))
+
+    if existing_groups and event.event_type == "round_robin":
+        return redirect(url_for('round_robin.create_round_robin_matches', event_id=event_id))
+
+    if event.event_type == "round_robin":
+        group = Group(name=f'RR', event_id=event_id, kind='round_robin')
+        db.session.add(group)
+        # Egy tranzakcióban, hogy ütközéskor a csapatok beosztása se maradjon el
+        db.session.flush()
+        teams = Team.query.filter_by(event_id=event_id).all()
+        for team in teams:
+            team.group_id = group.id
+        bump_event_revision(event_id)
+        db.session.commit()
+
+        return redirect(url_for('round_robin.create_round_robin_matches', event_id=event_id))
+
+
+def set_type_of_match(event_id, match_group_id=None):
+    event = Event.query.get_or_404(event_id)
+    if event.event_type == "round_robin":
+        return "round_robin"
+
+    group = db.session.get(Group, match_group_id) if match_group_id else None
+    if group is not None and is_stage_started(group.id):
+        if group.kind == 'group':
+            return "group_match"
+        elif group.stage_order == 1:
+            return "advance_to_knockout"
+        else:
+            return "knock_out"
+    return "preparation"
+
+
+@events.route('/enter_result/<int:event_id>/<int:match_id>', methods=['GET', 'POST'])
+def enter_result(event_id, match_id):
+    event = Event.query.get_or_404(event_id)
+    # A következő mérkőzés is kell a zároláshoz és a győztes továbbléptetéséhez
+    match = matches_with_teams().options(joinedload(Match.next_match)).filter_by(
+        id=match_id).first_or_404()
+    group_id = match.group_id
+    form = MatchResultForm(obj=match)
+    if match.team1_id is None or match.team2_id is None:
+        flash('A mérkőzés csapatai még nem ismertek!', 'warning')
+        return redirect(url_for('knockout.list_knockout_stage_matches', event_id=event_id, group_id=group_id))
+    if form.validate_on_submit():
+        # Régebbi űrlap verzió nélkül: a most betöltött állapothoz képest nézzük
+        version = form.version.data if form.version.data is not None else match.version
+        return retry_on_conflict(lambda: save_result(event, match, version, form))
+    if event.event_type == "group_knockout":
+        type_of_match = set_type_of_match(event_id, match.group_id)
+        return render_template('enter_result.html', event=event, match=match, form=form, type_of_match=type_of_match, group_id=group_id)
+    if event.event_type == "round_robin":
+        type_of_match = "round_robin"
+        return render_template('enter_result_for_round_robin.html', event=event, match=match, form=form, type_of_match=type_of_match, group_id=group_id)
+    if event.event_type == "knockout":
+        type_of_match = "knockout"
+        return render_template('enter_result.html', event=event, match=match, form=form, type_of_match=type_of_match, group_id=group_id)
+
+
+# Optimista zárolás: ha a mérkőzés verziója eltér az űrlap megnyitásakor
+# látottól, valaki más közben mentett, ezért nem írjuk felül. Ütközésnél
+# (például a következő mérkőzésbe egy másik eredmény léptetett tovább, vagy a
+# tabellasor változott) a retry_on_conflict visszagörget és újrafuttatja; a
+# visszagörgetés után a mérkőzés és a tabella friss állapotát olvassuk be.
+def save_result(event, match, version, form):
+    event_id = event.id
+    if match.version != version:
+        flash('A mérkőzés eredményét közben valaki más módosította, ellenőrizd és mentsd újra!', 'warning')
+        return redirect(url_for('events.enter_result', event_id=event_id, match_id=match.id))
+    if is_result_locked(match):
+        flash('A következő kör mérkőzése már lezajlott, az eredmény nem módosítható!', 'danger')
+        return redirect(url_for('events.enter_result', event_id=event_id, match_id=match.id))
+    old_team1_score = match.team1_score
+    old_team2_score = match.team2_score
+    match.team1_score = form.team1_score.data
+    match.team2_score = form.team2_score.data
+    changed_standings = apply_result(
+        match, old_team1_score, old_team2_score)
+    advance_winner(match)
+    bump_event_revision(event_id, result_group_ids([match]))
+    message = result_message(event, match, changed_standings)
+    db.session.commit()
+    publish(event_id, message)
+    flash('Az eredmény sikeresen elmentve!', 'success')
+    return redirect(url_for('events.enter_result', event_id=event_id, match_id=match.id))
+
+
+# Több eredmény rögzítése egyszerre: a táblázatban módosított mezők és a
+# feltöltött CSV/JSON sorok egy tranzakcióban, a tabellák egyszeri frissítésével
+@events.route('/enter_results/<int:event_id>', methods=['GET', 'POST'])
+def enter_results(event_id):
+    event = Event.query.get_or_404(event_id)
+    form = BulkResultForm()
+    matches = editable_matches(event_id) if not event.is_ended else []
+    if form.validate_on_submit():
+        try:
+            rows = grid_rows(request.form, matches)
+            text = read_upload(form.file.data, form.rows.data)
+            if text and text.strip():
+                rows += read_rows(text, RESULT_COLUMNS)
+            saved = retry_on_conflict(lambda: commit_results(event, check_row_count(rows)))
+        except BulkError as error:
+            flash_bulk_errors(error)
+        else:
+            flash(f'{len(saved)} eredmény sikeresen elmentve!', 'success')
+        return redirect(url_for('events.enter_results', event_id=event_id))
+    group_matches = {}
+    for match, group_name in matches:
+        group_matches.setdefault(group_name, []).append(match)
+    return render_template('enter_results.html', event=event, form=form, group_matches=group_matches)
+
+
+@events.route('/event_result/<int:event_id>')
+def event_result(event_id):
+    event = Event.query.get_or_404(event_id)
+    return cached_page(event, 'event_result', lambda: render_event_result(event))
+
+
+def render_event_result(event):
+    placements = final_placements(event)
+    if event.event_type == "group_knockout":
+        return render_template('event_result_for_group_knockout.html', event=event, placements=placements)
+
+    if event.event_type == "knockout":
+        return render_template('event_result_for_knockout.html', event=event, placements=placements)
+
+    if event.event_type == "round_robin":
+        final_rr_result = [{'rank': rank, 'name': team['name']}
+                           for rank, teams in placements for team in teams]
+        return render_template('event_result_for_round_robin.html', event=event, final_rr_result=final_rr_result)
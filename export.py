@@ -0,0 +1,195 @@
+import csv
+import io
+
+from flask import abort, current_app, stream_with_context
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from classification import final_placements
+from models import db, Event, Group, Match, Standing, Team
+from payloads import to_json
+from ranking import rank_rows, ranking_rules, score_matrices
+from standings import needs_head_to_head, standing_to_row
+
+# Ennyi sort kérünk le egyszerre az adatbázisból, és ennyi sort küldünk egy
+# darabban: a memóriahasználat az archívum méretétől független marad
+CHUNK_SIZE = 1000
+
+TEAM_FIELDS = ('event_id', 'event_name', 'team_id', 'team_name', 'group_name')
+MATCH_FIELDS = ('event_id', 'match_id', 'stage', 'kind', 'stage_order', 'round',
+                'court', 'slot', 'position', 'team1_id', 'team1_name',
+                'team2_id', 'team2_name', 'team1_score', 'team2_score',
+                'next_match_id', 'next_slot')
+STANDING_FIELDS = ('event_id', 'group_name', 'rank', 'team_id', 'team_name',
+                   'played_games', 'wins', 'draws', 'losses', 'scored_goals',
+                   'conceded_goals', 'goal_difference', 'points')
+CLASSIFICATION_FIELDS = ('event_id', 'event_name', 'place', 'team_id', 'team_name')
+
+
+def stream(statement):
+    return db.session.execute(statement.execution_options(yield_per=CHUNK_SIZE))
+
+
+def for_event(statement, column, event_id):
+    if event_id is not None:
+        statement = statement.where(column == event_id)
+    return statement
+
+
+def team_rows(event_id):
+    statement = select(
+        Team.event_id, Event.name.label('event_name'), Team.id.label('team_id'),
+        Team.name.label('team_name'), Group.name.label('group_name')).join(
+        Event, Team.event_id == Event.id).outerjoin(
+        Group, Team.group_id == Group.id).order_by(Team.event_id, Team.id)
+    for row in stream(for_event(statement, Team.event_id, event_id)).mappings():
+        yield row
+
+
+def match_rows(event_id):
+    team1 = aliased(Team)
+    team2 = aliased(Team)
+    statement = select(
+        Match.event_id, Match.id.label('match_id'), Group.name.label('stage'),
+        Group.kind, Group.stage_order, Match.round_number.label('round'),
+        Match.court, Match.slot, Match.bracket_position.label('position'),
+        Match.team1_id, team1.name.label('team1_name'),
+        Match.team2_id, team2.name.label('team2_name'),
+        Match.team1_score, Match.team2_score,
+        Match.next_match_id, Match.next_slot).outerjoin(
+        Group, Match.group_id == Group.id).outerjoin(
+        team1, Match.team1_id == team1.id).outerjoin(
+        team2, Match.team2_id == team2.id).order_by(
+        Match.event_id, Group.stage_order, Match.group_id, Match.round_number,
+        Match.slot, Match.bracket_position, Match.id)
+    for row in stream(for_event(statement, Match.event_id, event_id)).mappings():
+        yield row
+
+
+def group_key(row):
+    return row.event_id, row.group_id
+
+
+# A csoportkör lejátszott mérkőzései ugyanabban a sorrendben, mint a
+# tabellasorok, így a kettő egyszerre, egy-egy menetben olvasható
+def played_stage_matches(event_id):
+    statement = select(
+        Match.event_id, Match.group_id, Match.team1_id, Match.team2_id,
+        Match.team1_score, Match.team2_score).join(
+        Group, Match.group_id == Group.id).where(
+        Group.kind.in_(('group', 'round_robin')),
+        Match.team1_score.isnot(None), Match.team2_score.isnot(None)).order_by(
+        Match.event_id, Match.group_id)
+    return stream(for_event(statement, Match.event_id, event_id))
+
+
+# Egy csoport tabellája a get_group_tables szabályaival rendezve
+def ranked_group(table, results):
+    rules = ranking_rules(table[0]['sport_type'])
+    matrices = None
+    if results and needs_head_to_head(table, rules):
+        matrices = score_matrices([row['team_id'] for row in table], results, rules)
+    for rank, row in enumerate(rank_rows(table, rules, matrices), start=1):
+        yield dict(row, rank=rank)
+
+
+# A tabellasorok csoportonként érkeznek, így egyszerre csak egy csoportot
+# kell memóriában tartani a rendezéshez. Az egymás elleni eredményekhez a
+# mérkőzéseket egy második, vele együtt léptetett lekérdezés adja.
+def standing_rows(event_id):
+    statement = select(
+        Standing, Team.name, Group.name, Event.sport_type).join(
+        Team, Standing.team_id == Team.id).join(
+        Group, Standing.group_id == Group.id).join(
+        Event, Standing.event_id == Event.id).where(
+        Group.kind.in_(('group', 'round_robin'))).order_by(
+        Standing.event_id, Standing.group_id, Standing.id)
+    matches = iter(played_stage_matches(event_id))
+    match = next(matches, None)
+
+    def group_results(key):
+        nonlocal match
+        results = []
+        while match is not None and group_key(match) <= key:
+            if group_key(match) == key:
+                results.append(tuple(match)[2:])
+            match = next(matches, None)
+        return results
+
+    current = None
+    table = []
+    for standing, team_name, group_name, sport_type in stream(
+            for_event(statement, Standing.event_id, event_id)):
+        if group_key(standing) != current and table:
+            yield from ranked_group(table, group_results(current))
+            table = []
+        current = group_key(standing)
+        table.append(dict(standing_to_row(standing, team_name),
+                          event_id=standing.event_id, group_name=group_name,
+                          sport_type=sport_type))
+    if table:
+        yield from ranked_group(table, group_results(current))
+
+
+# A végeredményt eseményenként ugyanaz a függvény állítja elő, mint az
+# eredményoldalt; az eseményeket is darabonként olvassuk
+def classification_rows(event_id):
+    statement = select(Event).order_by(Event.id)
+    for event in stream(for_event(statement, Event.id, event_id)).scalars():
+        for place, teams in final_placements(event):
+            for team in teams:
+                yield {'event_id': event.id, 'event_name': event.name,
+                       'place': place, 'team_id': team['id'],
+                       'team_name': team['name']}
+
+
+DATASETS = {
+    'teams': (TEAM_FIELDS, team_rows),
+    'matches': (MATCH_FIELDS, match_rows),
+    'standings': (STANDING_FIELDS, standing_rows),
+    'classification': (CLASSIFICATION_FIELDS, classification_rows),
+}
+
+
+def csv_chunks(fields, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([row[field] for field in fields])
+        if count % CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_chunks(fields, rows):
+    lines = []
+    for row in rows:
+        lines.append(to_json({field: row[field] for field in fields}))
+        if len(lines) == CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+FORMATS = {
+    'csv': ('text/csv', csv_chunks),
+    'ndjson': ('application/x-ndjson', ndjson_chunks),
+}
+
+
+# Generátorral előállított válasz: a sorokat az adatbázisból darabonként
+# olvassuk és azonnal küldjük, event_id nélkül a teljes archívumot
+def export_response(dataset, file_format, event_id=None):
+    if dataset not in DATASETS or file_format not in FORMATS:
+        abort(404)
+    fields, rows = DATASETS[dataset]
+    mimetype, chunks = FORMATS[file_format]
+    name = f'event_{event_id}_{dataset}' if event_id is not None else dataset
+    return current_app.response_class(
+        stream_with_context(chunks(fields, rows(event_id))),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={name}.{file_format}'})
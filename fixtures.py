@@ -0,0 +1,75 @@
+from sqlalchemy import insert
+
+from models import db, Match
+from standings import create_standings
+
+
+# Körmérkőzéses sorsolás körforgásos (Berger) módszerrel. Fordulónként
+# minden csapat legfeljebb egyszer játszik, páratlan létszámnál egy csapat
+# pihen. Egy forduló előállítása lineáris a csapatok számában.
+def round_robin_pairings(team_ids):
+    circle = list(team_ids)
+    if len(circle) % 2:
+        circle.append(None)
+    n = len(circle)
+    for round_index in range(n - 1):
+        for i in range(n // 2):
+            home, away = circle[i], circle[n - 1 - i]
+            if home is None or away is None:
+                continue
+            # A rögzített csapat felváltva hazai és vendég
+            if i == 0 and round_index % 2:
+                home, away = away, home
+            yield round_index + 1, home, away
+        circle.insert(1, circle.pop())
+
+
+# Fordulónként kiosztja a pályákat és az idősávokat. Egy fordulón belül
+# egy csapat csak egyszer szerepel, így a párhuzamos mérkőzések nem ütköznek.
+def assign_courts(rows, courts):
+    rows.sort(key=lambda row: row['round_number'])
+    slot = 0
+    current_round = None
+    position = 0
+    for row in rows:
+        if row['round_number'] != current_round:
+            current_round = row['round_number']
+            position = 0
+        if courts:
+            if position % courts == 0:
+                slot += 1
+            row['court'] = position % courts + 1
+            row['slot'] = slot
+        position += 1
+    return rows
+
+
+def fixture_rows(event_id, group_id, team_ids):
+    return [{
+        'event_id': event_id,
+        'group_id': group_id,
+        'team1_id': team1_id,
+        'team2_id': team2_id,
+        'team1_score': None,
+        'team2_score': None,
+        'round_number': round_number,
+        'court': None,
+        'slot': None,
+    } for round_number, team1_id, team2_id in round_robin_pairings(team_ids)]
+
+
+# Egyetlen executemany INSERT az összes mérkőzésre, ORM objektumok nélkül
+def bulk_create_matches(rows):
+    if rows:
+        db.session.execute(insert(Match), rows)
+    return len(rows)
+
+
+# group_teams: {group_id: [team_id, ...]}. A csoportok azonos fordulói
+# egy játéknapra kerülnek, a pályákon osztoznak.
+def create_round_robin_fixtures(event_id, group_teams, courts=None):
+    rows = []
+    for group_id, team_ids in group_teams.items():
+        rows.extend(fixture_rows(event_id, group_id, team_ids))
+        create_standings(event_id, group_id, team_ids)
+    return bulk_create_matches(assign_courts(rows, courts))
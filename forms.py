@@ -1,6 +1,8 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, SelectField, SubmitField, IntegerField, DateField, HiddenField
-from wtforms.validators import DataRequired, InputRequired
+from flask_wtf.file import FileField
+from wtforms import StringField, SelectField, SubmitField, IntegerField, DateField, HiddenField, TextAreaField
+from wtforms.validators import DataRequired, InputRequired, Optional, NumberRange
+from wtforms.widgets import HiddenInput
 from models import Event
 
 
@@ -20,9 +22,29 @@ class AddForm(FlaskForm):
                              validators=[DataRequired()])
     num_of_groups = SelectField('Csoportok száma:', choices=[('', '-'),
                                 (2, '2 csoport'), (4, '4 csoport'), (8, '8 csoport')])
+    num_of_courts = IntegerField('Pályák száma:', validators=[
+                                 Optional(), NumberRange(min=1)])
     submit = SubmitField('Esemény létrehozása')
 
 
+class EventFilterForm(FlaskForm):
+    class Meta:
+        csrf = False
+
+    sport_type = SelectField('Sportág:', choices=[('', '-Minden sportág-'),
+                             ('football', 'Labdarúgás'),
+                             ('basketball', 'Kosárlabda'),
+                             ('handball', 'Kézilabda'),
+                             ('volleyball', ('Röplabda'))])
+    event_type = SelectField('Esemény típusa:', choices=[('', '-Minden lebonyolítás-'), ('round_robin', 'Körmérkőzéses rendszer'),
+                                                         ('knockout',
+                                                          'Egyenes kieséses rendszer'),
+                                                         ('group_knockout', 'Csoportkörös majd egyeneskieséses rendszer')])
+    is_ended = SelectField('Állapot:', choices=[('', '-Mind-'),
+                           ('0', 'Folyamatban'), ('1', 'Lezárva')])
+    submit = SubmitField('Szűrés')
+
+
 class AddTeamForm(FlaskForm):
     name = StringField('Csapatnév:', validators=[DataRequired()])
     event_id = IntegerField('event_id', validators=[
@@ -40,6 +62,20 @@ class AssignTeamForm(FlaskForm):
 
 class MatchResultForm(FlaskForm):
     match_id = HiddenField('Match ID')
+    # A megnyitáskori verzió: ha közben más mentett, nem írjuk felül
+    version = IntegerField('Verzió', widget=HiddenInput(), validators=[Optional()])
     team1_score = IntegerField('Hazai:', validators=[InputRequired()])
     team2_score = IntegerField('Vendég', validators=[InputRequired()])
     submit = SubmitField('Submit')
+
+
+class BulkTeamForm(FlaskForm):
+    rows = TextAreaField('Csapatok (soronként: név, csoport) vagy JSON:')
+    file = FileField('CSV vagy JSON fájl:')
+    submit = SubmitField('Importálás')
+
+
+class BulkResultForm(FlaskForm):
+    rows = TextAreaField('Eredmények (soronként: mérkőzés azonosító, hazai, vendég) vagy JSON:')
+    file = FileField('CSV vagy JSON fájl:')
+    submit = SubmitField('Eredmények mentése')
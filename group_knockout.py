@@ -0,0 +1,164 @@
+from flask import Blueprint, current_app, render_template, url_for, redirect
+from forms import AssignTeamForm, BulkTeamForm
+from models import db, Event, Team, Match
+from standings import event_group_tables, get_group_tables, load_stage_matches, name_tables
+from clinch import qualification_status
+from fixtures import create_round_robin_fixtures
+from seeding import seed_bracket, rank_group_qualifiers
+from bracket import knockout_stages, stage_groups, fill_first_round, is_knockout_started
+from stage_status import get_stage_status, is_stage_complete, pending_matches
+from events import matches_with_teams
+from page_cache import cached_page, cached_fragments, bump_event_revision
+from ranking import ranking_rules
+from concurrency import retry_on_conflict
+
+# Csoportkör, majd a csoportok legjobbjaival kieséses szakasz; az ágrajz
+# köreit a knockout blueprint kezeli
+group_knockout = Blueprint('group_knockout', __name__)
+
+
+@group_knockout.route('/assign_team_to_group/<int:event_id>', methods=['GET', 'POST'])
+def assign_team_to_group(event_id):
+    form = AssignTeamForm()
+    event = Event.query.get_or_404(event_id)
+    teams = Team.query.filter_by(event_id=event_id).all()
+    groups = stage_groups(event_id)
+    existing_matches = Match.query.filter(Match.event_id == event_id, Match.group_id.in_(
+        [group.id for group in groups])).all()
+    form.team.choices = [(team.id, team.name) for team in teams]
+    form.group.choices = [(group.id, group.name)
+                          for group in groups[:event.num_of_groups]]
+    all_assigned = True
+    for team in teams:
+        if team.group_id is None:
+            all_assigned = False
+            break
+    if form.validate_on_submit():
+        team_id = form.team.data
+        group_id = form.group.data
+
+        team = Team.query.get(team_id)
+        team.group_id = group_id
+        bump_event_revision(event_id)
+        db.session.commit()
+
+        return redirect(url_for('group_knockout.assign_team_to_group', event_id=event_id))
+    return render_template('assign_team_to_group.html', event=event, teams=teams, groups=groups, form=form, bulk_form=BulkTeamForm(), all_assigned=all_assigned, existing_matches=existing_matches)
+
+
+# Párhuzamos kérésnél csak az egyik sorsolás marad meg (egyedi kulcsok)
+@group_knockout.route('/create_group_matches/<int:event_id>', methods=['GET', 'POST'])
+def create_group_matches(event_id):
+    return retry_on_conflict(lambda: create_group_stage(event_id))
+
+
+def create_group_stage(event_id):
+    groups = stage_groups(event_id)
+    teams = Team.query.filter_by(event_id=event_id).all()
+    group_ids = [group.id for group in groups]
+    existing_matches = Match.query.filter(
+        Match.event_id == event_id, Match.group_id.in_(group_ids)).all()
+    if existing_matches:
+        return redirect(url_for('group_knockout.select_match', event_id=event_id))
+
+    event = Event.query.get_or_404(event_id)
+    group_teams = {}
+    for g_id in group_ids[:event.num_of_groups]:
+        group_teams[g_id] = [team.id for team in teams if team.group_id == g_id]
+    create_round_robin_fixtures(event_id, group_teams, event.num_of_courts)
+    bump_event_revision(event_id, group_teams)
+    db.session.commit()
+    return redirect(url_for('group_knockout.select_match', event_id=event_id))
+
+# CSOPORT EREDMÉNYEK LEKÉRDEZÉSE
+
+
+def generate_group_data_overview(event_id, group_ids=[]):
+    event = Event.query.get_or_404(event_id)
+    return event_group_tables(event, group_ids)
+
+
+@group_knockout.route('/groups_overview/<int:event_id>', methods=['GET', 'POST'])
+def groups_overview(event_id):
+    event = Event.query.get_or_404(event_id)
+    return cached_page(event, 'groups_overview', lambda: render_groups_overview(event))
+
+
+def render_groups_overview(event):
+    groups = stage_groups(event.id)
+    fragments = cached_fragments(event, groups, 'groups_overview',
+                                 lambda missing: render_group_tables(event, missing))
+    return render_template('groups_overview.html', event=event, groups=groups,
+                           fragments=fragments)
+
+
+# Csak a megadott csoportok tabellái, esélyei és állapota
+def render_group_tables(event, groups):
+    # A szimuláció (numpy) importja lassú, csak az első ilyen oldalnál töltjük be
+    from simulation import qualification_probabilities
+    group_ids = [group.id for group in groups]
+    # A mérkőzéseket egyszer töltjük be a tabellákhoz és a szimulációhoz is
+    matches = load_stage_matches(event.id, group_ids)
+    group_data = name_tables(groups, get_group_tables(
+        event.id, group_ids, ranking_rules(event.sport_type), matches))
+    # A véletlenmag a csoport revíziója, így a részlet a gyorsítótárral együtt stabil
+    probabilities = qualification_probabilities(
+        event, group_data, matches,
+        seeds={group.name: (group.id, group.revision) for group in groups})
+    status = qualification_status(event, group_data, matches)
+    return {group.id: render_template('groups_overview_group.html', group_name=group.name,
+                                      teams=group_data[group.name], status=status,
+                                      probabilities=probabilities)
+            for group in groups}
+
+
+@group_knockout.route('/select_match/<int:event_id>', methods=['GET'])
+def select_match(event_id):
+    event = Event.query.get_or_404(event_id)
+    groups = stage_groups(event_id)
+    stage_group_ids = [group.id for group in groups]
+    stage_status = get_stage_status(event_id)
+    all_check_true = all(is_stage_complete(stage_status, group_id)
+                         for group_id in stage_group_ids)
+    pending_count = pending_matches(stage_status, stage_group_ids)
+    # A kieséses szakasz kitöltése után a csoporteredmények már nem módosíthatók
+    existing_next_stage = is_knockout_started(event_id)
+    fragments = cached_fragments(
+        event, groups, 'select_match',
+        lambda missing: render_group_matches(event, missing, existing_next_stage),
+        (existing_next_stage,))
+    return render_template('select_match.html', event=event, groups=groups, fragments=fragments, all_check_true=all_check_true, pending_count=pending_count, existing_next_stage=existing_next_stage)
+
+
+def render_group_matches(event, groups, existing_next_stage):
+    matches = matches_with_teams().filter(Match.group_id.in_([group.id for group in groups])).order_by(
+        Match.round_number, Match.slot, Match.court, Match.id).all()
+    return {group.id: render_template('select_match_group.html', event=event, group_name=group.name,
+                                      matches=[match for match in matches if match.group_id == group.id],
+                                      existing_next_stage=existing_next_stage)
+            for group in groups}
+
+
+# Ha két kérés egyszerre tölti ki az első kört, a második UPDATE-je a
+# verziószámon elbukik, újrafuttatva pedig már kitöltöttnek látja
+@group_knockout.route('/advance_to_knockout/<int:event_id>')
+def advance_to_knockout(event_id):
+    return retry_on_conflict(lambda: fill_knockout_from_groups(event_id))
+
+
+def fill_knockout_from_groups(event_id):
+    event = Event.query.get_or_404(event_id)
+    group_data = generate_group_data_overview(event_id)
+    stages = knockout_stages(event_id)
+    first_stage = stages[0]
+
+    # Csoportonként a továbbjutók, a sportág szabályai szerint rangsorolva
+    qualifiers = rank_group_qualifiers(group_data, ranking_rules(event.sport_type))
+    slots = seed_bracket(qualifiers, current_app.config['SEPARATE_GROUPS'])
+
+    # Csak akkor töltjük ki az első kört, ha még üres
+    if fill_first_round(stages, slots):
+        bump_event_revision(event_id, [group.id for group in stages[:2]])
+        db.session.commit()
+
+    return redirect(url_for('knockout.list_knockout_stage_matches', event_id=event_id, group_id=first_stage.id))
@@ -0,0 +1,285 @@
+import bisect
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import (before_render_template, g, has_request_context, jsonify, request,
+                   template_rendered)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from profiler import DEFAULT_INTERVAL, SamplingProfiler, write_stacks
+
+# Route-onkénti SQL lekérdezés keret. Ha egy nézet túllépi, az N+1
+# lekérdezések visszatértét jelzi.
+QUERY_BUDGETS = {
+    'events.list_events': 2,
+    'events.manage_event': 10,
+    'group_knockout.select_match': 5,
+    'round_robin.list_of_round_robin_matches': 5,
+    'knockout.list_knockout_stage_matches': 5,
+    'group_knockout.groups_overview': 5,
+    'round_robin.round_robin_overview': 5,
+    'events.enter_result': 10,
+    'knockout.knockout_stage': 8,
+    'events.event_result': 12,
+}
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def query_count():
+    return g.get('query_count', 0)
+
+
+def init_query_counter(app):
+    app.config.setdefault('QUERY_BUDGETS', QUERY_BUDGETS)
+    # None esetén teszt módban hibát dobunk, egyébként csak naplózunk
+    app.config.setdefault('QUERY_BUDGET_STRICT', None)
+    if not event.contains(Engine, 'before_cursor_execute', _count_query):
+        event.listen(Engine, 'before_cursor_execute', _count_query)
+
+    @app.after_request
+    def check_query_budget(response):
+        count = query_count()
+        budget = app.config['QUERY_BUDGETS'].get(request.endpoint)
+        if app.debug or app.testing:
+            response.headers['X-Query-Count'] = str(count)
+        if budget is not None and count > budget:
+            message = (f"{request.endpoint}: {count} SQL lekérdezés, "
+                       f"a keret {budget}")
+            strict = app.config['QUERY_BUDGET_STRICT']
+            if strict or (strict is None and app.testing):
+                raise QueryBudgetExceeded(message)
+            app.logger.warning(message)
+        return response
+
+
+# A kérés teljes ideje ezekbe a sávokba kerül (másodperc)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRIC_PREFIX = 'verseny'
+
+
+# Útvonalankénti összesítők a /metrics végponthoz. Folyamatonként külön
+# gyűlnek, több munkafolyamatnál a Prometheus mindegyiket külön olvassa.
+class Metrics:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()
+        self.durations = defaultdict(lambda: [0] * (len(DURATION_BUCKETS) + 1))
+        self.duration_sums = Counter()
+        self.totals = defaultdict(Counter)
+
+    def observe(self, endpoint, method, status, elapsed, stats):
+        bucket = bisect.bisect_left(DURATION_BUCKETS, elapsed)
+        with self._lock:
+            self.requests[(endpoint, method, str(status))] += 1
+            self.durations[endpoint][bucket] += 1
+            self.duration_sums[endpoint] += elapsed
+            for name, value in stats.items():
+                self.totals[name][endpoint] += value
+
+    def render(self, page_cache_stats=None, fragment_cache_stats=None):
+        with self._lock:
+            lines = []
+            write_metric(lines, 'http_requests_total', 'counter', 'Kérések száma',
+                         [({'endpoint': endpoint, 'method': method, 'status': status}, count)
+                          for (endpoint, method, status), count in sorted(self.requests.items())])
+            name = f'{METRIC_PREFIX}_http_request_duration_seconds'
+            lines.append(f'# HELP {name} A kérés teljes ideje')
+            lines.append(f'# TYPE {name} histogram')
+            for endpoint, counts in sorted(self.durations.items()):
+                total = 0
+                for bound, count in zip(DURATION_BUCKETS + ('+Inf',), counts):
+                    total += count
+                    lines.append(f'{name}_bucket{labels(endpoint=endpoint, le=bound)} {total}')
+                lines.append(f'{name}_sum{labels(endpoint=endpoint)} {self.duration_sums[endpoint]}')
+                lines.append(f'{name}_count{labels(endpoint=endpoint)} {total}')
+            for key, (metric, help_text) in REQUEST_STATS.items():
+                write_metric(lines, metric, 'counter', help_text,
+                             [({'endpoint': endpoint}, value)
+                              for endpoint, value in sorted(self.totals[key].items())])
+        for key, value in sorted((page_cache_stats or {}).items()):
+            write_metric(lines, f'page_cache_{key}', 'gauge',
+                         'Oldal gyorsítótár állapota', [({}, value)])
+        for key, value in sorted((fragment_cache_stats or {}).items()):
+            write_metric(lines, f'fragment_cache_{key}', 'gauge',
+                         'Részlet gyorsítótár állapota', [({}, value)])
+        return '\n'.join(lines) + '\n'
+
+
+# Kérésenként gyűjtött értékek és a hozzájuk tartozó Prometheus nevek
+REQUEST_STATS = {
+    'sql_statements': ('sql_statements_total', 'Végrehajtott SQL utasítások'),
+    'sql_seconds': ('sql_seconds_total', 'SQL utasításokkal töltött idő'),
+    'sql_rows': ('sql_rows_fetched_total', 'Lekérdezésekből beolvasott sorok'),
+    'template_seconds': ('template_render_seconds_total', 'Sablonok renderelési ideje'),
+}
+
+
+def labels(**values):
+    if not values:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in values.values())
+    return '{' + ','.join(f'{key}="{value}"'
+                          for key, value in zip(values, escaped)) + '}'
+
+
+def write_metric(lines, name, kind, help_text, samples):
+    name = f'{METRIC_PREFIX}_{name}'
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+    for label_values, value in samples:
+        lines.append(f'{name}{labels(**label_values)} {value}')
+
+
+def _request_stats():
+    if has_request_context():
+        return g.get('request_stats')
+    return None
+
+
+# A lekérdezés sorait az eredmény a kurzorból olvassa; a kurzort lecserélve
+# megszámoljuk, hány sort hoz be ténylegesen
+class CountingCursor:
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats['sql_rows'] += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._stats['sql_rows'] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats['sql_rows'] += len(rows)
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    if _request_stats() is not None:
+        context.metrics_started = time.perf_counter()
+
+
+def _finish_statement(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats()
+    started = getattr(context, 'metrics_started', None)
+    if stats is None or started is None:
+        return
+    stats['sql_statements'] += 1
+    stats['sql_seconds'] += time.perf_counter() - started
+    if cursor.description is not None and context.cursor is cursor:
+        context.cursor = CountingCursor(cursor, stats)
+
+
+def _start_template(sender, template, context, **extra):
+    if _request_stats() is not None:
+        g.template_started = time.perf_counter()
+
+
+def _finish_template(sender, template, context, **extra):
+    stats = _request_stats()
+    started = g.pop('template_started', None) if stats is not None else None
+    if started is not None:
+        stats['template_seconds'] += time.perf_counter() - started
+
+
+# Opcionális mérés: METRICS_ENABLED esetén útvonalanként összesítjük a kérés
+# idejét, az SQL utasítások számát, idejét és a beolvasott sorokat, valamint
+# a sablonok renderelési idejét, és a /metrics végponton Prometheus szöveges
+# formátumban adjuk ki, a gyorsítótárak számlálóival együtt (ezek JSON-ban a
+# /cache_stats végponton is). PROFILE_SLOW_MS megadásakor a kéréseket
+# mintavételezve profilozzuk, és a küszöbnél lassabbak hívási láncait
+# PROFILE_DIR-be írjuk.
+# Folyamként küldött válaszoknál csak az első bájtig eltelt időt mérjük.
+def init_metrics(app):
+    app.config.setdefault('METRICS_ENABLED', False)
+    app.config.setdefault('PROFILE_SLOW_MS', None)
+    app.config.setdefault('PROFILE_DIR', 'profiles')
+    app.config.setdefault('PROFILE_INTERVAL', DEFAULT_INTERVAL)
+    enabled = app.config['METRICS_ENABLED']
+    slow_ms = app.config['PROFILE_SLOW_MS']
+    if not enabled and slow_ms is None:
+        return
+
+    metrics = app.extensions['metrics'] = Metrics() if enabled else None
+    profiler = None
+    if slow_ms is not None:
+        profiler = SamplingProfiler(app.config['PROFILE_INTERVAL'])
+        os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+    if not event.contains(Engine, 'before_cursor_execute', _start_statement):
+        event.listen(Engine, 'before_cursor_execute', _start_statement)
+        event.listen(Engine, 'after_cursor_execute', _finish_statement)
+    before_render_template.connect(_start_template, app)
+    template_rendered.connect(_finish_template, app)
+
+    @app.before_request
+    def start_request():
+        g.request_started = time.perf_counter()
+        g.request_stats = Counter()
+        if profiler is not None:
+            profiler.start(threading.get_ident())
+
+    @app.after_request
+    def record_request(response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - g.pop('request_started')
+        endpoint = request.endpoint or 'unmatched'
+        if enabled:
+            metrics.observe(endpoint, request.method, response.status_code, elapsed, stats)
+        if profiler is not None:
+            stacks = profiler.stop(threading.get_ident())
+            if elapsed * 1000 >= slow_ms and stacks:
+                name = f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint}-{elapsed * 1000:.0f}ms.folded"
+                path = os.path.join(app.config['PROFILE_DIR'], name)
+                write_stacks(path, stacks)
+                app.logger.info('%s: %.0f ms, profil: %s', endpoint, elapsed * 1000, path)
+        return response
+
+    if profiler is not None:
+        # Kivétel esetén az after_request elmaradhat
+        @app.teardown_request
+        def stop_profiler(error):
+            profiler.stop(threading.get_ident())
+
+    if enabled:
+        @app.route('/metrics')
+        def metrics_endpoint():
+            cache = app.extensions.get('page_cache')
+            fragments = app.extensions.get('fragment_cache')
+            return app.response_class(
+                metrics.render(cache.stats() if cache else None,
+                               fragments.stats() if fragments else None),
+                mimetype='text/plain; version=0.0.4')
+
+        # A gyorsítótárak állapota JSON-ban; a belső állapotot mutatja, ezért
+        # a /metrics-hez hasonlóan csak bekapcsolt mérésnél érhető el
+        @app.route('/cache_stats')
+        def cache_stats():
+            cache = app.extensions.get('page_cache')
+            fragments = app.extensions.get('fragment_cache')
+            return jsonify(dict(cache.stats() if cache else {},
+                                fragments=fragments.stats() if fragments else None))
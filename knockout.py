@@ -0,0 +1,89 @@
+from flask import Blueprint, render_template, url_for, redirect
+from models import db, Event, Team, Group, Match
+from seeding import seed_bracket
+from bracket import knockout_stages, next_stage, fill_first_round, is_next_stage_played, match_winner_id
+from stage_status import get_stage_status, has_draw
+from events import matches_with_teams, is_group_complete_by_group_id
+from page_cache import cached_page, bump_event_revision
+from concurrency import retry_on_conflict
+
+# Kieséses szakasz: önálló kieséses esemény, illetve a csoportkör utáni
+# ágrajz körei
+knockout = Blueprint('knockout', __name__)
+
+# ELSŐ KIESÉSES SZAKASZ
+
+
+# Párhuzamos kérésnél az első kör kitöltése csak egyszer sikerül (verziószám),
+# a másik újrafuttatva már kitöltöttnek látja
+@knockout.route('/create_first_knockout/<int:event_id>')
+def create_first_knockout(event_id):
+    return retry_on_conflict(lambda: fill_first_knockout(event_id))
+
+
+def fill_first_knockout(event_id):
+    event = Event.query.get_or_404(event_id)
+    teams = Team.query.filter_by(event_id=event_id)
+    stages = knockout_stages(event_id)
+    first_stage = stages[0]
+    # Csak akkor töltjük ki az első kört, ha még üres
+    # Nincs előzetes rangsor, a nevezés sorrendje a kiemelés
+    if fill_first_round(stages, seed_bracket([team.id for team in teams])):
+        bump_event_revision(event_id, [group.id for group in stages[:2]])
+        db.session.commit()
+
+    return redirect(url_for('knockout.list_knockout_stage_matches', event_id=event_id, group_id=first_stage.id))
+
+
+# Döntetlen ellenőrzés
+
+
+def is_not_draw_in_group(event_id, group_id):
+    return not has_draw(get_stage_status(event_id), group_id)
+
+
+@knockout.route('/list_knockout_stage_matches/<int:event_id>/<int:group_id>')
+def list_knockout_stage_matches(event_id, group_id):
+    event = Event.query.get_or_404(event_id)
+    return cached_page(event, f'knockout_stage_{group_id}', lambda: render_knockout_stage_matches(event, group_id))
+
+
+def render_knockout_stage_matches(event, group_id):
+    event_id = event.id
+    group = Group.query.filter_by(id=group_id, event_id=event_id).first_or_404()
+    matches = matches_with_teams().filter_by(
+        event_id=event_id, group_id=group_id).order_by(Match.bracket_position, Match.id).all()
+    checker = is_group_complete_by_group_id(event_id, group_id)
+    not_draw_in_group = is_not_draw_in_group(event_id, group_id)
+    # Ha a következő körben már van eredmény, ez a kör lezárult
+    existing_next_stage = is_next_stage_played(group)
+    # Erőnyerők esetén egy korábbi körben is lehet egyetlen mérkőzés
+    is_final = all(match.next_match_id is None for match in matches)
+    return render_template('list_knockout_stage_matches.html', event=event, matches=matches, checker=checker, group_id=group_id, not_draw_in_group=not_draw_in_group, existing_next_stage=existing_next_stage, is_final=is_final)
+
+@knockout.route('/knockout_stage/<int:event_id>/<int:group_id>')
+def knockout_stage(event_id, group_id):
+    return retry_on_conflict(lambda: close_knockout_stage(event_id, group_id))
+
+
+def close_knockout_stage(event_id, group_id):
+    event = Event.query.get_or_404(event_id)
+    group = Group.query.filter_by(id=group_id, event_id=event_id).first_or_404()
+
+    # A győztesek eredményrögzítéskor már továbbléptek, csak a következő kör kell
+    following = next_stage(group)
+    if following is not None:
+        return redirect(url_for('knockout.list_knockout_stage_matches', event_id=event_id, group_id=following.id))
+
+    # Ellenőrzés: van-e végső győztes?
+    final = matches_with_teams().filter_by(group_id=group_id).first()
+    winner_id = match_winner_id(final) if final else None
+    if winner_id is not None:
+        final_winner = final.team1 if winner_id == final.team1_id else final.team2
+        if not event.is_ended:
+            event.is_ended = True
+            bump_event_revision(event_id)
+            db.session.commit()
+        return render_template('final_winner.html', event=event, final_winner=final_winner, group_id=group_id)
+
+    return redirect(url_for('knockout.list_knockout_stage_matches', event_id=event_id, group_id=group_id))
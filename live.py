@@ -0,0 +1,87 @@
+import queue
+
+from flask import Blueprint, Response, current_app
+
+from broker import get_broker
+from models import Event
+from payloads import match_payload, to_json
+from standings import standing_to_row
+
+KEEPALIVE_SECONDS = 15
+
+live = Blueprint('live', __name__)
+
+
+def event_channel(event_id):
+    return f'event:{event_id}'
+
+
+def format_sse(kind, payload, message_id=None):
+    lines = []
+    if message_id is not None:
+        lines.append(f'id: {message_id}')
+    lines.append(f'event: {kind}')
+    lines.append(f'data: {to_json(payload)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def standings_rows(changed_standings, matches):
+    team_names = {}
+    for match in matches:
+        team_names[match.team1_id] = match.team1.name
+        team_names[match.team2_id] = match.team2.name
+    return [dict(standing_to_row(standing, team_names.get(standing.team_id)),
+                 group_id=standing.group_id)
+            for standing in changed_standings]
+
+
+# A commit előtt állítjuk össze, hogy utána ne kelljen újra betölteni semmit
+def result_message(event, match, changed_standings):
+    payload = {
+        'event_id': event.id,
+        'revision': event.revision,
+        'match': match_payload(match),
+        'standings': standings_rows(changed_standings, [match]),
+    }
+    return format_sse('match_result', payload, event.revision)
+
+
+# Kötegelt rögzítésnél egyetlen üzenet az összes mérkőzéssel
+def results_message(event, matches, changed_standings):
+    payload = {
+        'event_id': event.id,
+        'revision': event.revision,
+        'matches': [match_payload(match) for match in matches],
+        'standings': standings_rows(changed_standings, matches),
+    }
+    return format_sse('match_results', payload, event.revision)
+
+
+def publish(event_id, message):
+    return get_broker().publish(event_channel(event_id), message)
+
+
+@live.route('/events/<int:event_id>/stream')
+def event_stream(event_id):
+    Event.query.get_or_404(event_id)
+    broker = get_broker()
+    channel = event_channel(event_id)
+    keepalive = current_app.config.get('SSE_KEEPALIVE_SECONDS', KEEPALIVE_SECONDS)
+
+    # Csak az első olvasáskor iratkozunk fel: ha a választ sosem olvassák ki
+    # (a kliens előbb bontja a kapcsolatot), nem marad gazdátlan sor
+    def generate():
+        subscription = broker.subscribe(channel)
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    yield subscription.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            broker.unsubscribe(channel, subscription)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache',
+                             'X-Accel-Buffering': 'no'})
@@ -0,0 +1,139 @@
+"""bracket
+
+Revision ID: 5f248f8728f9
+Revises: 865fc7a4be0c
+Create Date: 2026-10-18 06:52:27.609743
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+events = sa.table('events', sa.column('id'), sa.column('event_type'),
+                  sa.column('num_of_groups'))
+groups = sa.table('groups', sa.column('id'), sa.column('event_id'),
+                  sa.column('kind'), sa.column('stage_order'))
+matches = sa.Table('matches', sa.MetaData(),
+                   sa.Column('id', sa.Integer, primary_key=True),
+                   sa.Column('event_id', sa.Integer),
+                   sa.Column('group_id', sa.Integer),
+                   sa.Column('team1_id', sa.Integer),
+                   sa.Column('team2_id', sa.Integer),
+                   sa.Column('team1_score', sa.Integer),
+                   sa.Column('team2_score', sa.Integer),
+                   sa.Column('bracket_position', sa.Integer),
+                   sa.Column('next_match_id', sa.Integer),
+                   sa.Column('next_slot', sa.Integer))
+
+
+def winner_id(match):
+    if match.team1_score is None or match.team2_score is None:
+        return None
+    if match.team1_score > match.team2_score:
+        return match.team1_id
+    if match.team2_score > match.team1_score:
+        return match.team2_id
+    return None
+
+
+# A meglévő események szakaszainak besorolása és a hiányzó ágrajz pótlása
+def backfill_bracket(conn):
+    for event in conn.execute(sa.select(events)).all():
+        stages = conn.execute(sa.select(groups.c.id).where(
+            groups.c.event_id == event.id).order_by(groups.c.id)).scalars().all()
+        if event.event_type == 'round_robin':
+            group_stage, knockout = stages, []
+            kind = 'round_robin'
+        elif event.event_type == 'group_knockout':
+            group_stage = stages[:event.num_of_groups or 0]
+            knockout = stages[len(group_stage):]
+            kind = 'group'
+        else:
+            group_stage, knockout = [], stages
+            kind = 'group'
+        if group_stage:
+            conn.execute(groups.update().where(groups.c.id.in_(group_stage)).values(
+                kind=kind, stage_order=0))
+        for order, group_id in enumerate(knockout, start=1):
+            conn.execute(groups.update().where(groups.c.id == group_id).values(
+                kind='knockout', stage_order=order))
+
+        # Körönként a teljes mérkőzésszám: a döntőben 1, előtte 2, 4, ...
+        rounds = []
+        for index, group_id in enumerate(knockout):
+            size = 2 ** (len(knockout) - index - 1)
+            ids = conn.execute(sa.select(matches.c.id).where(
+                matches.c.group_id == group_id).order_by(matches.c.id)).scalars().all()
+            for _ in range(size - len(ids)):
+                ids.append(conn.execute(matches.insert().values(
+                    event_id=event.id, group_id=group_id)).inserted_primary_key[0])
+            for position, match_id in enumerate(ids):
+                conn.execute(matches.update().where(matches.c.id == match_id).values(
+                    bracket_position=position))
+            rounds.append(ids)
+
+        for ids, parents in zip(rounds, rounds[1:]):
+            for position, match_id in enumerate(ids):
+                parent_id = parents[position // 2]
+                slot = position % 2 + 1
+                conn.execute(matches.update().where(matches.c.id == match_id).values(
+                    next_match_id=parent_id, next_slot=slot))
+                match = conn.execute(sa.select(matches).where(
+                    matches.c.id == match_id)).one()
+                team_column = matches.c[f'team{slot}_id']
+                conn.execute(matches.update().where(
+                    matches.c.id == parent_id, team_column.is_(None)).values(
+                    {team_column: winner_id(match)}))
+
+
+# revision identifiers, used by Alembic.
+revision = '5f248f8728f9'
+down_revision = '865fc7a4be0c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('groups', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('kind', sa.String(length=20), server_default='group', nullable=False))
+        batch_op.add_column(sa.Column('stage_order', sa.Integer(), server_default='0', nullable=False))
+
+    with op.batch_alter_table('matches', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('bracket_position', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('next_match_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('next_slot', sa.Integer(), nullable=True))
+        batch_op.alter_column('team1_id',
+               existing_type=sa.INTEGER(),
+               nullable=True)
+        batch_op.alter_column('team2_id',
+               existing_type=sa.INTEGER(),
+               nullable=True)
+        batch_op.create_index(batch_op.f('ix_matches_next_match_id'), ['next_match_id'], unique=False)
+        batch_op.create_foreign_key('fk_matches_next_match_id', 'matches', ['next_match_id'], ['id'])
+
+    # ### end Alembic commands ###
+
+    backfill_bracket(op.get_bind())
+
+
+def downgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('matches', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_matches_next_match_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_matches_next_match_id'))
+        batch_op.alter_column('team2_id',
+               existing_type=sa.INTEGER(),
+               nullable=False)
+        batch_op.alter_column('team1_id',
+               existing_type=sa.INTEGER(),
+               nullable=False)
+        batch_op.drop_column('next_slot')
+        batch_op.drop_column('next_match_id')
+        batch_op.drop_column('bracket_position')
+
+    with op.batch_alter_table('groups', schema=None) as batch_op:
+        batch_op.drop_column('stage_order')
+        batch_op.drop_column('kind')
+
+    # ### end Alembic commands ###
@@ -0,0 +1,43 @@
+"""sport points
+
+Revision ID: 6d7c4dbd1073
+Revises: 5f248f8728f9
+Create Date: 2026-10-18 07:04:12.518330
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d7c4dbd1073'
+down_revision = '5f248f8728f9'
+branch_labels = None
+depends_on = None
+
+# A ranking.RANKING_RULES pontozása a migráció idején: győzelem, döntetlen, vereség
+SPORT_POINTS = {
+    'football': (3, 1, 0),
+    'handball': (2, 1, 0),
+    'basketball': (2, 1, 1),
+    'volleyball': (3, 1, 0),
+}
+
+
+def recompute_points(points):
+    for sport_type, (win, draw, loss) in points.items():
+        op.execute(sa.text("""
+            UPDATE standings
+            SET points = wins * :win + draws * :draw + losses * :loss
+            WHERE event_id IN (SELECT id FROM events
+                               WHERE sport_type = :sport_type)
+        """).bindparams(win=win, draw=draw, loss=loss, sport_type=sport_type))
+
+
+def upgrade():
+    # A tárolt pontok eddig minden sportágban 3/1/0 szerint számolódtak
+    recompute_points(SPORT_POINTS)
+
+
+def downgrade():
+    recompute_points({sport_type: (3, 1, 0) for sport_type in SPORT_POINTS})
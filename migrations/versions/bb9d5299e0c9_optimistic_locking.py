@@ -0,0 +1,159 @@
+"""optimistic locking
+
+Revision ID: bb9d5299e0c9
+Revises: 6d7c4dbd1073
+Create Date: 2026-10-18 07:51:55.937082
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bb9d5299e0c9'
+down_revision = '6d7c4dbd1073'
+branch_labels = None
+depends_on = None
+
+# A ranking.RANKING_RULES pontozása a migráció idején: győzelem, döntetlen, vereség
+SPORT_POINTS = {
+    'football': (3, 1, 0),
+    'handball': (2, 1, 0),
+    'basketball': (2, 1, 1),
+    'volleyball': (3, 1, 0),
+}
+SCORED = 'team1_score IS NOT NULL AND team2_score IS NOT NULL'
+
+
+# Az egyedi kulcsok előtt a dupla beküldéssel létrejött másolatok
+# összevonása. Azonos nevű szakaszokból az marad, amelyikben a legtöbb
+# lejátszott mérkőzés van (egyenlőségnél a legkisebb azonosítójú); a többi
+# mérkőzései és csapatai átkerülnek bele. Azonos párosításból, illetve ágrajz
+# helyből a lejátszott (különben a legkisebb azonosítójú) mérkőzés marad, a
+# rá mutató next_match_id hivatkozások átírásával. Az érintett szakaszok
+# tabelláit a megmaradt mérkőzésekből újraszámoljuk.
+def remove_duplicates(conn):
+    touched = set()
+    duplicate_groups = conn.execute(sa.text("""
+        SELECT g.id, g.event_id, g.kind, g.name
+        FROM groups AS g
+        JOIN (SELECT event_id, kind, name FROM groups
+              GROUP BY event_id, kind, name HAVING COUNT(*) > 1) AS d
+          ON g.event_id = d.event_id AND g.kind = d.kind AND g.name = d.name
+        ORDER BY g.event_id, g.kind, g.name,
+                 (SELECT COUNT(*) FROM matches AS m
+                  WHERE m.group_id = g.id AND m.team1_score IS NOT NULL
+                    AND m.team2_score IS NOT NULL) DESC,
+                 g.id
+    """)).all()
+    keep = {}
+    for group_id, event_id, kind, name in duplicate_groups:
+        kept = keep.setdefault((event_id, kind, name), group_id)
+        if kept == group_id:
+            continue
+        for table in ('matches', 'teams'):
+            conn.execute(sa.text(f'UPDATE {table} SET group_id = :kept WHERE group_id = :group_id'),
+                         {'kept': kept, 'group_id': group_id})
+        conn.execute(sa.text('DELETE FROM standings WHERE group_id = :group_id'),
+                     {'group_id': group_id})
+        conn.execute(sa.text('DELETE FROM groups WHERE id = :group_id'), {'group_id': group_id})
+        touched.add(kept)
+
+    for columns in (('team1_id', 'team2_id'), ('bracket_position',)):
+        key = ', '.join(columns)
+        not_null = ' AND '.join(f'm.{column} IS NOT NULL' for column in columns)
+        same = ' AND '.join(f'm.{column} = d.{column}' for column in columns)
+        rows = conn.execute(sa.text(f"""
+            SELECT m.id, m.group_id, {', '.join(f'm.{column}' for column in columns)}
+            FROM matches AS m
+            JOIN (SELECT group_id, {key} FROM matches
+                  GROUP BY group_id, {key} HAVING COUNT(*) > 1) AS d
+              ON m.group_id = d.group_id AND {same}
+            WHERE {not_null}
+            ORDER BY m.group_id, {', '.join(f'm.{column}' for column in columns)},
+                     CASE WHEN m.team1_score IS NOT NULL AND m.team2_score IS NOT NULL
+                          THEN 0 ELSE 1 END,
+                     m.id
+        """)).all()
+        keep = {}
+        for match_id, group_id, *values in rows:
+            kept = keep.setdefault((group_id, *values), match_id)
+            if kept == match_id:
+                continue
+            conn.execute(sa.text('UPDATE matches SET next_match_id = :kept '
+                                 'WHERE next_match_id = :match_id'),
+                         {'kept': kept, 'match_id': match_id})
+            conn.execute(sa.text('DELETE FROM matches WHERE id = :match_id'),
+                         {'match_id': match_id})
+            touched.add(group_id)
+
+    for group_id in touched:
+        rebuild_standings(conn, group_id)
+
+
+def rebuild_standings(conn, group_id):
+    conn.execute(sa.text('DELETE FROM standings WHERE group_id = :group_id'),
+                 {'group_id': group_id})
+    conn.execute(sa.text(f"""
+        INSERT INTO standings (event_id, group_id, team_id, played, wins,
+                               draws, losses, scored, conceded, points)
+        SELECT event_id, group_id, team_id,
+               COUNT(*),
+               SUM(CASE WHEN scored > conceded THEN 1 ELSE 0 END),
+               SUM(CASE WHEN scored = conceded THEN 1 ELSE 0 END),
+               SUM(CASE WHEN scored < conceded THEN 1 ELSE 0 END),
+               SUM(scored), SUM(conceded), 0
+        FROM (
+            SELECT event_id, group_id, team1_id AS team_id,
+                   team1_score AS scored, team2_score AS conceded
+            FROM matches WHERE group_id = :group_id AND {SCORED}
+            UNION ALL
+            SELECT event_id, group_id, team2_id AS team_id,
+                   team2_score AS scored, team1_score AS conceded
+            FROM matches WHERE group_id = :group_id AND {SCORED}
+        ) AS sides
+        WHERE team_id IN (SELECT id FROM teams)
+        GROUP BY event_id, group_id, team_id
+    """), {'group_id': group_id})
+    sport_type = conn.execute(sa.text(
+        'SELECT events.sport_type FROM groups JOIN events ON groups.event_id = events.id '
+        'WHERE groups.id = :group_id'), {'group_id': group_id}).scalar()
+    win, draw, loss = SPORT_POINTS.get(sport_type, SPORT_POINTS['football'])
+    conn.execute(sa.text("""
+        UPDATE standings SET points = wins * :win + draws * :draw + losses * :loss
+        WHERE group_id = :group_id
+    """), {'win': win, 'draw': draw, 'loss': loss, 'group_id': group_id})
+
+
+def upgrade():
+    remove_duplicates(op.get_bind())
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('groups', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_groups_event_id_kind_name', ['event_id', 'kind', 'name'])
+
+    with op.batch_alter_table('matches', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        batch_op.create_unique_constraint('uq_matches_group_id_bracket_position', ['group_id', 'bracket_position'])
+        batch_op.create_unique_constraint('uq_matches_group_id_team1_id_team2_id', ['group_id', 'team1_id', 'team2_id'])
+
+    with op.batch_alter_table('standings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+    # ### end Alembic commands ###
+
+
+def downgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('standings', schema=None) as batch_op:
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('matches', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_matches_group_id_team1_id_team2_id', type_='unique')
+        batch_op.drop_constraint('uq_matches_group_id_bracket_position', type_='unique')
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('groups', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_groups_event_id_kind_name', type_='unique')
+
+    # ### end Alembic commands ###
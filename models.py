@@ -1,17 +1,103 @@
+import os
+
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 
 db = SQLAlchemy()
 
+# Adatbázis motor beállítások. Sorrend: az alkalmazás konfigurációja, az
+# azonos nevű környezeti változó, végül az itteni alapérték.
+ENGINE_DEFAULTS = {
+    # Kapcsolatkészlet (PostgreSQL és más szerver alapú adatbázis, vagy
+    # fájl alapú SQLite); a meghajtót (pl. psycopg2) külön kell telepíteni
+    'DB_POOL_SIZE': 10,
+    'DB_MAX_OVERFLOW': 20,
+    'DB_POOL_TIMEOUT': 30,
+    'DB_POOL_RECYCLE': 1800,
+    # SQLite: WAL naplóval az olvasók nem várnak az íróra, NORMAL
+    # szinkronizálással a commit nem vár a lemezre minden alkalommal, a
+    # zárolt adatbázisnál pedig hibaüzenet helyett legfeljebb ennyi ms-ig várunk
+    'SQLITE_JOURNAL_MODE': 'WAL',
+    'SQLITE_SYNCHRONOUS': 'NORMAL',
+    'SQLITE_BUSY_TIMEOUT': 5000,
+    'SQLITE_MMAP_SIZE': 256 * 1024 * 1024,
+    # Negatív érték: KiB-ben, azaz kb. 64 MB kapcsolatonként
+    'SQLITE_CACHE_SIZE': -64000,
+}
+JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+def engine_config(app):
+    for key, default in ENGINE_DEFAULTS.items():
+        value = os.environ.get(key)
+        app.config.setdefault(key, type(default)(value) if value is not None else default)
+    config = {key: app.config[key] for key in ENGINE_DEFAULTS}
+    config['SQLITE_JOURNAL_MODE'] = config['SQLITE_JOURNAL_MODE'].upper()
+    config['SQLITE_SYNCHRONOUS'] = config['SQLITE_SYNCHRONOUS'].upper()
+    if config['SQLITE_JOURNAL_MODE'] not in JOURNAL_MODES:
+        raise ValueError(f"SQLITE_JOURNAL_MODE: {', '.join(JOURNAL_MODES)}")
+    if config['SQLITE_SYNCHRONOUS'] not in SYNCHRONOUS_MODES:
+        raise ValueError(f"SQLITE_SYNCHRONOUS: {', '.join(SYNCHRONOUS_MODES)}")
+    return config
+
+
+def sqlite_pragmas(config):
+    return [
+        f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+        f"PRAGMA cache_size={int(config['SQLITE_CACHE_SIZE'])}",
+    ]
+
 
 def init_db(app):
+    config = engine_config(app)
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    is_sqlite = url.get_backend_name() == 'sqlite'
+    # A memóriában tartott SQLite egyetlen kapcsolatot használ, készlet nélkül
+    if not is_sqlite or url.database not in (None, '', ':memory:'):
+        options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+        options.setdefault('pool_size', config['DB_POOL_SIZE'])
+        options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+        options.setdefault('pool_timeout', config['DB_POOL_TIMEOUT'])
+        options.setdefault('pool_recycle', config['DB_POOL_RECYCLE'])
+        # A szerver által bontott kapcsolatot használat előtt észrevesszük
+        options.setdefault('pool_pre_ping', not is_sqlite)
     db.init_app(app)
-    Migrate(app, db)
+    # Az alembic importja lassú, a munkafolyamatoknak nem kell: a `flask db`
+    # parancsokat csak a flask parancssor alól (FLASK_RUN_FROM_CLI) kötjük be
+    app.config.setdefault('DB_MIGRATIONS', os.environ.get('FLASK_RUN_FROM_CLI') == 'true')
+    if app.config['DB_MIGRATIONS']:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    if is_sqlite:
+        with app.app_context():
+            listen_sqlite_pragmas(db.engine, sqlite_pragmas(config))
+
+
+# Minden új kapcsolaton lefut; aszinkron motornál a sync_engine-t kell átadni
+def listen_sqlite_pragmas(engine, pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    event.listen(engine, 'connect', set_pragmas)
 
 
 class Event(db.Model):
 
     __tablename__ = 'events'
+    __table_args__ = (
+        db.Index('ix_events_date_id', 'date', 'id'),
+        db.Index('ix_events_sport_type_date_id', 'sport_type', 'date', 'id'),
+        db.Index('ix_events_event_type_date_id', 'event_type', 'date', 'id'),
+        db.Index('ix_events_is_ended_date_id', 'is_ended', 'date', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     date = db.Column(db.Date, nullable=False)
@@ -19,33 +105,65 @@ class Event(db.Model):
     event_type = db.Column(db.String(50), nullable=False)
     num_of_groups = db.Column(db.Integer)
     is_ended = db.Column(db.Boolean, default=False)
+    num_of_courts = db.Column(db.Integer)
+    # Minden módosításkor nő, erre épül a gyorsítótárazás
+    revision = db.Column(db.Integer, nullable=False,
+                         default=0, server_default='0')
     teams = db.relationship('Team', backref='event',
                             cascade="all, delete-orphan")
     groups = db.relationship('Group', backref='event',
                              cascade="all, delete-orphan")
     matches = db.relationship('Match', backref='event',
                               cascade="all, delete-orphan")
+    standings = db.relationship('Standing', backref='event',
+                                cascade="all, delete-orphan")
 
-    def __init__(self, name, date, sport_type, event_type, num_of_groups, is_ended):
+    def __init__(self, name, date, sport_type, event_type, num_of_groups, is_ended, num_of_courts=None):
         self.name = name
         self.date = date
         self.sport_type = sport_type
         self.event_type = event_type
         self.num_of_groups = num_of_groups
         self.is_ended = is_ended
+        self.num_of_courts = num_of_courts
 
     def __repr__(self):
         return f"Esemény: {self.name}, {self.date} sport: {self.sport_type} ({self.event_type}) csoportok száma: {self.num_of_groups}"
 
 
+# Globális számlálók név szerint. A törölt események száma az eseménylista
+# ETag-jéhez kell: törlés után egy új esemény ugyanazt az azonosítót, darabszámot
+# és revízió összeget kaphatja.
+DELETED_EVENTS = 'deleted_events'
+
+
+class Counter(db.Model):
+
+    __tablename__ = 'counters'
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def __init__(self, name, value=0):
+        self.name = name
+        self.value = value
+
+
+# A sort a migráció hozza létre; a create_all-lal készült adatbázisban az első növelés
+def increment_counter(name):
+    if not Counter.query.filter_by(name=name).update({Counter.value: Counter.value + 1}):
+        db.session.add(Counter(name, 1))
+
+
 class Team(db.Model):
 
     __tablename__ = 'teams'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     event_id = db.Column(db.Integer, db.ForeignKey(
-        'events.id'), nullable=False)
-    group_id = db.Column(db.Integer)
+        'events.id'), nullable=False, index=True)
+    group_id = db.Column(db.Integer, index=True)
+    standings = db.relationship('Standing', backref='team',
+                                cascade="all, delete-orphan")
 
     def __init__(self, name, event_id, group_id):
         self.name = name
@@ -59,14 +177,30 @@ class Team(db.Model):
 class Group(db.Model):
 
     __tablename__ = 'groups'
+    __table_args__ = (
+        # A szakaszok létrehozása így párhuzamos kéréseknél sem duplázódhat
+        db.UniqueConstraint('event_id', 'kind', 'name', name='uq_groups_event_id_kind_name'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     event_id = db.Column(db.Integer, db.ForeignKey(
-        'events.id'), nullable=False)
+        'events.id'), nullable=False, index=True)
+    # Szakasz fajtája ('group', 'round_robin', 'knockout') és sorrendje
+    # az eseményen belül: a csoportkör 0, a kieséses körök 1-től
+    kind = db.Column(db.String(20), nullable=False,
+                     default='group', server_default='group')
+    stage_order = db.Column(db.Integer, nullable=False,
+                            default=0, server_default='0')
+    # A csoport mérkőzéseinek vagy tabellájának minden változásakor nő, erre
+    # épül a csoportonkénti HTML részletek gyorsítótárazása
+    revision = db.Column(db.Integer, nullable=False,
+                         default=0, server_default='0')
 
-    def __init__(self, name, event_id):
+    def __init__(self, name, event_id, kind='group', stage_order=0):
         self.name = name
         self.event_id = event_id
+        self.kind = kind
+        self.stage_order = stage_order
 
     def __repr__(self):
         return f"Csoport jele: {self.name} esemény id: {self.event_id}"
@@ -74,27 +208,105 @@ class Group(db.Model):
 
 class Match(db.Model):
     __tablename__ = "matches"
+    __table_args__ = (
+        db.Index('ix_matches_event_id_group_id', 'event_id', 'group_id'),
+        # Egy szakaszban egy párosítás, illetve egy ágrajz hely csak egyszer
+        # szerepelhet (az üres csapat NULL, az nem ütközik)
+        db.UniqueConstraint('group_id', 'team1_id', 'team2_id',
+                            name='uq_matches_group_id_team1_id_team2_id'),
+        db.UniqueConstraint('group_id', 'bracket_position',
+                            name='uq_matches_group_id_bracket_position'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     event_id = db.Column(db.Integer, db.ForeignKey(
         'events.id'), nullable=False)
+    # Optimista zárolás: minden módosítás növeli, az UPDATE csak akkor
+    # sikerül, ha közben más nem írta át (különben StaleDataError)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     team1_score = db.Column(db.Integer)
     team2_score = db.Column(db.Integer)
-    team1_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False)
-    team2_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False)
+    # Kieséses ágon a csapat üres, amíg az előző kör el nem dől
+    team1_id = db.Column(db.Integer, db.ForeignKey(
+        'teams.id'), index=True)
+    team2_id = db.Column(db.Integer, db.ForeignKey(
+        'teams.id'), index=True)
     group_id = db.Column(db.Integer, db.ForeignKey(
         'groups.id'))
+    # Forduló, pálya és idősáv a körmérkőzéses sorsolásból
+    round_number = db.Column(db.Integer)
+    court = db.Column(db.Integer)
+    slot = db.Column(db.Integer)
+    # Ágrajz: helye a körön belül, és hogy a győztes melyik mérkőzés
+    # melyik (1 vagy 2) helyére lép tovább
+    bracket_position = db.Column(db.Integer)
+    next_match_id = db.Column(db.Integer, db.ForeignKey(
+        'matches.id'), index=True)
+    next_slot = db.Column(db.Integer)
     team1 = db.relationship('Team', foreign_keys=[team1_id])
     team2 = db.relationship('Team', foreign_keys=[team2_id])
+    next_match = db.relationship('Match', remote_side=[id])
 
-    def __init__(self, event_id, team1_score, team2_score, team1_id, team2_id, group_id):
+    __mapper_args__ = {'version_id_col': version}
+
+    def __init__(self, event_id, team1_score, team2_score, team1_id, team2_id, group_id,
+                 round_number=None, court=None, slot=None,
+                 bracket_position=None, next_match_id=None, next_slot=None):
         self.event_id = event_id
         self.team1_score = team1_score
         self.team2_score = team2_score
         self.team1_id = team1_id
         self.team2_id = team2_id
         self.group_id = group_id
+        self.round_number = round_number
+        self.court = court
+        self.slot = slot
+        self.bracket_position = bracket_position
+        self.next_match_id = next_match_id
+        self.next_slot = next_slot
 
     def __repr__(self):
         return (f"A {self.id}. számú mérkőzés eredménye: "
                 f"{self.team1_id} ({self.team1_score}) - "
                 f"{self.team2_id} ({self.team2_score})")
+
+
+class Standing(db.Model):
+    # Csapatonkénti, szakaszonkénti összesített tabellasor
+    __tablename__ = 'standings'
+    __table_args__ = (
+        db.UniqueConstraint('team_id', 'group_id'),
+        db.Index('ix_standings_event_id_group_id', 'event_id', 'group_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey(
+        'events.id'), nullable=False)
+    group_id = db.Column(db.Integer, db.ForeignKey('groups.id'))
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False)
+    played = db.Column(db.Integer, nullable=False, default=0)
+    wins = db.Column(db.Integer, nullable=False, default=0)
+    draws = db.Column(db.Integer, nullable=False, default=0)
+    losses = db.Column(db.Integer, nullable=False, default=0)
+    scored = db.Column(db.Integer, nullable=False, default=0)
+    conceded = db.Column(db.Integer, nullable=False, default=0)
+    points = db.Column(db.Integer, nullable=False, default=0)
+    # A tabellasort a különbséggel módosítjuk (olvasás, majd írás), ezért
+    # párhuzamos eredményrögzítésnél ez is verziózott, mint a Match
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
+
+    def __init__(self, event_id, group_id, team_id):
+        self.event_id = event_id
+        self.group_id = group_id
+        self.team_id = team_id
+        self.played = 0
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        self.scored = 0
+        self.conceded = 0
+        self.points = 0
+
+    def __repr__(self):
+        return (f"Tabella: csapat {self.team_id}, csoport {self.group_id}, "
+                f"{self.played} mérkőzés, {self.points} pont")
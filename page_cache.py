@@ -0,0 +1,137 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+from models import db, Event, Group
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_FRAGMENT_MAX_BYTES = 16 * 1024 * 1024
+
+
+# Renderelt oldalak LRU gyorsítótára memóriakorláttal. A kulcs tartalmazza az
+# esemény revízióját, így egy módosítás után a régi bejegyzések már nem
+# találhatók meg.
+class PageCache:
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.size -= sys.getsizeof(self._entries.pop(key))
+            self._entries[key] = value
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= sys.getsizeof(evicted)
+
+    def invalidate_event(self, event_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == event_id]:
+                self.size -= sys.getsizeof(self._entries.pop(key))
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'entries': len(self._entries), 'bytes': self.size,
+                    'max_bytes': self.max_bytes}
+
+
+# A lefordított sablonok (Jinja bytecode) a TEMPLATE_CACHE_DIR könyvtárban
+# az újraindítás után is megmaradnak; a forrás változását a Jinja ellenőrzi.
+# Üres értékkel kikapcsolható.
+def init_page_cache(app):
+    app.config.setdefault('PAGE_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+    app.config.setdefault('FRAGMENT_CACHE_MAX_BYTES', DEFAULT_FRAGMENT_MAX_BYTES)
+    app.config.setdefault('TEMPLATE_CACHE_DIR', None)
+    app.extensions['page_cache'] = PageCache(
+        app.config['PAGE_CACHE_MAX_BYTES'])
+    app.extensions['fragment_cache'] = PageCache(
+        app.config['FRAGMENT_CACHE_MAX_BYTES'])
+    if app.config['TEMPLATE_CACHE_DIR']:
+        os.makedirs(app.config['TEMPLATE_CACHE_DIR'], exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(
+            app.config['TEMPLATE_CACHE_DIR'])
+
+
+def get_page_cache():
+    return current_app.extensions['page_cache']
+
+
+def get_fragment_cache():
+    return current_app.extensions['fragment_cache']
+
+
+def page_key(event, stage):
+    return (event.id, stage, event.revision)
+
+
+# render: a lapot előállító függvény, csak hiány esetén hívjuk meg
+def cached_page(event, stage, render):
+    cache = get_page_cache()
+    key = page_key(event, stage)
+    page = cache.get(key)
+    if page is None:
+        page = render()
+        cache.set(key, page)
+    return page
+
+
+# Csoportonkénti HTML részletek a csoport revíziója szerint, így egy eredmény
+# után csak az érintett csoport részletét kell újra előállítani. A render a
+# hiányzó csoportok listáját kapja, és csoport azonosító szerinti szótárat ad
+# vissza; az adatokat is csak ezekhez a csoportokhoz kell betöltenie. A
+# variant az oldal csoporttól független, a részletet befolyásoló állapota.
+def cached_fragments(event, groups, name, render, variant=()):
+    cache = get_fragment_cache()
+    keys = {group.id: (event.id, name, group.id, group.revision) + tuple(variant)
+            for group in groups}
+    fragments = {group_id: cache.get(key) for group_id, key in keys.items()}
+    missing = [group for group in groups if fragments[group.id] is None]
+    if missing:
+        for group_id, fragment in render(missing).items():
+            fragments[group_id] = Markup(fragment)
+            cache.set(keys[group_id], fragments[group_id])
+    return fragments
+
+
+# Minden, az esemény adatait módosító műveletnek hívnia kell a commit előtt.
+# group_ids: azok a csoportok, amelyek mérkőzései vagy tabellája változott
+def bump_event_revision(event_id, group_ids=()):
+    Event.query.filter_by(id=event_id).update(
+        {Event.revision: Event.revision + 1})
+    group_ids = set(group_ids)
+    if group_ids:
+        Group.query.filter(Group.event_id == event_id, Group.id.in_(group_ids)).update(
+            {Group.revision: Group.revision + 1})
+    get_page_cache().invalidate_event(event_id)
+
+
+# Törölt eseménynél a részletek is mennek, mert az azonosítók újra kiosztódhatnak
+def invalidate_event_pages(event_id):
+    get_page_cache().invalidate_event(event_id)
+    get_fragment_cache().invalidate_event(event_id)
@@ -0,0 +1,36 @@
+from flask import current_app
+
+
+def to_json(payload):
+    return current_app.json.dumps(
+        payload, separators=(',', ':'), ensure_ascii=False)
+
+
+def event_payload(event):
+    return {
+        'id': event.id,
+        'name': event.name,
+        'date': event.date.isoformat() if event.date else None,
+        'sport_type': event.sport_type,
+        'event_type': event.event_type,
+        'num_of_groups': event.num_of_groups or None,
+        'is_ended': bool(event.is_ended),
+        'revision': event.revision,
+    }
+
+
+def match_payload(match):
+    return {
+        'id': match.id,
+        'group_id': match.group_id,
+        'round': match.round_number,
+        'court': match.court,
+        'slot': match.slot,
+        'team1_id': match.team1_id,
+        'team2_id': match.team2_id,
+        'team1_score': match.team1_score,
+        'team2_score': match.team2_score,
+        'position': match.bracket_position,
+        'next_match_id': match.next_match_id,
+        'next_slot': match.next_slot,
+    }
@@ -0,0 +1,67 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_INTERVAL = 0.005
+
+
+def frame_name(code):
+    path = code.co_filename
+    if 'site-packages' in path:
+        path = path.split('site-packages' + os.sep, 1)[1]
+    else:
+        path = os.path.basename(path)
+    return f'{code.co_name} ({path}:{code.co_firstlineno})'
+
+
+# A hívási lánc a gyökértől, pontosvesszővel elválasztva (flamegraph.pl,
+# speedscope "collapsed stack" formátum)
+def collapse(frame):
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+# Mintavételes profilozó: egyetlen háttérszál adott időközönként lekéri a
+# figyelt (éppen kérést kiszolgáló) szálak veremét, és megszámolja, melyik
+# hívási lánc hányszor fordult elő. A kérés kódját nem lassítja, a költség a
+# mintavételi időközzel arányos.
+class SamplingProfiler:
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, thread_id):
+        with self._lock:
+            self._active[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='sampling-profiler', daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._active.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, stacks in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[collapse(frame)] += 1
+
+
+def write_stacks(path, stacks):
+    with open(path, 'w', encoding='utf-8') as file:
+        for stack, count in stacks.most_common():
+            file.write(f'{stack} {count}\n')
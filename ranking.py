@@ -0,0 +1,105 @@
+# Sportáganként a pontozás és a holtversenyt eldöntő szempontok sorrendje.
+# A szempontok: 'goal_difference', 'scored', 'wins' és 'head_to_head'
+# (az egymás elleni mérkőzések kis tabellája: pont, gólkülönbség, lőtt gól)
+RANKING_RULES = {
+    'football': {'win': 3, 'draw': 1, 'loss': 0,
+                 'tiebreakers': ('goal_difference', 'scored', 'head_to_head', 'wins')},
+    'handball': {'win': 2, 'draw': 1, 'loss': 0,
+                 'tiebreakers': ('head_to_head', 'goal_difference', 'scored', 'wins')},
+    'basketball': {'win': 2, 'draw': 1, 'loss': 1,
+                   'tiebreakers': ('head_to_head', 'goal_difference', 'scored', 'wins')},
+    'volleyball': {'win': 3, 'draw': 1, 'loss': 0,
+                   'tiebreakers': ('wins', 'head_to_head', 'goal_difference', 'scored')},
+}
+DEFAULT_RULES = RANKING_RULES['football']
+
+ROW_FIELDS = {
+    'points': 'points',
+    'goal_difference': 'goal_difference',
+    'scored': 'scored_goals',
+    'wins': 'wins',
+}
+
+
+def ranking_rules(sport_type):
+    return RANKING_RULES.get(sport_type, DEFAULT_RULES)
+
+
+def result_points(scored, conceded, rules):
+    if scored > conceded:
+        return rules['win']
+    if scored < conceded:
+        return rules['loss']
+    return rules['draw']
+
+
+# Egy csoport egymás elleni eredményei tömbökben: points[i, j] az i. csapat
+# pontjai a j. ellen, goals[i, j] a lőtt góljai ellene. A numpy csak
+# holtversenynél kell, ezért csak itt töltjük be (lassú az importja).
+def score_matrices(team_ids, results, rules):
+    import numpy as np
+    index = {team_id: i for i, team_id in enumerate(team_ids)}
+    size = len(team_ids)
+    points = np.zeros((size, size), dtype=np.int64)
+    goals = np.zeros((size, size), dtype=np.int64)
+    rows = [(index[team1_id], index[team2_id], team1_score, team2_score)
+            for team1_id, team2_id, team1_score, team2_score in results
+            if team1_id in index and team2_id in index]
+    if rows:
+        home, away, home_score, away_score = np.array(rows, dtype=np.int64).T
+        np.add.at(goals, (home, away), home_score)
+        np.add.at(goals, (away, home), away_score)
+        outcome = np.sign(home_score - away_score)
+        table = {1: rules['win'], 0: rules['draw'], -1: rules['loss']}
+        np.add.at(points, (home, away), np.select(
+            [outcome == 1, outcome == 0], [table[1], table[0]], table[-1]))
+        np.add.at(points, (away, home), np.select(
+            [outcome == -1, outcome == 0], [table[1], table[0]], table[-1]))
+    return index, points, goals
+
+
+# Csak az éppen holtversenyben lévő csapatok egymás elleni részmátrixa számít
+def head_to_head_keys(cluster, matrices):
+    if matrices is None:
+        return [(0, 0, 0)] * len(cluster)
+    import numpy as np
+    index, points, goals = matrices
+    positions = np.array([index[row['team_id']] for row in cluster])
+    sub = np.ix_(positions, positions)
+    scored = goals[sub].sum(axis=1)
+    conceded = goals[sub].sum(axis=0)
+    return list(zip(points[sub].sum(axis=1).tolist(),
+                    (scored - conceded).tolist(), scored.tolist()))
+
+
+def criterion_keys(criterion, cluster, matrices):
+    if criterion == 'head_to_head':
+        return head_to_head_keys(cluster, matrices)
+    field = ROW_FIELDS[criterion]
+    return [row[field] for row in cluster]
+
+
+# Holtversenycsoportonként haladunk: minden szempont csak az előző
+# szempontok szerint még egyenlő csapatokat bontja tovább. Ha minden
+# szempont egyenlő, a bejövő sorrend marad, így az eredmény determinisztikus.
+def rank_rows(rows, rules, matrices=None):
+    clusters = [list(rows)]
+    for criterion in ('points',) + tuple(rules['tiebreakers']):
+        split = []
+        for cluster in clusters:
+            if len(cluster) < 2:
+                split.append(cluster)
+                continue
+            keys = criterion_keys(criterion, cluster, matrices)
+            order = sorted(range(len(cluster)), key=lambda i: keys[i],
+                           reverse=True)
+            current = [cluster[order[0]]]
+            for previous, i in zip(order, order[1:]):
+                if keys[i] == keys[previous]:
+                    current.append(cluster[i])
+                else:
+                    split.append(current)
+                    current = [cluster[i]]
+            split.append(current)
+        clusters = split
+    return [row for cluster in clusters for row in cluster]
@@ -0,0 +1,71 @@
+from flask import Blueprint, render_template, url_for, redirect
+from models import db, Event, Team, Group, Match
+from standings import event_group_tables, load_stage_matches
+from clinch import qualification_status
+from fixtures import create_round_robin_fixtures
+from events import matches_with_teams, is_group_complete_by_group_id
+from page_cache import cached_page, bump_event_revision
+from concurrency import retry_on_conflict
+
+# Körmérkőzéses esemény: egyetlen csoport, mindenki mindenkivel játszik
+round_robin = Blueprint('round_robin', __name__)
+
+
+# # CREATE RR MATCHES
+# Párhuzamos kérésnél a második a tabellasorok, illetve a párosítások egyedi
+# kulcsán elbukik, újrafuttatva pedig a már elkészült sorsolást találja
+@round_robin.route('/create_round_robin_matches/<int:event_id>', methods=['GET', 'POST'])
+def create_round_robin_matches(event_id):
+    return retry_on_conflict(lambda: create_round_robin_stage(event_id))
+
+
+def create_round_robin_stage(event_id):
+    group_id = Group.query.filter_by(event_id=event_id).first().id
+    teams = Team.query.filter_by(event_id=event_id).all()
+    existing_matches = Match.query.filter_by(event_id=event_id).all()
+    if existing_matches:
+        return redirect(url_for('round_robin.list_of_round_robin_matches', event_id=event_id))
+    event = Event.query.get_or_404(event_id)
+    create_round_robin_fixtures(
+        event_id, {group_id: [team.id for team in teams]}, event.num_of_courts)
+    bump_event_revision(event_id, [group_id])
+    db.session.commit()
+    return redirect(url_for('round_robin.list_of_round_robin_matches', event_id=event_id))
+
+
+@round_robin.route('/list_of_round_robin_matches/<int:event_id>', methods=['GET', 'POST'])
+def list_of_round_robin_matches(event_id):
+    event = Event.query.get_or_404(event_id)
+    group = Group.query.filter_by(event_id=event_id).first()
+    group_id = group.id
+    matches = matches_with_teams().filter_by(event_id=event_id).order_by(
+        Match.round_number, Match.slot, Match.court, Match.id).all()
+    round_robin_checker = is_group_complete_by_group_id(event_id, group_id)
+    return render_template('list_of_round_robin_matches.html', event=event, matches=matches, round_robin_checker=round_robin_checker)
+
+
+@round_robin.route('/close_round_robin_event/<int:event_id>', methods=['GET', 'POST'])
+def close_round_robin_event(event_id):
+    event = Event.query.get_or_404(event_id)
+    group = Group.query.filter_by(event_id=event_id).first()
+    group_id = group.id
+    round_robin_checker = is_group_complete_by_group_id(event_id, group_id)
+    if round_robin_checker:
+        event.is_ended = True
+        bump_event_revision(event_id)
+        db.session.commit()
+    return redirect(url_for('round_robin.list_of_round_robin_matches', event_id=event_id))
+
+
+@round_robin.route('/round_robin_overview/<int:event_id>', methods=['GET', 'POST'])
+def round_robin_overview(event_id):
+    event = Event.query.get_or_404(event_id)
+    return cached_page(event, 'round_robin_overview', lambda: render_round_robin_overview(event))
+
+
+def render_round_robin_overview(event):
+    # A mérkőzéseket egyszer töltjük be a tabellához és a biztos állapotokhoz
+    matches = load_stage_matches(event.id)
+    group_data = event_group_tables(event, matches=matches)
+    status = qualification_status(event, group_data, matches)
+    return render_template('round_robin_overview.html', event=event, group_data=group_data, status=status)
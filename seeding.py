@@ -0,0 +1,157 @@
+from collections import Counter
+
+from bracket import bracket_size, seed_slots
+from ranking import rank_rows
+
+# Csoportonként ennyien jutnak tovább (advance_to_knockout), körmérkőzésnél a győztes
+QUALIFIERS_PER_GROUP = 2
+# A csoportok szétválasztása (seed_bracket) ennyi továbbjutóig garantált
+MAX_SEPARATED_PER_GROUP = 2
+
+
+def qualifiers_per_group(event):
+    return 1 if event.event_type == 'round_robin' else QUALIFIERS_PER_GROUP
+
+
+# Kiemelési szint: 1, 2, 3-4, 5-8, 9-16, ... Egy szinten belül a csapatok
+# felcserélhetők anélkül, hogy a kiemelés igazságossága sérülne
+def seed_tier(seed):
+    return (seed - 1).bit_length()
+
+
+# A csoportokból továbbjutók rangsora: előbb a csoportgyőztesek, aztán a
+# másodikok, és így tovább. Egy-egy helyezésen belül a sportág pontozása és
+# holtverseny szempontjai döntenek (ranking.rank_rows); az egymás elleni
+# eredmény itt nem számít, hiszen a csapatok más csoportban játszottak.
+def rank_group_qualifiers(group_data, rules, per_group=QUALIFIERS_PER_GROUP):
+    ranked = []
+    for place in range(per_group):
+        rows = [dict(table[place], group_name=group_name)
+                for group_name, table in group_data.items()
+                if len(table) > place]
+        ranked += [(row['team_id'], row['group_name']) for row in rank_rows(rows, rules)]
+    return ranked
+
+
+# Egy ágrajz felezésnél csoport és szint szerint hány csapat kerüljön a felső
+# félbe. A szintenkénti helyek száma adott (quotas), ezen belül minden csoport
+# tagjai a lehető legegyenletesebben oszoljanak meg: növelő utas
+# maximális folyam (szintek -> csoportok), először csoportonként legfeljebb
+# a tagok felének alsó, majd felső egészrészével, végül korlát nélkül, így
+# mindig van megoldás. Egy csoport felső félbe kerülő tagjainak száma az
+# utak során sosem csökken, ezért az előző körök egyensúlya megmarad.
+def balanced_top_counts(counts, quotas):
+    groups = {}
+    tier_groups = {}
+    for (tier, group), count in counts.items():
+        groups[group] = groups.get(group, 0) + count
+        tier_groups.setdefault(tier, []).append(group)
+    group_tiers = {}
+    for tier, group in counts:
+        group_tiers.setdefault(group, []).append(tier)
+    flow = dict.fromkeys(counts, 0)
+    group_top = dict.fromkeys(groups, 0)
+    tier_left = dict(quotas)
+
+    def augment(limits):
+        # Szélességi keresés a szintekből egy még bővíthető csoportig
+        parent = {('tier', tier): None for tier, left in tier_left.items() if left}
+        queue = list(parent)
+        for node in queue:
+            kind, key = node
+            if kind == 'tier':
+                for group in tier_groups.get(key, ()):
+                    if flow[(key, group)] < counts[(key, group)] and ('group', group) not in parent:
+                        parent[('group', group)] = node
+                        if group_top[group] < limits[group]:
+                            return parent, group
+                        queue.append(('group', group))
+            else:
+                for tier in group_tiers[key]:
+                    if flow[(tier, key)] and ('tier', tier) not in parent:
+                        parent[('tier', tier)] = node
+                        queue.append(('tier', tier))
+        return None
+
+    for limits in ({group: count // 2 for group, count in groups.items()},
+                   {group: (count + 1) // 2 for group, count in groups.items()},
+                   groups):
+        while sum(tier_left.values()):
+            found = augment(limits)
+            if found is None:
+                break
+            parent, group = found
+            group_top[group] += 1
+            node = ('group', group)
+            while parent[node] is not None:
+                previous = parent[node]
+                if previous[0] == 'tier':
+                    flow[(previous[1], node[1])] += 1
+                else:
+                    flow[(node[1], previous[1])] -= 1
+                node = previous
+            tier_left[node[1]] -= 1
+    return flow
+
+
+# Kiemelt ágrajz: az 1. a legutolsóval, a 2. az utolsó előttivel játszik,
+# rekurzívan elhelyezve. A visszaadott lista az első kör helyei sorrendben,
+# erőnyerő helyen None. Ha a csapatokhoz csoport is tartozik, minden
+# felezésnél a kiemelési szinteken belüli cserékkel úgy osztjuk két félre a
+# csapatokat, hogy minden csoport tagjainak száma a két félben legfeljebb
+# eggyel térjen el, amennyiben a szintek helyei ezt megengedik. Csoportonként
+# két továbbjutóval így az azonos csoportból érkezők csak a döntőben
+# találkozhatnak, a csoportok számától és a rangsortól függetlenül. Több
+# továbbjutónál a felezésenkénti egyensúly nem elég (a későbbi szintek
+# helyeire is tekintettel kellene lenni), ezért azt elutasítjuk.
+# Csoportok nélkül a szabványos kiemelés marad.
+def seed_bracket(ranked, separate_groups=True):
+    entries = [entry if isinstance(entry, tuple) else (entry, None)
+               for entry in ranked]
+    group_sizes = Counter(group for _, group in entries if group is not None)
+    if separate_groups and group_sizes and max(group_sizes.values()) > MAX_SEPARATED_PER_GROUP:
+        raise ValueError(f'SEPARATE_GROUPS: csoportonként legfeljebb '
+                         f'{MAX_SEPARATED_PER_GROUP} továbbjutó')
+    team_count = len(entries)
+    size = bracket_size(team_count)
+    slots = seed_slots(size)
+    standard_slot = {seed: index for index, seed in enumerate(slots)}
+    placement = [None] * size
+    grouped = separate_groups and bool(group_sizes)
+
+    def place(start, length, members):
+        if length == 1:
+            if members:
+                placement[start] = members[0][1][0]
+            return
+        half = length // 2
+        quotas = {}
+        for index in range(start, start + half):
+            if slots[index] <= team_count:
+                tier = seed_tier(slots[index])
+                quotas[tier] = quotas.get(tier, 0) + 1
+        # Szint és csoport szerinti kosarak; csoport nélküli csapat saját kosarat kap
+        buckets = {}
+        for seed, (team_id, group) in members:
+            key = group if grouped and group is not None else ('seed', seed)
+            buckets.setdefault((seed_tier(seed), key), []).append((seed, (team_id, group)))
+        if grouped:
+            top_counts = balanced_top_counts(
+                {key: len(bucket) for key, bucket in buckets.items()}, quotas)
+        else:
+            top_counts = {}
+            for (tier, key), bucket in sorted(buckets.items(), key=lambda item: item[1][0][0]):
+                top = min(quotas.get(tier, 0), standard_slot[bucket[0][0]] < start + half)
+                top_counts[(tier, key)] = int(top)
+                quotas[tier] = quotas.get(tier, 0) - top
+        # Kosaranként a szabványosan felső félbe tartozók maradnak fent elsőként
+        sides = [[], []]
+        for key, bucket in buckets.items():
+            bucket.sort(key=lambda member: (standard_slot[member[0]] >= start + half, member[0]))
+            sides[0] += bucket[:top_counts[key]]
+            sides[1] += bucket[top_counts[key]:]
+        place(start, half, sorted(sides[0]))
+        place(start + half, half, sorted(sides[1]))
+
+    place(0, size, list(enumerate(entries, start=1)))
+    return placement
@@ -0,0 +1,171 @@
+import numpy as np
+
+from ranking import ROW_FIELDS, ranking_rules
+from seeding import qualifiers_per_group
+from standings import pending_by_group
+
+SIMULATIONS = 100_000
+MAX_SIMULATIONS = 1_000_000
+# Ennyi szimulációt sorsolunk egyszerre, hogy nagy csoportoknál se fogyjon el a memória
+BATCH_SIZE = 20_000
+MODELS = ('uniform', 'strength')
+# Mérkőzésenkénti átlagos gólszám csapatonként, ha még nincs lejátszott mérkőzés
+DEFAULT_GOALS = 1.3
+# Ennyi átlagos mérkőzéssel simítjuk a csapaterősséget, hogy egy-két eredmény
+# ne billentse el túlságosan
+STRENGTH_PRIOR_GAMES = 2
+# A gólszámot előre kiszámolt táblázatból sorsoljuk: egy 16 bites véletlen
+# szám a Poisson-eloszlás inverz eloszlásfüggvényén keresztül adja a gólt.
+# A táblázat legalább MAX_GOALS gólig, nagy átlagnál (kosárlabda, kézilabda)
+# az átlag fölött TAIL_DEVIATIONS szórásnyiig tart.
+MAX_GOALS = 20
+TAIL_DEVIATIONS = 8
+TABLE_BITS = 16
+
+
+# Várható gólszám a hátralévő mérkőzésekre. 'uniform': minden csapat egyforma
+# erős, 'strength': támadó és védekező erő az eddigi lőtt és kapott gólokból.
+def expected_goals(table, home, away, model):
+    played = np.array([row['played_games'] for row in table], dtype=float)
+    scored = np.array([row['scored_goals'] for row in table], dtype=float)
+    conceded = np.array([row['conceded_goals'] for row in table], dtype=float)
+    average = scored.sum() / played.sum() if played.sum() else DEFAULT_GOALS
+    average = average or DEFAULT_GOALS
+    if model == 'uniform':
+        rate = np.full(len(home), average)
+        return rate, rate
+    prior = STRENGTH_PRIOR_GAMES * average
+    attack = (scored + prior) / (played + STRENGTH_PRIOR_GAMES) / average
+    defence = (conceded + prior) / (played + STRENGTH_PRIOR_GAMES) / average
+    return (average * attack[home] * defence[away],
+            average * attack[away] * defence[home])
+
+
+def max_goals(rates):
+    top = float(rates.max()) if len(rates) else 0
+    return max(MAX_GOALS, int(np.ceil(top + TAIL_DEVIATIONS * np.sqrt(top))))
+
+
+# Mérkőzésenként egy-egy sor: a 2^16 egyenletes értékhez tartozó gólszám
+def goal_tables(rates):
+    cap = max_goals(rates)
+    if not len(rates):
+        return np.zeros((0, 1 << TABLE_BITS), dtype=np.min_scalar_type(cap))
+    goals = np.arange(cap + 1)
+    log_factorials = np.concatenate([[0], np.cumsum(np.log(goals[1:]))])
+    cdf = np.cumsum(np.exp(-rates[:, None] + goals * np.log(rates[:, None])
+                           - log_factorials), axis=1)
+    uniform = (np.arange(1 << TABLE_BITS) + 0.5) / (1 << TABLE_BITS)
+    return np.stack([np.minimum(np.searchsorted(row, uniform, side='right'), cap)
+                     for row in cdf]).astype(np.min_scalar_type(cap))
+
+
+# A szimulált sorrend szempontjai: pont, majd a sportág holtverseny-szabályai
+# (ranking.rank_rows) sorrendben. Az egymás elleni eredményt a szimuláció nem
+# nézi, helyette a végén sorsolás dönt.
+def simulated_criteria(rules):
+    return ('points',) + tuple(criterion for criterion in rules['tiebreakers']
+                               if criterion != 'head_to_head')
+
+
+# Szimulációnként a csapatok sorrendje a szempontok (erősebb elöl) szerint
+# csökkenőleg, teljes egyezésnél sorsolással. Ha a szempontok értékkészlete
+# belefér, egyetlen pontos (2^53 alatti) kulccsal rendezünk, ez jóval
+# gyorsabb a lexsort-nál; különben lexsort.
+def rank_order(values, rng):
+    batch, size = values[0].shape
+    key = np.zeros((batch, size))
+    radix = 1
+    for value in values:
+        low = value.min()
+        span = value.max() - low + 1
+        key = key * span + (value - low)
+        radix *= span
+    if radix < 2 ** (53 - TABLE_BITS):
+        key = key * (1 << TABLE_BITS) + rng.integers(0, 1 << TABLE_BITS, (batch, size))
+        return np.argsort(-key, axis=1)
+    # lexsort: az utolsó kulcs a legerősebb, a sorsolás a leggyengébb
+    return np.lexsort([rng.random((batch, size))] + [-value for value in reversed(values)],
+                      axis=1)
+
+
+# Egy csoport hátralévő mérkőzéseinek szimulációja kötegenként: minden
+# kötegben egyszerre sorsoljuk az összes mérkőzés gólját (Poisson-eloszlás),
+# a végső sorrend a simulated_criteria szerint dől el.
+def simulate_group(table, pending, rules, simulations, model, rng):
+    size = len(table)
+    index = {row['team_id']: i for i, row in enumerate(table)}
+    home = np.array([index[team1_id] for team1_id, _ in pending], dtype=np.int64)
+    away = np.array([index[team2_id] for _, team2_id in pending], dtype=np.int64)
+    home_rate, away_rate = expected_goals(table, home, away, model)
+    # Mérkőzés x csapat előfordulási mátrixok: a szorzással csapatonként
+    # összegzünk. A hazai és a vendég oszlopokat egymás alá tesszük, így
+    # szempontonként egy szorzás kell.
+    matches = len(pending)
+    home_matrix = np.zeros((matches, size))
+    home_matrix[np.arange(matches), home] = 1
+    away_matrix = np.zeros((matches, size))
+    away_matrix[np.arange(matches), away] = 1
+    both = np.vstack([home_matrix, away_matrix])
+    difference_matrix = home_matrix - away_matrix
+
+    current = {criterion: np.array([row[field] for row in table], dtype=float)
+               for criterion, field in ROW_FIELDS.items()}
+    criteria = simulated_criteria(rules)
+    # Eredmény (-1, 0, 1) + 1 szerint a pontok: vereség, döntetlen, győzelem
+    result_points = np.array([rules['loss'], rules['draw'], rules['win']], dtype=float)
+    tables = goal_tables(np.concatenate([home_rate, away_rate]))
+    columns = np.arange(2 * matches)
+    counts = np.zeros((size, size), dtype=np.int64)
+    for start in range(0, simulations, BATCH_SIZE):
+        batch = min(BATCH_SIZE, simulations - start)
+        draws = rng.integers(0, 1 << TABLE_BITS, (batch, 2 * matches), dtype=np.uint16)
+        goals = tables[columns, draws].astype(float)
+        margin = goals[:, :matches] - goals[:, matches:]
+        sign = np.sign(margin)
+        outcome = (sign + 1).astype(np.int64)
+        gained = {
+            'points': lambda: np.hstack(
+                [result_points[outcome], result_points[2 - outcome]]) @ both,
+            'goal_difference': lambda: margin @ difference_matrix,
+            'scored': lambda: goals @ both,
+            'wins': lambda: np.maximum(sign, 0) @ home_matrix + np.maximum(-sign, 0) @ away_matrix,
+        }
+        order = rank_order([current[criterion] + gained[criterion]()
+                            for criterion in criteria], rng)
+        for position in range(size):
+            counts[:, position] += np.bincount(order[:, position], minlength=size)
+    return counts / simulations
+
+
+# Csapatonként a helyezések és a továbbjutás valószínűsége csoportnév szerint.
+# A tabellákat és a mérkőzéseket a hívó tölti be (event_group_tables,
+# load_stage_matches), itt már nincs adatbázis munka. A seeds (csoportnév
+# szerinti véletlenmagok) megadásakor minden csoport saját véletlenszám-
+# generátort kap, így egy csoport eredménye a többitől függetlenül is stabil.
+def qualification_probabilities(event, group_data, matches,
+                                simulations=SIMULATIONS, model='uniform', seed=None,
+                                seeds=None):
+    rules = ranking_rules(event.sport_type)
+    qualifiers = qualifiers_per_group(event)
+    rng = np.random.default_rng(seed)
+    pending = pending_by_group(group_data, matches)
+
+    probabilities = {}
+    for group_name, table in group_data.items():
+        if pending[group_name]:
+            if seeds is not None:
+                rng = np.random.default_rng(seeds[group_name])
+            positions = simulate_group(table, pending[group_name], rules,
+                                       simulations, model, rng)
+        else:
+            # Lejátszott csoport: a tabella sorrendje végleges
+            positions = np.eye(len(table))
+        probabilities[group_name] = {
+            row['team_id']: {
+                'positions': positions[i].round(4).tolist(),
+                'qualify': round(float(positions[i, :qualifiers].sum()), 4),
+            }
+            for i, row in enumerate(table)
+        }
+    return probabilities
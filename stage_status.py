@@ -0,0 +1,47 @@
+from flask import g, has_app_context
+from sqlalchemy import case, event, func, or_
+from sqlalchemy.orm import Session
+
+from models import db, Match
+
+
+# Egy esemény összes szakaszának állapota egyetlen GROUP BY lekérdezéssel:
+# hány mérkőzés van, hány vár még eredményre és hány döntetlen
+def load_stage_status(event_id):
+    pending = func.sum(case(
+        (or_(Match.team1_score.is_(None), Match.team2_score.is_(None)), 1),
+        else_=0))
+    draws = func.sum(case(
+        (Match.team1_score == Match.team2_score, 1), else_=0))
+    rows = db.session.query(
+        Match.group_id, func.count(Match.id), pending, draws).filter(
+        Match.event_id == event_id).group_by(Match.group_id).all()
+    return {group_id: {'matches': count, 'pending': pending, 'draws': draws}
+            for group_id, count, pending, draws in rows}
+
+
+# Egy kérésen belül minden hívó ugyanazt az eredményt kapja
+def get_stage_status(event_id):
+    cache = g.setdefault('stage_status', {})
+    if event_id not in cache:
+        cache[event_id] = load_stage_status(event_id)
+    return cache[event_id]
+
+
+@event.listens_for(Session, 'after_commit')
+def _clear_stage_status(session):
+    if has_app_context():
+        g.pop('stage_status', None)
+
+
+def is_stage_complete(stage_status, group_id):
+    return stage_status.get(group_id, {}).get('pending', 0) == 0
+
+
+def has_draw(stage_status, group_id):
+    return stage_status.get(group_id, {}).get('draws', 0) > 0
+
+
+def pending_matches(stage_status, group_ids=None):
+    return sum(status['pending'] for group_id, status in stage_status.items()
+               if group_ids is None or group_id in group_ids)
@@ -0,0 +1,215 @@
+from sqlalchemy import insert, select
+
+from bracket import stage_groups
+from models import db, Group, Match, Standing, Team
+from ranking import DEFAULT_RULES, rank_rows, ranking_rules, result_points, score_matrices
+
+STAT_FIELDS = ('played', 'wins', 'draws', 'losses',
+               'scored', 'conceded', 'points')
+
+
+# Egy csapat szempontjából egy eredmény hozzájárulása a tabellához
+def result_contribution(scored, conceded, rules=DEFAULT_RULES):
+    if scored is None or conceded is None:
+        return None
+    contribution = {'played': 1, 'wins': 0, 'draws': 0, 'losses': 0,
+                    'scored': scored, 'conceded': conceded,
+                    'points': result_points(scored, conceded, rules)}
+    if scored > conceded:
+        contribution['wins'] = 1
+    elif scored < conceded:
+        contribution['losses'] = 1
+    else:
+        contribution['draws'] = 1
+    return contribution
+
+
+def create_standings(event_id, group_id, team_ids):
+    existing = {team_id for team_id, in db.session.query(
+        Standing.team_id).filter_by(group_id=group_id)}
+    rows = [{'event_id': event_id, 'group_id': group_id, 'team_id': team_id,
+             'played': 0, 'wins': 0, 'draws': 0, 'losses': 0,
+             'scored': 0, 'conceded': 0, 'points': 0}
+            for team_id in team_ids if team_id not in existing]
+    if rows:
+        db.session.execute(insert(Standing), rows)
+
+
+def _apply_delta(standing, old, new):
+    for field in STAT_FIELDS:
+        change = (new[field] if new else 0) - (old[field] if old else 0)
+        setattr(standing, field, getattr(standing, field) + change)
+
+
+def _result_sides(match, old_team1_score, old_team2_score):
+    return [
+        (match.team1_id, (old_team1_score, old_team2_score),
+         (match.team1_score, match.team2_score)),
+        (match.team2_id, (old_team2_score, old_team1_score),
+         (match.team2_score, match.team1_score)),
+    ]
+
+
+# Az eredmény módosításakor csak a régi és az új eredmény különbségét
+# vezetjük át a két érintett tabellasoron, egyetlen lekérdezéssel
+def apply_result(match, old_team1_score, old_team2_score):
+    return apply_results(match.event, [(match, old_team1_score, old_team2_score)])
+
+
+# Több eredmény egyszerre: a különbségeket tabellasoronként összegezzük, a
+# sorokat a végén egyetlen lekérdezéssel töltjük be és egyszer módosítjuk.
+# A changes elemei (match, régi hazai gól, régi vendég gól) hármasok.
+def apply_results(event, changes):
+    rules = ranking_rules(event.sport_type)
+    deltas = {}
+    for match, old_team1_score, old_team2_score in changes:
+        for team_id, old_scores, new_scores in _result_sides(
+                match, old_team1_score, old_team2_score):
+            old = result_contribution(*old_scores, rules)
+            new = result_contribution(*new_scores, rules)
+            if old == new:
+                continue
+            delta = deltas.setdefault((match.group_id, team_id),
+                                      dict.fromkeys(STAT_FIELDS, 0))
+            for field in STAT_FIELDS:
+                delta[field] += (new[field] if new else 0) - (old[field] if old else 0)
+    if not deltas:
+        return []
+    standings = {(standing.group_id, standing.team_id): standing
+                 for standing in Standing.query.filter(
+                     Standing.event_id == event.id,
+                     Standing.group_id.in_({group_id for group_id, _ in deltas}),
+                     Standing.team_id.in_({team_id for _, team_id in deltas}))}
+    changed = []
+    for (group_id, team_id), delta in deltas.items():
+        standing = standings.get((group_id, team_id))
+        if standing is None:
+            standing = Standing(event.id, group_id, team_id)
+            db.session.add(standing)
+        _apply_delta(standing, None, delta)
+        changed.append(standing)
+    return changed
+
+
+def standing_to_row(standing, team_name):
+    return {
+        'team_id': standing.team_id,
+        'team_name': team_name,
+        'played_games': standing.played,
+        'scored_goals': standing.scored,
+        'conceded_goals': standing.conceded,
+        'goal_difference': standing.scored - standing.conceded,
+        'points': standing.points,
+        'wins': standing.wins,
+        'losses': standing.losses,
+        'draws': standing.draws,
+    }
+
+
+def stage_matches_statement(event_id, group_ids=None):
+    query = select(
+        Match.group_id, Match.team1_id, Match.team2_id,
+        Match.team1_score, Match.team2_score).filter(Match.event_id == event_id)
+    if group_ids is None:
+        return query.join(Group, Match.group_id == Group.id).filter(
+            Group.kind.in_(('group', 'round_robin')))
+    return query.filter(Match.group_id.in_(group_ids))
+
+
+# A csoportkör összes mérkőzése (lejátszott és hátralévő) egy lekérdezéssel,
+# (group_id, team1_id, team2_id, team1_score, team2_score) sorokként
+def load_stage_matches(event_id, group_ids=None):
+    return [tuple(row) for row in db.session.execute(
+        stage_matches_statement(event_id, group_ids))]
+
+
+def group_results(matches):
+    results = {}
+    for group_id, team1_id, team2_id, team1_score, team2_score in matches:
+        if team1_score is not None and team2_score is not None:
+            results.setdefault(group_id, []).append(
+                (team1_id, team2_id, team1_score, team2_score))
+    return results
+
+
+# A még le nem játszott mérkőzések csoportnév szerint, (team1_id, team2_id)
+# párokként; csak a tabellákban szereplő csapatok számítanak
+def pending_by_group(group_data, matches):
+    team_group = {row['team_id']: group_name
+                  for group_name, table in group_data.items() for row in table}
+    pending = {group_name: [] for group_name in group_data}
+    for _, team1_id, team2_id, team1_score, team2_score in matches:
+        if team1_score is None or team2_score is None:
+            if team1_id in team_group and team2_id in team_group:
+                pending[team_group[team1_id]].append((team1_id, team2_id))
+    return pending
+
+
+# Egymás elleni eredmény csak akkor kell, ha a szabályok között szerepel és
+# van pontegyenlőség
+def needs_head_to_head(table, rules):
+    return 'head_to_head' in rules['tiebreakers'] and \
+        len({row['points'] for row in table}) < len(table)
+
+
+def standings_statement(event_id, group_ids):
+    return select(Standing, Team.name).join(
+        Team, Standing.team_id == Team.id).filter(
+        Standing.event_id == event_id,
+        Standing.group_id.in_(group_ids)).order_by(Standing.id)
+
+
+def collect_tables(group_ids, rows):
+    tables = {group_id: [] for group_id in group_ids}
+    for standing, team_name in rows:
+        tables[standing.group_id].append(standing_to_row(standing, team_name))
+    return tables
+
+
+def tied_groups(tables, rules):
+    return [group_id for group_id, table in tables.items()
+            if needs_head_to_head(table, rules)]
+
+
+# Rendezés a sportág szabályai szerint; results: a tied_groups csoportjainak
+# lejátszott mérkőzései (group_results)
+def rank_tables(tables, rules, results):
+    for group_id, table in tables.items():
+        matrices = None
+        if group_id in results:
+            matrices = score_matrices(
+                [row['team_id'] for row in table], results[group_id], rules)
+        tables[group_id] = rank_rows(table, rules, matrices)
+    return tables
+
+
+# Kész tabellák csoportonként egyetlen lekérdezéssel, a sportág szerinti
+# holtverseny-szabályokkal rendezve. Az egymás elleni eredményekhez, ha a
+# hívó már betöltötte a mérkőzéseket, azokat használjuk.
+def get_group_tables(event_id, group_ids, rules=DEFAULT_RULES, matches=None):
+    if not group_ids:
+        return {}
+    tables = collect_tables(group_ids, db.session.execute(
+        standings_statement(event_id, group_ids)))
+    tied = tied_groups(tables, rules)
+    results = {}
+    if tied:
+        if matches is None:
+            matches = load_stage_matches(event_id, tied)
+        results = group_results(matches)
+    return rank_tables(tables, rules, results)
+
+
+def name_tables(groups, tables):
+    return {group.name: tables[group.id] for group in groups}
+
+
+# Az esemény csoportkörének tabellái csoportnév szerint, rendezve
+def event_group_tables(event, group_ids=None, matches=None):
+    groups = stage_groups(event.id)
+    if group_ids:
+        groups = [group for group in groups if group.id in group_ids]
+    # A tabellák az eredményrögzítéskor frissülnek, itt csak kiolvassuk őket
+    tables = get_group_tables(event.id, [group.id for group in groups],
+                              ranking_rules(event.sport_type), matches)
+    return name_tables(groups, tables)